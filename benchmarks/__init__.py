@@ -0,0 +1 @@
+"""Headless benchmarks for Spook Fighters, run each module with python -m"""
@@ -0,0 +1,194 @@
+"""Micro-benchmark of allocations made by the core value types
+
+Run from the repository root with: python -m benchmarks.allocations
+Whole tick allocations are measured in this tree and in a checkout of an
+earlier commit (--baseline, default the first commit), each in its own process
+"""
+
+# Import bundled modules
+import argparse
+from dataclasses import dataclass
+import json
+import os
+import subprocess
+import sys
+import tarfile
+import tempfile
+import timeit
+import tracemalloc
+import types
+import typing
+
+# Run pygame without a window or sound
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+# Import structure libraries
+import pygame
+
+# Import local files
+from modules import Config
+from modules import Core
+
+import main
+
+## Replicas of the previous (dict based) value types, for comparison
+@dataclass
+class LegacyPair:
+    """Pair as it was before slots"""
+
+    x: typing.Any
+    y: typing.Any
+
+@dataclass
+class LegacyVector:
+    """Vector as it was before slots"""
+
+    x: int
+    y: int
+
+@dataclass
+class LegacyHitState:
+    """HitState as it was before slots"""
+
+    damage: int
+    force: float
+    varForce: float
+    vector: LegacyVector
+
+    def mapping(self):
+        """Returns the fields as a dictionary, for splatting"""
+        return {
+            "damage": self.damage, "force": self.force,
+            "varForce": self.varForce, "vector": self.vector
+        }
+
+def legacy_opposite(direction):
+    """Dir.opposite as it was, building the dict every call"""
+    return {
+        Core.Dir.UP: Core.Dir.DOWN, Core.Dir.DOWN: Core.Dir.UP,
+        Core.Dir.LEFT: Core.Dir.RIGHT, Core.Dir.RIGHT: Core.Dir.LEFT,
+        Core.Dir.NONE: Core.Dir.NONE
+    }[direction]
+
+def legacy_hit(damage, force, varForce, vector):
+    """Player.hit as it was, taking splatted keywords"""
+    return damage + force + varForce + vector.x
+
+def direct_hit(state):
+    """Player.hit as it is, taking the state"""
+    return state.damage + state.force + state.varForce + state.vector.x
+
+def bytes_per_instance(factory: typing.Callable, count: int = 100000) -> float:
+    """Returns the average traced bytes held by one instance made by factory"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    instances = [factory() for _ in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # Discount the list holding them
+    return (after - before - instances.__sizeof__()) / count
+
+def transient_bytes_per_tick(game, ticks: int = 300) -> float:
+    """Returns the average bytes allocated and released again within one game tick"""
+    tracemalloc.start()
+    total = 0
+    for _ in range(ticks):
+        tracemalloc.reset_peak()
+        current = tracemalloc.get_traced_memory()[0]
+        game.update([])
+        total += tracemalloc.get_traced_memory()[1] - current
+    tracemalloc.stop()
+    return total / ticks
+
+def probe():
+    """Prints the transient bytes per tick of an idle default game as JSON\n
+    Only uses what every version of main has, so it runs against older checkouts
+    """
+    pygame.init()
+    game = main.setup_game(types.SimpleNamespace(
+        screen=pygame.Surface((Config.screen.width, Config.screen.height))
+    ))
+    # Let the players land first
+    for _ in range(60):
+        game.update([])
+    print(json.dumps(transient_bytes_per_tick(game)))
+
+def probe_tree(path: str) -> float:
+    """Returns the transient bytes per tick measured by probe() in the tree at path"""
+    # Run this file with the tree first on the path, so its main and modules are imported
+    code = ("import runpy, sys; sys.argv = [sys.argv[0], '--probe'];"
+            f" runpy.run_path({os.path.abspath(__file__)!r}, run_name='__main__')")
+    output = subprocess.run([sys.executable, "-c", code], cwd=path, check=True,
+                            stdout=subprocess.PIPE, universal_newlines=True).stdout
+    return float(output.strip().splitlines()[-1])
+
+def probe_commit(ref: str) -> float:
+    """Returns the transient bytes per tick measured by probe() in a checkout of a commit"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    archive = subprocess.run(["git", "archive", "--format=tar", ref], cwd=root, check=True,
+                             stdout=subprocess.PIPE).stdout
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "archive.tar")
+        with open(path, "wb") as file:
+            file.write(archive)
+        with tarfile.open(path) as tar:
+            tar.extractall(directory)
+        return probe_tree(directory)
+
+def first_commit() -> str:
+    """Returns the first commit of the repository"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return subprocess.run(["git", "rev-list", "--max-parents=0", "HEAD"], cwd=root, check=True,
+                          stdout=subprocess.PIPE, universal_newlines=True).stdout.split()[0]
+
+def report(name: str, legacy: float, current: float, unit: str):
+    """Prints a comparison line"""
+    print(f"{name:<28}{legacy:>12.2f}{current:>12.2f}  {unit}  ({legacy / current:.1f}x)")
+
+def main_benchmark(baseline: str = None):
+    """Runs every comparison and prints the results\n
+    baseline - commit the whole tick figures are compared against, default the first
+    """
+
+    pygame.init()
+
+    print(f"{'':<28}{'legacy':>12}{'current':>12}")
+
+    # Memory held by each value type
+    report("Pair bytes",
+           bytes_per_instance(lambda: LegacyPair(1, 2)),
+           bytes_per_instance(lambda: Core.Pair(1, 2)), "B")
+    report("HitState bytes",
+           bytes_per_instance(lambda: LegacyHitState(1, 2, 0.5, LegacyVector(1, 1))),
+           bytes_per_instance(lambda: Core.HitState(1, 2, 0.5, Core.Vector(1, 1))), "B")
+
+    # Time of the hot paths
+    number = 200000
+    report("Dir.opposite",
+           timeit.timeit(lambda: legacy_opposite(Core.Dir.LEFT), number=number) / number * 1e9,
+           timeit.timeit(lambda: -Core.Dir.LEFT, number=number) / number * 1e9, "ns")
+
+    legacyState = LegacyHitState(1, 2, 0.5, LegacyVector(1, 1))
+    state = Core.HitState(1, 2, 0.5, Core.Vector(1, 1))
+    report("hit",
+           timeit.timeit(lambda: legacy_hit(**legacyState.mapping()), number=number)
+           / number * 1e9,
+           timeit.timeit(lambda: direct_hit(state), number=number) / number * 1e9, "ns")
+
+    # Whole tick allocation pressure, legacy from a checkout of the baseline commit
+    baseline = baseline or first_commit()
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    report(f"bytes per tick (vs {baseline[:7]})", probe_commit(baseline), probe_tree(root), "B")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--baseline", metavar="REF",
+                        help="commit whole tick allocations are compared against, default the first")
+    parser.add_argument("--probe", action="store_true",
+                        help="only print this tree's transient bytes per tick as JSON")
+    args = parser.parse_args()
+    if args.probe:
+        probe()
+    else:
+        main_benchmark(args.baseline)
@@ -0,0 +1,184 @@
+"""Reproducible headless scenarios used by the benchmarks"""
+
+# Import bundled modules
+import random
+import typing
+
+# Import structure libraries
+import pygame
+
+# Import local files
+from modules import Base
+from modules import Config
+from modules import Core
+from modules import Headless
+from modules import Inputs
+
+import main
+
+# Scenario class
+class Scenario:
+    """A game set up in a known state, with the input to drive it each tick"""
+
+    def __init__(self, name: str, game: "main.Game", script: Headless.ScriptedInput = None,
+                 feed: typing.Callable[[], None] = None):
+        """feed - called before each tick, for scenarios that keep adding to the game"""
+
+        # Reference game
+        self.name = name
+        self.game = game
+
+        # Script driving the game, None for no input
+        self.script = script
+        self.idle = ([], Headless.HeldKeys())
+
+        # Called before each tick
+        self.feed = feed
+
+    def inputs(self):
+        """Returns the (events, keysHeld) of the next tick"""
+        if self.script is None:
+            return self.idle
+        return self.script.tick()
+
+    def tick(self):
+        """Runs one game update with the next scripted input"""
+        if self.feed is not None:
+            self.feed()
+        self.game.update(*self.inputs())
+
+def _players(game: "main.Game") -> typing.List["main.Player"]:
+    """Returns the players of a game in a stable order"""
+    return list(game.get_players())
+
+def idle() -> Scenario:
+    """Default stage without any input"""
+    return Scenario("idle", Headless.build_game())
+
+def brawl(seed: int = 0) -> Scenario:
+    """Default stage with two players mashing scripted inputs"""
+    game = Headless.build_game()
+    return Scenario("brawl", game, Headless.ScriptedInput(
+        [player.keyset for player in _players(game)], seed=seed,
+    ))
+
+def projectiles(count: int = 1000, seed: int = 0) -> Scenario:
+    """Default stage with many slow projectiles that never expire, topped up to count every tick\n
+    Projectiles leaving the stage or hitting a player are replaced, so the load
+    stays the same however long the scenario runs
+    """
+    game = Headless.build_game()
+    system = game.get_projectile_system()
+    generator = random.Random(seed)
+    spawned = [0]
+
+    def feed():
+        while len(system) < count:
+            system.spawn(
+                pygame.Rect(generator.randrange(Config.game.width),
+                            generator.randrange(Config.game.height), 10, 10),
+                xSpeed=(1 if spawned[0] % 2 else -1),
+            )
+            spawned[0] += 1
+
+    feed()
+    return Scenario(f"projectiles_{count}", game, feed=feed)
+
+def projectile_system(count: int = 10000, seed: int = 0) -> Scenario:
+    """Bots brawling in a stream of batched projectiles, topped up to count every tick\n
+    Every hundredth projectile carries a hit, the rest only die on contact
+    """
+    game = Headless.build_game()
+    players = _players(game)
+    for player in players:
+        player.set_provider(Inputs.RecoveryBot())
+
+    # Room for the whole stream past the default limit
+    system = game.get_projectile_system()
+    system.limit = count
+    hitState = system.register_hit_state(Config.attack.grab.hitState)
+
+    stage = game.get_stage()
+    generator = random.Random(seed)
+    spawned = [0]
+
+    def feed():
+        while len(system) < count:
+            system.spawn(
+                pygame.Rect(generator.randrange(stage.width), generator.randrange(stage.height), 6, 6),
+                xSpeed=generator.choice((-2, -1, 1, 2)), ySpeed=generator.choice((-1, 0, 1)),
+                lifeSpan=generator.randrange(60, 240), owner=players[spawned[0] % len(players)],
+                hitState=hitState if spawned[0] % 100 == 0 else system.NONE,
+                color=Core.Color.RED,
+            )
+            spawned[0] += 1
+
+    feed()
+    return Scenario(f"projectile_system_{count}", game, feed=feed)
+
+def barriers(count: int = 200) -> Scenario:
+    """Default stage with a grid of extra barriers, with two players brawling"""
+    game = Headless.build_game()
+    columns = 20
+    for index in range(count):
+        game.add_barriers(Base.Barrier(
+            pygame.Rect(40 + (index % columns) * 36, 20 + (index // columns) * 24, 12, 8),
+            color=Core.Color.DARKGREEN,
+        ))
+    return Scenario(f"barriers_{count}", game, Headless.ScriptedInput(
+        [player.keyset for player in _players(game)],
+    ))
+
+def crowd(count: int = 16) -> Scenario:
+    """Default stage with many players sharing the two keysets"""
+    game = Headless.build_game()
+    keysets = (Config.player.keys1, Config.player.keys2)
+    for index in range(count - len(game.get_players())):
+        game.create_player(main.Player(
+            pygame.Rect(120 + (index * 40) % (Config.game.width - 240), 0,
+                        Config.player.width, Config.player.height),
+            attributes=Config.player.attributes,
+            keyset=keysets[index % 2],
+            lives=Config.player.lives,
+        ))
+    return Scenario(f"players_{count}", game, Headless.ScriptedInput(keysets))
+
+def bots(seed: int = 0) -> Scenario:
+    """Default stage with a recovery bot against an approaching bot"""
+    game = Headless.build_game()
+    first, second = _players(game)[:2]
+    first.set_provider(Inputs.RecoveryBot())
+    second.set_provider(Inputs.ApproachBot(attackRange=40 + seed % 40))
+    return Scenario("bots", game)
+
+def melee(count: int = 16, teams: int = 4) -> Scenario:
+    """Default stage with many bot players split into teams"""
+    game = Headless.build_game(count=count, teams=[index % teams for index in range(count)])
+    for player in _players(game):
+        player.set_provider(Inputs.RecoveryBot())
+    return Scenario(f"melee_{count}", game)
+
+def wide(screens: int = 20) -> Scenario:
+    """Stage many screens wide, with a barrier every few hundred pixels and bots brawling"""
+    game = Headless.build_game(width=Config.game.width * screens)
+    stage = game.get_stage()
+    game.add_barriers(*(
+        Base.Barrier(pygame.Rect(x, stage.height - 300, 40, 20), color=Core.Color.DARKGREEN)
+        for x in range(150, stage.width - 150, 200)
+    ))
+    for player in _players(game):
+        player.set_provider(Inputs.RecoveryBot())
+    return Scenario(f"wide_{screens}", game)
+
+# Every scenario of the suite, by name
+SCENARIOS = {
+    "idle": idle,
+    "brawl": brawl,
+    "projectiles_1000": projectiles,
+    "projectile_system_10000": projectile_system,
+    "barriers_200": barriers,
+    "players_16": crowd,
+    "bots": bots,
+    "melee_16": melee,
+    "wide_20": wide,
+}
@@ -0,0 +1,114 @@
+"""Long-running headless soak test with leak detection
+
+Run from the repository root with: python -m benchmarks.soak --hours 4
+Bot matches are played back to back, with memory, sprite counts and GC
+statistics sampled periodically. Exits non-zero if memory or object
+counts grow past the given bounds.
+"""
+
+# Import bundled modules
+import argparse
+import gc
+import sys
+import time
+import tracemalloc
+import typing
+
+# Import local files
+from modules import Config
+from modules import Headless
+
+from benchmarks import scenarios
+
+def sample(game) -> typing.Dict[str, int]:
+    """Returns the current memory, object and sprite counts"""
+    gc.collect()
+    counts = {
+        "traced": tracemalloc.get_traced_memory()[0],
+        "objects": len(gc.get_objects()),
+        "garbage": len(gc.garbage),
+        "collections": sum(stats["collections"] for stats in gc.get_stats()),
+    }
+    for name in ("sprites", "controllers", "players"):
+        counts[name] = len(getattr(game, name))
+    counts["projectileSystem"] = len(game.get_projectile_system())
+    counts["world"] = len(game.get_world())
+    return counts
+
+def main(argv: typing.List[str] = None) -> int:
+    """Runs the soak test, returning a process exit code"""
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hours", type=float, default=1.0, help="how long to run")
+    parser.add_argument("--match-ticks", type=int, default=Config.screen.fps * 180,
+                        help="ticks per match before it is reset")
+    parser.add_argument("--interval", type=int, default=Config.screen.fps * 60,
+                        help="ticks between samples")
+    parser.add_argument("--warmup", type=int, default=2,
+                        help="samples skipped before growth is measured")
+    parser.add_argument("--max-growth", type=int, default=4 * 1024 * 1024,
+                        help="allowed traced memory growth in bytes")
+    parser.add_argument("--max-objects", type=int, default=20000,
+                        help="allowed growth in live GC-tracked objects")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--players", choices=("scripted", "bots"), default="bots",
+                        help="drive players with random keys or with the built-in bots")
+    args = parser.parse_args(argv)
+
+    Headless.init()
+    tracemalloc.start(10)
+
+    # Match that is reset to its start instead of rebuilt
+    build = scenarios.bots if args.players == "bots" else scenarios.brawl
+    scenario = build(seed=args.seed)
+    game = scenario.game
+    start = game.snapshot()
+
+    deadline = time.monotonic() + args.hours * 3600
+    tick = 0
+    reference = None
+    referenceSnapshot = None
+    failures = []
+
+    while time.monotonic() < deadline and not failures:
+
+        scenario.tick()
+        tick += 1
+
+        # New match
+        if tick % args.match_ticks == 0:
+            game.restore(start)
+
+        if tick % args.interval != 0:
+            continue
+
+        # Take sample
+        counts = sample(game)
+        print(f"tick {tick}: " + " ".join(f"{key}={value}" for key, value in counts.items()),
+              flush=True)
+
+        # Growth is measured from the first sample after warmup
+        if tick // args.interval == args.warmup:
+            reference = counts
+            referenceSnapshot = tracemalloc.take_snapshot()
+        elif reference is not None:
+            if counts["traced"] - reference["traced"] > args.max_growth:
+                failures.append(f"traced memory grew by {counts['traced'] - reference['traced']} B")
+            if counts["objects"] - reference["objects"] > args.max_objects:
+                failures.append(f"objects grew by {counts['objects'] - reference['objects']}")
+            if counts["garbage"] > reference["garbage"]:
+                failures.append(f"uncollectable garbage grew to {counts['garbage']}")
+
+    # Explain failures with the biggest allocation growth
+    for failure in failures:
+        print("FAIL", failure)
+    if failures and referenceSnapshot is not None:
+        for stat in tracemalloc.take_snapshot().compare_to(referenceSnapshot, "traceback")[:10]:
+            print(stat)
+            for line in stat.traceback.format():
+                print("   ", line)
+
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
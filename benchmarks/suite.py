@@ -0,0 +1,134 @@
+"""Headless benchmark suite for collision, movement and full ticks
+
+Run from the repository root with: python -m benchmarks.suite
+Results are printed and can be written as JSON. They are compared against
+the stored baseline (benchmarks/baseline.json) by default, warning about any
+operation slower than it by more than the threshold, or failing with --strict.
+Timings vary from run to run and machine to machine, so refresh the baseline
+with --output benchmarks/baseline.json on the machine the suite is run on.
+"""
+
+# Import bundled modules
+import argparse
+import json
+import os
+import sys
+import time
+import typing
+
+# Import local files
+from modules import Headless
+from modules.Core import Dir
+
+from benchmarks import scenarios
+
+# Results the suite is compared against unless told otherwise
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+def throughput(function: typing.Callable, calls: int, repeats: int) -> float:
+    """Returns the best calls per second of function over several repeats"""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(calls):
+            function()
+        best = min(best, time.perf_counter() - start)
+    return calls / best
+
+def measure(scenario: scenarios.Scenario, calls: int, repeats: int,
+            warmup: int) -> typing.Dict[str, float]:
+    """Returns the throughput (calls per second) of each measured operation in a scenario"""
+    game = scenario.game
+    solids = game.get_solids()
+
+    # Let players land and the script get going
+    for _ in range(warmup):
+        scenario.tick()
+
+    player = next(iter(game.get_players()))
+
+    def move():
+        player.move(3, 0, solids)
+        player.move(-3, 0, solids)
+
+    def player_update():
+        game.gather(*scenario.inputs())
+        player.update(game)
+
+    return {
+        "Entity.move": throughput(move, calls, repeats) * 2,
+        "Entity.touching": throughput(
+            lambda: player.touching(solids, Dir.DOWN), calls, repeats
+        ),
+        "Player.update": throughput(player_update, calls, repeats),
+        "Game.update": throughput(scenario.tick, calls, repeats),
+        "Game.draw": throughput(game.draw, calls, repeats),
+    }
+
+def compare(results: dict, baseline: dict, threshold: float) -> typing.List[str]:
+    """Returns a line for each result slower than baseline by more than threshold"""
+    regressions = []
+    for scenario, metrics in results.items():
+        for metric, value in metrics.items():
+            expected = baseline.get(scenario, {}).get(metric)
+            if expected and value < expected * (1 - threshold):
+                regressions.append(
+                    f"{scenario} {metric}: {value:.0f}/s vs baseline {expected:.0f}/s "
+                    f"({value / expected - 1:+.0%})"
+                )
+    return regressions
+
+def main(argv: typing.List[str] = None) -> int:
+    """Runs the suite, returning a process exit code"""
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenario", action="append", choices=sorted(scenarios.SCENARIOS),
+                        help="scenario to run, may be repeated (default all)")
+    parser.add_argument("--calls", type=int, default=200, help="calls per repeat")
+    parser.add_argument("--repeats", type=int, default=3, help="repeats, best is kept")
+    parser.add_argument("--warmup", type=int, default=60, help="ticks before measuring")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--baseline", default=BASELINE,
+                        help="compare against results JSON in this file, empty to skip")
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="fractional slowdown from baseline counted as a regression")
+    parser.add_argument("--strict", action="store_true", help="exit with an error on regressions")
+    args = parser.parse_args(argv)
+
+    Headless.init()
+
+    # Run each scenario
+    results = {}
+    for name in args.scenario or scenarios.SCENARIOS:
+        results[name] = measure(scenarios.SCENARIOS[name](), args.calls, args.repeats,
+                                args.warmup)
+        for metric, value in results[name].items():
+            print(f"{name:<26}{metric:<18}{value:>14.0f} /s")
+
+    # Flag regressions, before the baseline may be overwritten by the results
+    regressions = []
+    if args.baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        regressions = compare(results, baseline, args.threshold)
+        for line in regressions:
+            print("REGRESSION", line)
+        missing = sorted(set(results) - set(baseline))
+        if missing:
+            print("No baseline for", ", ".join(missing))
+    elif args.baseline:
+        print(f"No baseline at {args.baseline}, write one with --output")
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2, sort_keys=True)
+
+    # Refreshing the baseline accepts the results
+    if (regressions and args.strict
+            and os.path.abspath(args.output or "") != os.path.abspath(args.baseline)):
+        return 1
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,8 +4,10 @@
 # GitHub: https://github.com/HN67/spook-fighters
 
 # Import modules
-import enum
-from enum import Enum
+import argparse
+import cProfile
+import sys
+import time
 import typing
 
 # Import pygame
@@ -19,7 +21,24 @@ from modules.Core import Dir, Color, Pair
 from modules import Base
 from modules.Base import Entity
 
+from modules import Camera
+from modules import Capture
+
+from modules import Inputs
 from modules import Mechanics
+from modules import Projectiles
+from modules import Log
+from modules import Pacing
+from modules import Replay
+from modules import Sampler
+from modules import Scenes
+from modules import Server
+from modules import Spatial
+from modules import Split
+from modules import Telemetry
+from modules import Tracing
+from modules.Profiler import profiler
+from modules import World
 
 # Module level constants
 # Determines if debug info is shown
@@ -32,27 +51,25 @@ DEBUG_INFO = True
 class Player(Entity):
     """This represents a controllable player"""
 
-    class Events(Enum):
-        """Enumerator of event types for Player"""
-        UP = enum.auto()
-        DOWN = enum.auto()
-        LEFT = enum.auto()
-        RIGHT = enum.auto()
-
-        ACTION = enum.auto()
-        ATTACK = enum.auto()
+    # Input bits, events of a tick are bitmasks of these
+    Events = Core.Input
 
     def __init__(self, rect, *, color=Core.Color.BLACK, image=None,
-                 keyset: Core.Keyset, attributes: Core.PlayerAttributes, lives: int
+                 keyset: Core.Keyset = None, attributes: Core.PlayerAttributes, lives: int,
+                 provider: Inputs.InputProvider = None, team: int = None
                 ):
 
         super().__init__(rect, image)
         self.hasImage = (image is not None)
 
-        # Set color
+        # Set color, and the darker shade shown while cooling down
         self.color = color
+        self.dimmed = Core.Color.scale(color, 0.5)
         self.image.fill(self.color)
 
+        # Color the image was last filled with
+        self.shade = self.color
+
         # Reference attributes
         self.attributes = attributes
 
@@ -80,8 +97,16 @@ class Player(Entity):
         # Data collected by collect()
         self.collected = {"barriers": None, "events": None}
 
-        # Reference keyset
+        # Reference keyset, and the provider of input (the keyset by default)
         self.keyset = keyset
+        if provider is None:
+            if keyset is None:
+                raise ValueError("Player needs a keyset or an input provider")
+            provider = Inputs.KeyboardInput(keyset)
+        self.provider = provider
+
+        # Team, None for no teammates
+        self.team = team
 
         # Init damage counter
         self.damage = Core.Variable(0)
@@ -89,22 +114,59 @@ class Player(Entity):
         # Init lives
         self.lives = Core.Variable(lives)
 
-    def hit(self, damage: int, force: int, varForce: float, vector: Core.Vector):
-        """Handles the player getting hit\n
+    def hit(self, state: Core.HitState):
+        """Handles the player getting hit by the given HitState\n
         damage - damage counter increase\n
         force - modifier for knockback and stun\n
         varforce - additional force that scales with total damage\n
         vector - direction of attack and knockback\n
         """
         # Increase damage
-        self.damage.value += damage
+        self.damage.value += state.damage
         # Calculate total force
-        totalForce = force + int(self.damage.value * varForce)
+        totalForce = state.force + int(self.damage.value * state.varForce)
         # Take stun
         self.stun = totalForce
         # Take knockback based on vector and stun (calced above)
-        self.xSpeed = vector.x * totalForce
-        self.ySpeed = vector.y * totalForce
+        self.xSpeed = state.vector.x * totalForce
+        self.ySpeed = state.vector.y * totalForce
+
+    def refresh_image(self, game: "Game"):
+        """Shades the image by stun and cooldown\n
+        Only fills when the shade changes and the player is in view
+        """
+        if not self.hasImage and game.get_camera().visible(self.rect):
+            # Gray for stun
+            if self.stun > 0:
+                shade = Core.Color.GRAY
+            # Darkened for cooling down
+            elif self.cooldown > 0:
+                shade = self.dimmed
+            # Otherwise normal color
+            else:
+                shade = self.color
+            if shade != self.shade:
+                self.image.fill(shade)
+                self.shade = shade
+
+    def hostile(self, other) -> bool:
+        """Returns whether this player's attacks should hit the other"""
+        return other is not self and (self.team is None or getattr(other, "team", None) != self.team)
+
+    def snapshot(self):
+        """Returns the dynamic state of the player, for restore()"""
+        return (
+            self.rect.copy(), self.xSpeed, self.ySpeed, self.stun, self.cooldown,
+            self.xDirection, self.jumps, self.damage.value, self.lives.value,
+        )
+
+    def restore(self, snapshot):
+        """Restores the dynamic state of the player to a snapshot()"""
+        (rect, self.xSpeed, self.ySpeed, self.stun, self.cooldown,
+         self.xDirection, self.jumps, self.damage.value, self.lives.value) = snapshot
+        self.rect = rect.copy()
+        self.collided.x = False
+        self.collided.y = False
 
     def respawn(self, game: "Game"):
         """Respawns in reference to a game"""
@@ -122,21 +184,21 @@ class Player(Entity):
         self.rect.x = game.respawn.x
         self.rect.y = game.respawn.y
 
-    def snap_platforms(self, platforms: pygame.sprite.Group, presses: set, oldRect: pygame.Rect, ):
+    def snap_platforms(self, platforms: pygame.sprite.Group, presses: int, oldRect: pygame.Rect, ):
         """Logic for colliding with platforms"""
         # Setup collision groups
         collisions = self.collisions(platforms)
-        checked = pygame.sprite.Group()
+        checked = set()
         # Fix each collisions
         while len(collisions) > 0:
             # Reference current
-            current = list(collisions)[0]
+            current = collisions[0]
             # Collide if conditions met
             if (
                     # Check that you fell on the platform
                     oldRect.bottom <= current.rect.top
                     # Allow phasing with S key
-                    and not self.Events.DOWN in presses
+                    and not presses & self.Events.DOWN
             ):
                 # Align
                 self.align(current, Dir.DOWN)
@@ -148,65 +210,19 @@ class Player(Entity):
                 checked.add(current)
             # Recheck for collisions
             collisions = self.collisions(platforms)
-            collisions.remove(checked)
+            collisions = [sprite for sprite in collisions if sprite not in checked]
 
-    def parse_events(self, pyEvents, keysHeld):
-        """Parses PyGame events and held keys into Player events using its keyset
-        Returns (newEvents, currentEvents)
-        """
+    def subscribe(self, bus: Core.EventBus):
+        """Declares the events the player reads"""
+        self.provider.subscribe(bus)
 
-        # Create player events set
-        events = set()
-        pressEvents = set()
-        releaseEvents = set()
-
-        # Check for held keys
-        if keysHeld[self.keyset.LEFT]:
-            events.add(Player.Events.LEFT)
-        if keysHeld[self.keyset.RIGHT]:
-            events.add(Player.Events.RIGHT)
-        if keysHeld[self.keyset.DOWN]:
-            events.add(Player.Events.DOWN)
-        if keysHeld[self.keyset.UP]:
-            events.add(Player.Events.UP)
-        if keysHeld[self.keyset.ACTION]:
-            events.add(Player.Events.ACTION)
-        if keysHeld[self.keyset.ATTACK]:
-            events.add(Player.Events.ATTACK)
-
-        # Check for key events
-        for event in pyEvents:
-            # Check for key presses
-            if event.type == pygame.KEYDOWN:
-                if event.key == self.keyset.LEFT:
-                    pressEvents.add(Player.Events.LEFT)
-                if event.key == self.keyset.RIGHT:
-                    pressEvents.add(Player.Events.RIGHT)
-                if event.key == self.keyset.DOWN:
-                    pressEvents.add(Player.Events.DOWN)
-                if event.key == self.keyset.UP:
-                    pressEvents.add(Player.Events.UP)
-                elif event.key == self.keyset.ACTION:
-                    pressEvents.add(Player.Events.ACTION)
-                elif event.key == self.keyset.ATTACK:
-                    pressEvents.add(Player.Events.ATTACK)
-            # Check for releases
-            elif event.type == pygame.KEYUP:
-                if event.key == self.keyset.LEFT:
-                    releaseEvents.add(Player.Events.LEFT)
-                if event.key == self.keyset.RIGHT:
-                    releaseEvents.add(Player.Events.RIGHT)
-                if event.key == self.keyset.DOWN:
-                    releaseEvents.add(Player.Events.DOWN)
-                if event.key == self.keyset.UP:
-                    releaseEvents.add(Player.Events.UP)
-                elif event.key == self.keyset.ACTION:
-                    releaseEvents.add(Player.Events.ACTION)
-                elif event.key == self.keyset.ATTACK:
-                    releaseEvents.add(Player.Events.ATTACK)
-
-        # Return player events
-        return (pressEvents, releaseEvents, events)
+    def set_provider(self, provider: Inputs.InputProvider):
+        """Replaces the provider of the player's input"""
+        self.provider = provider
+
+    def get_provider(self) -> Inputs.InputProvider:
+        """Returns the provider of the player's input"""
+        return self.provider
 
     def update(self, game: "Game"):
         """Updates the physics of the Player"""
@@ -215,8 +231,8 @@ class Player(Entity):
         barriers = game.get_barriers()
         solids = game.get_solids()
         platforms = game.get_platforms()
-        grounds = pygame.sprite.Group(solids, platforms)
-        presses, releases, events = self.parse_events(game.get_events(), game.keys_held())
+        grounds = game.get_grounds()
+        presses, releases, events = self.provider.poll(self, game)
 
         # Gravity pull if in air and not hanging from cooldown
         if (
@@ -234,7 +250,7 @@ class Player(Entity):
                 self.ySpeed = min(self.attributes.slide, self.ySpeed)
 
             # A left D right
-            if self.Events.LEFT in events and self.Events.RIGHT in events:
+            if events & self.Events.LEFT and events & self.Events.RIGHT:
                 # Slow down (cancellation) based on current direction of movement
                 if self.xSpeed > 0:
                     self.xSpeed -= self.attributes.speed
@@ -246,7 +262,7 @@ class Player(Entity):
                     # Align
                     if self.xSpeed > 0:
                         self.xSpeed = 0
-            elif self.Events.LEFT in events:
+            elif events & self.Events.LEFT:
                 # Set speed
                 if self.xSpeed > -self.attributes.maxSpeed:
                     self.xSpeed -= self.attributes.speed
@@ -255,7 +271,7 @@ class Player(Entity):
                         self.xSpeed = -self.attributes.maxSpeed
                 # Remember direction
                 self.xDirection = Dir.LEFT
-            elif self.Events.RIGHT in events:
+            elif events & self.Events.RIGHT:
                 # Set speed
                 if self.xSpeed < self.attributes.maxSpeed:
                     self.xSpeed += self.attributes.speed
@@ -278,11 +294,11 @@ class Player(Entity):
                         self.xSpeed = 0
 
             # Add fast fall pull
-            if self.Events.DOWN in events:
+            if events & self.Events.DOWN:
                 self.ySpeed += self.attributes.fastfall
 
             # Jump code
-            if (self.Events.UP in presses) and (self.jumps > 0):
+            if (presses & self.Events.UP) and (self.jumps > 0):
 
                 # Decrement jump counter if in air # CAN JUMP OFF ANY SOLID
                 if not (self.touching(solids, Dir.DOWN) or
@@ -322,7 +338,7 @@ class Player(Entity):
         oldRect = self.rect.copy()
 
         # Move with collisions enabled
-        self.collided = self.move(dX, dY, solids)
+        self.collided = self.move(dX, dY, solids, self.collided)
 
         # Check for platforms
         self.snap_platforms(game.get_platforms(), presses, oldRect)
@@ -364,9 +380,9 @@ class Player(Entity):
             # Also cant be movement stunned
             if self.stun == 0:
                 # Action event
-                if self.Events.ACTION in presses:
+                if presses & self.Events.ACTION:
                     # Create Grab Attack
-                    if self.Events.UP in events:
+                    if events & self.Events.UP:
                         game.add_controllers(Mechanics.UpGrab(self))
                     else:
                         game.add_controllers(Mechanics.Grab(self))
@@ -374,7 +390,7 @@ class Player(Entity):
                     if self.touching(grounds, Dir.DOWN):
                         self.xSpeed = 0
                 # Attack event
-                if self.Events.ATTACK in presses:
+                if presses & self.Events.ATTACK:
                     # Create slash attack
                     game.add_controllers(Mechanics.Slash(self))
                     # Stop if on ground
@@ -392,87 +408,32 @@ class Player(Entity):
             self.stun = 0
 
         # Update image
-        if not self.hasImage:
-            # Gray for stun
-            if self.stun > 0:
-                self.image.fill(Core.Color.GRAY)
-            # Darkened for cooling down
-            elif self.cooldown > 0:
-                self.image.fill(Core.Color.scale(self.color, 0.5))
-            # Otherwise normal color
-            else:
-                self.image.fill(self.color)
+        self.refresh_image(game)
 
         # Check for death
-        if len(self.collisions(game.get_killBoxes())) > 0:
+        if game.query(self, game.get_killBoxes()):
             # Respawn
             self.respawn(game)
 
-# Basic projectile class
-# TODO create after_update passable function or something
-class Projectile(Entity):
-    """Moving projectile\n
-    Calls post after every update, providing self, defaults to an empty function
-    Calls callback on hit with a player, providing self,player as arguments\n
-    If a callback isnt provided, the Projectile will kill itself on collision"""
-
-    def __init__(self, rect, image=None, xSpeed=0, ySpeed=0, lifeSpan=None,
-                 post: typing.Callable = None, callback: typing.Callable = None):
-
-        # Call standard entity constructor
-        super().__init__(rect, image)
-
-        # Reference parameters
-        self.xSpeed = xSpeed
-        self.ySpeed = ySpeed
-
-        self.lifeSpan = lifeSpan
-
-        # Init age
-        self.age = 0
-
-        self.callback = callback
-
-        # Reference post or create
-        if post is None:
-            self.post = lambda proj: None
-        else:
-            self.post = post
-
-    def update(self, game: "Game"):
-
-        # Die at end of lifespan
-        if self.lifeSpan is not None and self.age >= self.lifeSpan:
-            # Remove from spritegroups
-            self.kill()
-        else:
-            # Increase age
-            self.age += 1
-
-            # Change position
-            self.rect.x += self.xSpeed
-            self.rect.y += self.ySpeed
-
-            # Check for player collisions
-            for player in self.collisions(game.get_players()):
-                if self.callback is None:
-                    self.kill()
-                    break # Dont bother checking other players, no behavior to callback
-                else:
-                    self.callback(self, player)
-
-        # Call post update
-        self.post(self)
-
 # Main game class (very unrefined)
 class Game(Core.Screen):
     """Main game class for running a game of Spook Fighters"""
 
-    def __init__(self, screen, rect, color):
-        
+    def __init__(self, screen, rect, color, stage: pygame.Rect = None):
+        """stage - bounds of the stage, default the size of the game area"""
+
         # Perform basic screen setup
         super().__init__(screen, rect, color)
 
+        # Stage bounds, and the camera viewing part of it
+        if stage is None:
+            stage = pygame.Rect((0, 0), rect.size)
+        self.stage = stage
+        self.camera = Camera.Camera(rect.size, stage)
+
+        # Bounds projectiles are culled outside of, the inner edge of the kill boxes
+        self.bounds = stage.inflate(Config.stage.killDistance * 2, Config.stage.killDistance * 2)
+
         # Create a bunch of spritegroups
         # Barriers: solid ground for players to jump off
         self.barriers = pygame.sprite.Group()
@@ -484,24 +445,61 @@ class Game(Core.Screen):
         self.solids = pygame.sprite.Group()
         # Killboxes: player 'dies' on collisions
         self.killBoxes = pygame.sprite.Group()
-        # Projectile: moving, non colliding, non controllable (usually)
-        self.projectiles = pygame.sprite.Group()
-        # Controllers: they manage projectiles
+        # Controllers: they spawn projectiles
         self.controllers = pygame.sprite.Group()
         # Visibiles: what actually gets drawn (apart from labels)
         self.visibles = pygame.sprite.Group()
         # Labels: HUD/GUI labels for information output
         self.labels = pygame.sprite.Group()
+        # Movers: visibles that move, drawn if in view (the rest are indexed as scenery)
+        self.movers = pygame.sprite.Group()
+
+        # Composite views, maintained by the add methods instead of rebuilt per query
+        # Sprite.kill() removes from these like any other group
+        # Grounds: anything that can be stood on (solids and platforms)
+        self.grounds = pygame.sprite.Group()
+        # Hittables: what projectiles can hit
+        self.hittables = pygame.sprite.Group()
+        # Drawables: everything drawn by sprite (visibles and labels)
+        self.drawables = pygame.sprite.Group()
+
+        # Reused result list of query()
+        self.queryBuffer = []
+
+        # Scenery: static visibles, indexed by area for view culling
+        self.scenery = Spatial.SceneryGroup(Config.camera.cellSize)
+
+        # Entity-component world, projectiles are its entities
+        self.world = World.World()
+        self.projectileSystem = Projectiles.ProjectileSystem(self.world)
+        # Age and move every entity, carry projectiles with their owners, then resolve hits
+        self.world.add_system(World.lifetime_system)
+        self.world.add_system(World.movement_system)
+        self.world.add_system(self.projectileSystem.follow_system)
+        self.world.add_system(self.projectileSystem.collision_system)
+
+        # Source of remote state, mirrored instead of simulating (see Server.SpectatorClient)
+        self.remote = None
 
         # Game variables
         # Respawn point
         self.respawn = Core.Pair(0, 0)
 
-    def update(self, events):
+    def update(self, events, keysHeld=None):
         """Represents one update of entire game logic"""
 
         # Gather events
-        self.gather(events)
+        self.gather(events, keysHeld)
+
+        # Spectated games only take on the remote state
+        if self.remote is not None:
+            with profiler.phase("update.remote"):
+                self.remote.update(self)
+            with profiler.phase("update.labels"):
+                self.labels.update(self)
+            with profiler.phase("update.camera"):
+                self.camera.follow(self.players)
+            return
 
         # Update all sprites
         #self.allSprites.update(self)
@@ -510,22 +508,77 @@ class Game(Core.Screen):
         # Update projectiles, sometimes based on players
         # Update conntrollers, create projectiles
         # Update labels
-        self.players.update(self)
-        self.projectiles.update(self)
-        self.controllers.update(self)
-        self.labels.update(self)
+        with profiler.phase("update.players"):
+            self.players.update(self)
+        with profiler.phase("update.projectiles"):
+            self.projectileSystem.focus = self.camera.rect.center
+            self.world.process(self)
+        with profiler.phase("update.controllers"):
+            self.controllers.update(self)
+        with profiler.phase("update.labels"):
+            self.labels.update(self)
+        with profiler.phase("update.camera"):
+            self.camera.follow(self.players)
 
     def draw(self):
         """Draw the game state"""
 
-        # Draw all sprites onto sky color, labels above everything
-        self.surface.fill(self.color)
-        self.visibles.draw(self.surface)
-        self.labels.draw(self.surface)
+        # Reference view, sprites are drawn offset from stage to screen coordinates
+        view = self.camera.rect
+        offsetX, offsetY = self.camera.offset()
+        surface = self.surface
+        blit = surface.blit
+
+        # Draw sprites in view onto sky color
+        surface.fill(self.color)
+        # Scenery found through the index, in the order it was added
+        for sprite in self.scenery.query(view.left, view.top, view.right, view.bottom):
+            blit(sprite.image, sprite.rect.move(offsetX, offsetY))
+        # Moving sprites, checked directly
+        colliderect = view.colliderect
+        for sprite in self.movers:
+            if colliderect(sprite.rect):
+                blit(sprite.image, sprite.rect.move(offsetX, offsetY))
+        self.projectileSystem.draw(surface, view)
+
+        # Labels are in screen coordinates, above everything
+        self.labels.draw(surface)
 
         # Blit onto the screen
         self.screen.blit(self.surface, (Config.game.x, Config.game.y))
 
+    def _groups(self):
+        """Returns every sprite group of the game"""
+        return (
+            self.sprites, self.barriers, self.platforms, self.players, self.solids,
+            self.killBoxes, self.controllers, self.visibles, self.labels,
+            self.movers, self.grounds, self.hittables, self.drawables, self.scenery,
+        )
+
+    def snapshot(self):
+        """Returns the state needed by restore() to return the game to this point"""
+        return (
+            [group.sprites() for group in self._groups()],
+            [(player, player.snapshot()) for player in self.players],
+            self.world.snapshot(),
+            self.projectileSystem.snapshot(),
+            (self.camera.x, self.camera.y),
+        )
+
+    def restore(self, snapshot):
+        """Restores the game to a state returned by snapshot(), without rebuilding it"""
+        memberships, players, world, projectiles, camera = snapshot
+        # Restore group contents, dropping anything created since
+        for group, sprites in zip(self._groups(), memberships):
+            group.empty()
+            group.add(*sprites)
+        # Restore dynamic state
+        for player, state in players:
+            player.restore(state)
+        self.world.restore(world)
+        self.projectileSystem.restore(projectiles)
+        self.camera.move_to(*camera)
+
     def set_spawn(self, x: int, y: int):
         """Sets the player spawn point"""
         self.respawn = Core.Pair(x, y)
@@ -539,12 +592,22 @@ class Game(Core.Screen):
         self.sprites.add(*barriers)
         self.solids.add(*barriers)
         self.visibles.add(*barriers)
+        self.grounds.add(*barriers)
+        self.drawables.add(*barriers)
+        self.add_scenery(*barriers)
 
     def add_platforms(self, *platforms):
         """Adds platforms to the game"""
         self.platforms.add(*platforms)
         self.sprites.add(*platforms)
         self.visibles.add(*platforms)
+        self.grounds.add(*platforms)
+        self.drawables.add(*platforms)
+        self.add_scenery(*platforms)
+
+    def add_scenery(self, *sprites):
+        """Indexes static visible sprites for drawing, they must not move afterwards"""
+        self.scenery.add(*sprites)
 
     def create_player(self, player):
         """Add a player to the game"""
@@ -552,12 +615,32 @@ class Game(Core.Screen):
         self.sprites.add(player)
         self.solids.add(player)
         self.visibles.add(player)
+        self.movers.add(player)
+        self.grounds.add(player)
+        self.hittables.add(player)
+        self.drawables.add(player)
+        self.subscribe(player)
+
+    def add_markers(self, *markers):
+        """Adds sprites that are only drawn and never simulated,
+        such as projectiles mirrored from another game
+        """
+        self.sprites.add(*markers)
+        self.visibles.add(*markers)
+        self.movers.add(*markers)
+        self.drawables.add(*markers)
+
+    def get_bounds(self):
+        """Returns the bounds projectiles are culled outside of"""
+        return self.bounds
 
-    def add_projectiles(self, *projectiles):
-        """Adds projectiles to the game state"""
-        self.projectiles.add(*projectiles)
-        self.sprites.add(*projectiles)
-        self.visibles.add(*projectiles)
+    def get_projectile_system(self):
+        """Returns the batched projectile system of the game"""
+        return self.projectileSystem
+
+    def get_world(self):
+        """Returns the entity-component world of the game"""
+        return self.world
 
     def add_controllers(self, *controllers):
         """Adds controllers to the game state"""
@@ -568,12 +651,22 @@ class Game(Core.Screen):
         """Adds labels to the game"""
         self.sprites.add(*labels)
         self.labels.add(*labels)
+        self.drawables.add(*labels)
+        self.subscribe(*labels)
 
     def add_killBoxes(self, *killBoxes):
         """Adds killBoxes to the game"""
         self.sprites.add(*killBoxes)
         self.killBoxes.add(*killBoxes)
 
+    def get_camera(self):
+        """Returns the camera viewing the stage"""
+        return self.camera
+
+    def get_stage(self):
+        """Returns the bounds of the stage"""
+        return self.stage
+
     def get_solids(self):
         """Returns the solid objects (for collisions) of the game"""
         return self.solids
@@ -594,58 +687,138 @@ class Game(Core.Screen):
         """Returns the killboxes of the game"""
         return self.killBoxes
 
+    def get_grounds(self):
+        """Returns everything that can be stood on (solids and platforms)"""
+        return self.grounds
+
+    def get_hittables(self):
+        """Returns everything projectiles can hit"""
+        return self.hittables
+
+    def get_drawables(self):
+        """Returns every sprite that is drawn"""
+        return self.drawables
+
+    def query(self, entity, view, buffer: list = None) -> list:
+        """Returns the sprites of 'view' colliding with 'entity' (excluding itself)\n
+        The result is written into 'buffer', or a list owned by the game that is
+        only valid until the next query
+        """
+        if buffer is None:
+            buffer = self.queryBuffer
+        buffer.clear()
+        colliderect = entity.rect.colliderect
+        for sprite in view:
+            if sprite is not entity and colliderect(sprite.rect):
+                buffer.append(sprite)
+        return buffer
+
 ## Define some top-scope functions
 # Function to produce a corner-rect
 def cornerRect(left, top, right, bottom):
     """Creates a Rect using corners"""
     return pygame.Rect(left, top, right - left, bottom - top)
 
-# Debug info function that can turn off all debug print statements
-if DEBUG_INFO:
-    def debug(*value, sep=" ", end="\n"):
-        """Acts the exact same as pythons 'print', but can be disabled by a global"""
-        print(*value, sep=sep, end=end)
-else:
-    def debug(*value, sep=" ", end="\n"): #pylint: disable=unused-argument
-        """Acts the exact same as pythons 'print', but can be disabled by a global"""
-        return None
-
-def setup_game(main):
-    """Sets up and returns Game instance based on given Main"""
+# Logger for debug info, DEBUG_INFO turns off all debug records
+logger = Log.Logger(level=Log.Level.DEBUG if DEBUG_INFO else Log.Level.INFO)
+
+def debug(*value, category="debug", **fields):
+    """Logs the values as a DEBUG record without blocking"""
+    logger.debug(category, *value, **fields)
+
+def trace_targets():
+    """Returns the (class, method name) pairs recorded when tracing"""
+    # Mechanics imports this file as 'main', which is a separate module
+    # from '__main__' when run as a script, so cover both copies
+    modules = {id(module): module for module in (sys.modules[__name__], sys.modules.get("main"))
+               if module is not None}
+    targets = [
+        (Base.Entity, "move"), (Base.Entity, "touching"), (Base.Attack, "update"),
+        (Projectiles.ProjectileSystem, "collide"),
+    ]
+    for module in modules.values():
+        targets.extend((
+            (module.Game, "update"), (module.Game, "draw"),
+            (module.Player, "update"),
+        ))
+    return targets
+
+def spawn_points(count: int, center: float = Config.stage.width / 2
+                ) -> typing.List[typing.Tuple[int, int]]:
+    """Returns the top left spawn position of each of 'count' players\n
+    Players are spread evenly across a screen's width of floor around 'center',
+    in extra rows above if they would not fit side by side
+    """
+    width, height = Config.player.width, Config.player.height
+    left = center - Config.game.width / 2 + Config.stage.spawnMargin
+    right = center + Config.game.width / 2 - Config.stage.spawnMargin
+    gap = Config.stage.spawnGap
+
+    # Players per row, and the spacing between them
+    perRow = max(1, min(count, int((right - left - width) // (width + gap)) + 1))
+    spacing = Config.stage.spawnSpacing
+    if perRow > 1:
+        spacing = min(spacing, (right - left - width) / (perRow - 1))
+
+    points = []
+    for index in range(count):
+        row, column = divmod(index, perRow)
+        inRow = min(perRow, count - row * perRow)
+        # Centered on the middle of the floor
+        x = center - width / 2 + (column - (inRow - 1) / 2) * spacing
+        points.append((int(x), -row * (height + gap)))
+    return points
+
+def hud_layout(count: int) -> typing.List[typing.Tuple[int, int, int, int]]:
+    """Returns the (x, damageY, livesY, height) of the HUD labels of each of 'count' players\n
+    Columns are spread between the first and last player's positions,
+    with text shrunk to fit when there are many players
+    """
+    first, last = Config.hud.x1Position, Config.hud.x2Position
+    height = Config.hud.damageHeight
+    step = 0
+    if count > 1:
+        step = (last - first) / (count - 1)
+        # About 3 characters of room per column
+        height = min(height, int(step / 2))
+    damageY = Config.game.height - Config.hud.margin - height
+    return [(int(first + index * step), damageY, damageY - height, height) for index in range(count)]
+
+def setup_game(main, count: int = Config.player.count,
+               teams: typing.Optional[typing.Sequence[int]] = Config.player.teams,
+               width: int = Config.stage.width, height: int = Config.stage.height):
+    """Sets up and returns Game instance based on given Main\n
+    count - number of players, the first are given keysets and the rest bots\n
+    teams - team of each player, None for every player for themselves\n
+    width, height - size of the stage, the camera scrolls over stages larger than the game
+    """
+
+    if not 2 <= count <= Config.player.maxCount:
+        raise ValueError(f"Invalid player count {count}")
+    if teams is not None and len(teams) != count:
+        raise ValueError(f"Expected {count} teams, got {len(teams)}")
 
     # Create game object
-    game = Game(main.screen, pygame.Rect(Config.game.x, Config.game.y, Config.game.width, Config.game.height), Core.Color.SKYBLUE)
+    game = Game(main.screen, pygame.Rect(Config.game.x, Config.game.y, Config.game.width, Config.game.height), Core.Color.SKYBLUE,
+                stage=pygame.Rect(0, 0, width, height))
 
     # Populate the game object
-    # Create Players
-    # TODO position is based on screen size, but should probably be moved to config
-    # Also, the color should and can easily be moved to config
-    players = (
+    # Create Players, keyboard controlled while there are keysets
+    keysets = Config.player.keysets
+    players = [
         Player(
-            pygame.Rect(
-                Config.game.width / 2 - Config.player.width*2,
-                0,
-                Config.player.width, Config.player.height,
-            ),
+            pygame.Rect(x, y, Config.player.width, Config.player.height),
             attributes=Config.player.attributes,
-            color=Color.ORANGE,
-            keyset=Config.player.keys1,
-            lives=Config.player.lives,
-        ),
-        Player(
-            pygame.Rect(
-                Config.game.width / 2 + Config.player.width,
-                0,
-                Config.player.width, Config.player.height,
-            ),
-            attributes=Config.player.attributes,
-            color=Color.BLUE,
-            keyset=Config.player.keys2,
+            color=Config.player.colors[index],
+            keyset=keysets[index] if index < len(keysets) else None,
+            provider=None if index < len(keysets) else Inputs.BOTS[Config.player.bot](),
             lives=Config.player.lives,
+            team=None if teams is None else teams[index],
         )
-    )
-    game.create_player(players[0])
-    game.create_player(players[1])
+        for index, (x, y) in enumerate(spawn_points(count, width / 2))
+    ]
+    for player in players:
+        game.create_player(player)
 
     # TODO not bad staticity, but probably room for improvement,
     # especially with the floating platform
@@ -653,34 +826,32 @@ def setup_game(main):
     blocks = (
 
         # Floor/ground
-        Base.Barrier(cornerRect(100, Config.game.height - 200,
-                                Config.game.width - 100, Config.game.height - 100),
+        Base.Barrier(cornerRect(100, height - 200,
+                                width - 100, height - 100),
                      color=Color.DARKGREEN),
 
     )
     game.add_barriers(*blocks)
 
-    # Passable platforms
-    platforms = (
-        # Floating platforms
-        Base.Barrier(pygame.Rect(100, Config.game.height - 400,
-                                 150, 20),
-                     color=Color.DARKGREEN),
-
-        Base.Barrier(pygame.Rect(Config.game.width - 250, Config.game.height - 400,
-                                 150, 20),
-                     color=Color.DARKGREEN),
-    )
+    # Passable platforms, a pair of floating platforms per screen of stage
+    platforms = []
+    for left in range(0, width - Config.game.width + 1, Config.game.width):
+        platforms.append(Base.Barrier(pygame.Rect(left + 100, height - 400,
+                                                  150, 20),
+                                      color=Color.DARKGREEN))
+        platforms.append(Base.Barrier(pygame.Rect(left + Config.game.width - 250, height - 400,
+                                                  150, 20),
+                                      color=Color.DARKGREEN))
     game.add_platforms(*platforms)
 
-    # Create killboxes
+    # Create killboxes, around the stage
     killboxes = (
         Base.Barrier(
             # Top corner to corner
             cornerRect(
                 -Config.stage.killDistance - Config.stage.killBoxWidth,
                 -Config.stage.killDistance - Config.stage.killBoxWidth,
-                Config.game.width + Config.stage.killDistance + Config.stage.killBoxWidth,
+                width + Config.stage.killDistance + Config.stage.killBoxWidth,
                 -Config.stage.killDistance
             )
         ),
@@ -688,9 +859,9 @@ def setup_game(main):
             # Bottom corner to corner
             cornerRect(
                 -Config.stage.killDistance - Config.stage.killBoxWidth,
-                Config.game.height + Config.stage.killDistance,
-                Config.game.width + Config.stage.killDistance + Config.stage.killBoxWidth,
-                Config.game.height + Config.stage.killDistance + Config.stage.killBoxWidth
+                height + Config.stage.killDistance,
+                width + Config.stage.killDistance + Config.stage.killBoxWidth,
+                height + Config.stage.killDistance + Config.stage.killBoxWidth
             )
         ),
         Base.Barrier(
@@ -699,55 +870,45 @@ def setup_game(main):
                 -Config.stage.killDistance - Config.stage.killBoxWidth,
                 -Config.stage.killDistance,
                 -Config.stage.killDistance,
-                Config.game.height + Config.stage.killDistance
+                height + Config.stage.killDistance
             )
         ),
         Base.Barrier(
             # Right
             cornerRect(
-                Config.game.width + Config.stage.killDistance,
+                width + Config.stage.killDistance,
                 -Config.stage.killDistance,
-                Config.game.width + Config.stage.killDistance + Config.stage.killBoxWidth,
-                Config.game.height + Config.stage.killDistance
+                width + Config.stage.killDistance + Config.stage.killBoxWidth,
+                height + Config.stage.killDistance
             )
         ),
     )
     game.add_killBoxes(*killboxes)
 
-    # Sets the main's active to its menu
+    # Switches the main to its menu
     def goMenu():
-        main.active = main.menu
-
-    # Create labels
-    labels = (
-
-        Base.Label(
-            (Config.hud.x1Position, Config.hud.yPosition),
-            height=Config.hud.damageHeight,
-            variable=players[0].damage,
-            color=Color.BLACK, bgColor=Color.ORANGE
-        ),
-
-        Base.Label(
-            (Config.hud.x2Position, Config.hud.yPosition),
-            height=Config.hud.damageHeight,
-            variable=players[1].damage,
-            color=Color.BLACK, bgColor=Color.BLUE
-        ),
-
-        Base.Label(
-            (Config.hud.x1Position, Config.hud.lifeYPosition),
-            height=Config.hud.lifeHeight,
-            variable=players[0].lives,
-            color=Color.BLACK, bgColor=Color.ORANGE
-        ),
-
-        Base.Label(
-            (Config.hud.x2Position, Config.hud.lifeYPosition),
-            height=Config.hud.lifeHeight,
-            variable=players[1].lives,
-            color=Color.BLACK, bgColor=Color.BLUE
-        ),
+        main.scenes.switch("menu")
+
+    # Resets the match to how it started
+    def reset():
+        main.reset_game()
+
+    # Create labels, a damage and lives column per player
+    labels = []
+    for player, (x, damageY, livesY, height) in zip(players, hud_layout(len(players))):
+        labels.append(Base.Label(
+            (x, damageY),
+            height=height,
+            variable=player.damage,
+            color=Color.BLACK, bgColor=player.color
+        ))
+        labels.append(Base.Label(
+            (x, livesY),
+            height=height,
+            variable=player.lives,
+            color=Color.BLACK, bgColor=player.color
+        ))
+    labels.extend((
 
         Base.Label(
             (0, 0),
@@ -757,11 +918,19 @@ def setup_game(main):
             callback=goMenu
         ),
 
-    )
+        Base.Label(
+            (Config.hud.resetXPosition, 0),
+            height=Config.hud.textHeight,
+            variable=Core.Variable("Reset"),
+            color=Color.BLACK, bgColor=Color.GRAY,
+            callback=reset
+        ),
+
+    ))
     game.add_labels(*labels)
 
     # Set spawn
-    game.set_spawn(Config.stage.respawnX, Config.stage.respawnY)
+    game.set_spawn(width / 2, Config.stage.respawnY)
 
     # Return the game object
     return game
@@ -776,9 +945,9 @@ def setup_menu(main):
         Core.Color.DARKGRAY
     )
 
-    # Sets the main's active to its menu
+    # Switches the main to the game
     def goGame():
-        main.active = main.game
+        main.scenes.switch("game")
 
     # Add visible labels
     menu.add_sprites(
@@ -809,14 +978,36 @@ def setup_menu(main):
 class Main:
     """Object to handle logic normally inside a main() function"""
 
-    def __init__(self):
-        """Setup the Main object to run the game"""
+    def __init__(self, players: int = Config.player.count,
+                 teams: typing.Optional[typing.Sequence[int]] = Config.player.teams,
+                 stage: typing.Tuple[int, int] = (Config.stage.width, Config.stage.height),
+                 spectate: typing.Optional[typing.Tuple[str, int, int]] = None,
+                 split: bool = False, record: str = None):
+        """Setup the Main object to run the game\n
+        players, teams, stage - match setup, see setup_game()\n
+        spectate - (host, port, room) of a server room to watch instead of playing\n
+        split - simulate in another process, this one only renders\n
+        record - path the input of the last match built is saved to on exit, see Replay
+        """
 
         # Init pygame
         pygame.init()
 
-        # Create clock
-        self.clock = pygame.time.Clock()
+        # Match setup
+        self.playerCount = players
+        self.teams = teams
+        self.stageSize = stage
+
+        # Server room watched, shared by every game built,
+        # or the simulation process of the current game
+        self.split = split
+        self.remote = None
+        if spectate is not None:
+            host, port, room = spectate
+            self.remote = Server.SpectatorClient(room, host, port)
+
+        # Create frame pacer
+        self.pacer = Pacing.FramePacer()
 
         # Make screen based on config
         self.screen = pygame.display.set_mode((Config.screen.width, Config.screen.height))
@@ -824,56 +1015,302 @@ class Main:
         # Set captions
         pygame.display.set_caption(Config.screen.name)
 
-        # Create game (arena) object
-        self.game = setup_game(self)
+        # Ticks run so far
+        self.ticks = 0
+
+        # cProfile run over the first ticks, set by profile_ticks()
+        self.profile = None
+        self.profileTicks = 0
+        self.profilePath = None
+
+        # Frame telemetry, set by record_telemetry()
+        self.telemetry = None
+
+        # Capture of game frames, set by record_frames()
+        self.capture = None
+
+        # Replay of the last match built, and where it is saved
+        self.replayPath = record
+        self.replay = None
+
+        # (bus, version) the pygame event filter was last set for
+        self.eventFilter = None
+
+        # Start tracing if configured, or set by record_trace()
+        self.tracer = None
+        if Config.tracing.path is not None:
+            self.record_trace(Config.tracing.path)
+
+        # Register scenes, they are built on first use
+        self.scenes = Scenes.SceneManager()
+        self.scenes.register("menu", lambda: setup_menu(self))
+        self.scenes.register("game", self._build_game)
+
+        # Start on the menu, building the game (arena) after the first frame
+        self.scenes.switch("menu")
+        self.scenes.preload("game")
+
+    def _build_game(self) -> Game:
+        """Builds the game scene, watching the server room if spectating"""
+        game = setup_game(self, self.playerCount, self.teams, *self.stageSize)
+        # Every game built gets a fresh simulation
+        if self.split:
+            if self.remote is not None:
+                self.remote.close()
+            width, height = self.stageSize
+            self.remote = Split.SimulationProcess(
+                count=self.playerCount, teams=self.teams, width=width, height=height,
+            )
+        game.remote = self.remote
+        # Remote games are not simulated here, so have no input to record
+        if self.replayPath is not None and self.remote is None:
+            self.replay = Replay.record(game)
+        return game
+
+    def reset_game(self):
+        """Resets the game scene to how it started, along with its simulation and replay"""
+        self.scenes.reset("game")
+        if self.split:
+            self.remote.reset()
+        # The replay starts over with the match, so it plays back from the reset
+        if self.replay is not None:
+            self.replay.clear()
+
+    def profile_ticks(self, ticks: int, path: str):
+        """Runs cProfile over the next 'ticks' ticks of start(), dumping .pstats to path"""
+        self.profile = cProfile.Profile()
+        self.profileTicks = self.ticks + ticks
+        self.profilePath = path
+
+    def _finish_profile(self):
+        """Stops cProfile and dumps its stats"""
+        self.profile.disable()
+        self.profile.dump_stats(self.profilePath)
+        debug(f"Profiled {self.ticks} ticks to {self.profilePath}", category="profile")
+        self.profile = None
+
+    def record_telemetry(self, path: str):
+        """Records frame telemetry, periodically written to path"""
+        self.telemetry = Telemetry.FrameTelemetry(path)
+
+    def record_trace(self, path: str):
+        """Records a Chrome trace of the simulation to path, replacing any trace already recording"""
+        if self.tracer is not None:
+            Tracing.uninstall(trace_targets())
+            self.tracer.close()
+        self.tracer = Tracing.Tracer(path)
+        Tracing.install(self.tracer, trace_targets())
+
+    def record_frames(self, path: str, format: str = Config.capture.format): #pylint: disable=redefined-builtin
+        """Records every frame of a game drawn, see Capture.FrameCapture"""
+        self.capture = Capture.FrameCapture(path, (Config.game.width, Config.game.height), format)
+
+    def filter_events(self):
+        """Blocks event types that the active scene and main loop do not read\n
+        Only recomputed when the active scene or its subscriptions change
+        """
+        bus = self.scenes.active.get_bus()
+        if self.eventFilter == (bus, bus.version):
+            return
+        self.eventFilter = (bus, bus.version)
 
-        # Create menu screen
-        self.menu = setup_menu(self)
+        # Main loop reads quits and keys (profiler, telemetry)
+        allowed = set(bus.types) | {pygame.QUIT, pygame.KEYDOWN, pygame.KEYUP}
 
-        # Start game in-fight
-        self.active = self.menu
+        # Block only what is not read, blocking every type at once would flush the queue
+        pygame.event.set_allowed(list(allowed))
+        pygame.event.set_blocked(list(Core.EVENT_TYPES - allowed))
 
     def start(self):
         """Starts the main game loop"""
 
+        # Begin profiling, if requested
+        if self.profile is not None:
+            self.profile.enable()
+
         # Run the object
-        while self.active:
+        while self.scenes.active:
+
+            # Drop unread event types at the source
+            self.filter_events()
+
+            # Wait for the frame first, so the input below is as fresh as possible
+            with profiler.phase("wait"):
+                slept = self.pacer.wait()
 
             # Collect events
-            events = pygame.event.get()
+            with profiler.phase("input"):
+                events = pygame.event.get()
+            sampled = time.perf_counter()
 
             # Check each event, debug it
             for event in events:
 
                 # Debug event
-                debug(event)
+                debug(event, category=("event.motion" if event.type == pygame.MOUSEMOTION
+                                       else "event"))
 
                 # break if the window was quit
                 if event.type == pygame.QUIT:
-                    self.active = None
+                    self.scenes.stop()
+
+                # Profiler keys
+                elif event.type == pygame.KEYDOWN:
+                    if event.key == Config.profiler.toggleKey:
+                        profiler.toggle()
+                    elif event.key == Config.profiler.dumpKey:
+                        for line in profiler.dump():
+                            debug(line, category="profile")
 
             # Only do stuff if not quiting
-            if self.active is not None:
+            if self.scenes.active is not None:
                 # Update the current screen with events
-                self.active.update(events)
-
-                # Draw current screen
-                self.active.draw()
+                with profiler.phase("update"):
+                    self.scenes.active.update(events)
+                simulated = time.perf_counter()
 
-                # Flip the display
-                pygame.display.flip()
+                # Draw current screen (it may have switched during update)
+                with profiler.phase("draw"):
+                    self.scenes.active.draw()
+                    profiler.draw(self.screen)
 
-                # Frame rate based on config
-                self.clock.tick(Config.screen.fps)
+                # Capture game frames, without the overlay
+                if self.capture is not None and isinstance(self.scenes.active, Game):
+                    with profiler.phase("capture"):
+                        self.capture.capture(self.scenes.active.surface)
 
-def main():
+                # Flip the display
+                with profiler.phase("flip"):
+                    pygame.display.flip()
+                flipped = time.perf_counter()
+
+                # Record frame
+                self.pacer.done(sampled, flipped)
+                if self.telemetry is not None:
+                    self.telemetry.keys(events, sampled)
+                    self.telemetry.frame(sampled, simulated, flipped, slept)
+
+            # Build preloaded scenes once the frame is shown, in the time left before the next
+            self.scenes.load_pending()
+
+            # Count tick, ending profiling after the requested count
+            self.ticks += 1
+            if self.profile is not None and self.ticks >= self.profileTicks:
+                self._finish_profile()
+
+        # End profiling early if quit first
+        if self.profile is not None:
+            self._finish_profile()
+
+        # Report input latency
+        debug(f"Input sampled {self.pacer.latency * 1000:.2f} ms before flip on average",
+              category="pacing")
+
+        # Write final telemetry
+        if self.telemetry is not None:
+            self.telemetry.write()
+
+        # Save the replay
+        if self.replay is not None:
+            self.replay.save(self.replayPath)
+            debug(f"Saved {len(self.replay)} ticks of replay to {self.replayPath}", category="replay")
+
+        # Finish writing frames
+        if self.capture is not None:
+            self.capture.close()
+            debug(self.capture.describe(), category="capture")
+
+        # Finish the trace
+        if self.tracer is not None:
+            Tracing.uninstall(trace_targets())
+            self.tracer.close()
+
+        # Stop watching or simulating
+        if self.remote is not None:
+            self.remote.close()
+
+def main(argv: typing.List[str] = None):
     """Main setup to start the game"""
 
-    # Create Main object
-    wrap = Main()
+    # Parse command line profiling options
+    parser = argparse.ArgumentParser(description=Config.screen.name)
+    parser.add_argument("--cprofile", type=int, metavar="TICKS",
+                        help="run cProfile over the first TICKS ticks")
+    parser.add_argument("--cprofile-output", default="spook.pstats",
+                        help="file the cProfile stats are dumped to")
+    parser.add_argument("--profile-dump", metavar="PATH", default=Config.profiler.dumpPath,
+                        help="file the phase report is written to by the dump key, default only logged")
+    parser.add_argument("--sample", action="store_true",
+                        help="run the sampling profiler for the whole session")
+    parser.add_argument("--sample-interval", type=float, default=Config.sampler.interval,
+                        help="seconds between samples")
+    parser.add_argument("--sample-output", default="spook.collapsed",
+                        help="file the collapsed stacks are dumped to")
+    parser.add_argument("--trace", metavar="PATH",
+                        help="write a Chrome trace of the simulation to PATH, see chrome://tracing")
+    parser.add_argument("--pacing", choices=Pacing.FramePacer.MODES, default=Config.pacing.mode,
+                        help="how to wait between frames")
+    parser.add_argument("--metrics", metavar="PATH",
+                        help="write frame telemetry to PATH in Prometheus text format")
+    parser.add_argument("--players", type=int, default=Config.player.count,
+                        help=f"players in a match, 2 to {Config.player.maxCount}")
+    parser.add_argument("--teams", type=lambda text: [int(team) for team in text.split(",")],
+                        default=Config.player.teams, metavar="T1,T2,...",
+                        help="team of each player, comma separated")
+    parser.add_argument("--stage-width", type=int, default=Config.stage.width,
+                        help="width of the stage, the view scrolls over wider stages")
+    parser.add_argument("--spectate", metavar="HOST:PORT",
+                        help="watch a match server room instead of playing, see --room")
+    parser.add_argument("--room", type=int, default=0,
+                        help="room watched with --spectate, --players must match the server")
+    parser.add_argument("--capture", metavar="PATH",
+                        help="record game frames, to a directory of images or a raw video file")
+    parser.add_argument("--capture-format", default=Config.capture.format,
+                        help="image format of captured frames (png, bmp, ...), or raw")
+    parser.add_argument("--record", metavar="PATH",
+                        help="save the input of the match as a replay, see render.py")
+    parser.add_argument("--split", action="store_true",
+                        help="simulate in a separate process, sharing state through shared memory")
+    args = parser.parse_args(argv)
+
+    # Server room to watch
+    spectate = None
+    if args.spectate:
+        host, _, port = args.spectate.rpartition(":")
+        spectate = (host or Config.server.host, int(port), args.room)
 
-    # Start object
-    wrap.start()
+    # Create Main object
+    wrap = Main(args.players, args.teams, (args.stage_width, Config.stage.height), spectate,
+                args.split, args.record)
+    wrap.pacer.mode = args.pacing
+
+    # Setup telemetry
+    if args.metrics:
+        wrap.record_telemetry(args.metrics)
+
+    # Setup frame capture
+    if args.capture:
+        wrap.record_frames(args.capture, args.capture_format)
+
+    # Setup profilers
+    profiler.dumpPath = args.profile_dump
+    if args.cprofile:
+        wrap.profile_ticks(args.cprofile, args.cprofile_output)
+    if args.trace:
+        wrap.record_trace(args.trace)
+    sampler = None
+    if args.sample:
+        sampler = Sampler.Sampler(args.sample_interval)
+        sampler.start()
+
+    # Start object, dumping samples however it exits
+    try:
+        wrap.start()
+    finally:
+        if sampler is not None:
+            sampler.stop()
+            sampler.dump(args.sample_output)
+            debug(f"Sampled to {args.sample_output}, hottest: {sampler.top(5)}", category="profile")
 
 # Run main() automatically if this is the __main__ file
 if __name__ == "__main__":
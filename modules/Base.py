@@ -10,6 +10,7 @@ import pygame
 from modules import Config
 from modules import Core
 from modules.Core import Dir, Pair
+from modules.Profiler import profiler
 
 # Base entity class that holds position and size and frames basic methods
 class Entity(pygame.sprite.Sprite):
@@ -52,44 +53,51 @@ class Entity(pygame.sprite.Sprite):
 
     def touching(self, entities, direction: Dir):
         """Checks if this Entity is aligned with any entities"""
-        # Create ghost
-        ghost = Ghost(self)
-        ghost.rect = self.rect.copy()
+        # Create hitbox, a rect is enough as nothing else needs a ghost sprite
+        rect = self.rect.copy()
 
-        # Change hitbox of ghost based on direction
+        # Change hitbox based on direction
         if direction == Dir.UP:
-            ghost.rect.height = 1
-            ghost.rect.bottom = self.rect.top
+            rect.height = 1
+            rect.bottom = self.rect.top
         elif direction == Dir.DOWN:
-            ghost.rect.height = 1
-            ghost.rect.top = self.rect.bottom
+            rect.height = 1
+            rect.top = self.rect.bottom
         elif direction == Dir.LEFT:
-            ghost.rect.width = 1
-            ghost.rect.right = self.rect.left
+            rect.width = 1
+            rect.right = self.rect.left
         elif direction == Dir.RIGHT:
-            ghost.rect.width = 1
-            ghost.rect.left = self.rect.right
+            rect.width = 1
+            rect.left = self.rect.right
         else:
             raise ValueError(f"Invalid direction {direction}")
 
-        # Return whether there was a collision
-        return ghost.collisions(entities)
+        # Return the entities collided with, never self
+        colliderect = rect.colliderect
+        return [entity for entity in entities if entity is not self and colliderect(entity.rect)]
 
     def collisions(self, entities):
-        """Returns a group of the entiites there is a collisions with in group 'entities'"""
-        return pygame.sprite.Group(
-            *pygame.sprite.spritecollide(self, entities, False, collided=Core.collides)
-        )
+        """Returns a list of the entities there is a collision with in group 'entities'\n
+        A list rather than a Group: sprites keep a reference to every Group they are in,
+        so short lived Groups would never be freed
+        """
+        return pygame.sprite.spritecollide(self, entities, False, collided=Core.collides)
 
-    def move(self, dX: int, dY: int, entities: pygame.sprite.Group):
-        """Moves to a new position and takes into account collisions"""
+    def move(self, dX: int, dY: int, entities: pygame.sprite.Group, collided: Pair = None):
+        """Moves to a new position and takes into account collisions\n
+        Returns a Pair of whether x/y collided, reusing 'collided' if given
+        """
 
         # Determine directions, with default to prevent non-movement crashes
         directionX = Dir.direction_x(dX, default=Dir.RIGHT)
         directionY = Dir.direction_y(dY, default=Dir.DOWN)
 
-        # Create collision saver
-        collided = Pair(False, False)
+        # Create or reset collision saver
+        if collided is None:
+            collided = Pair(False, False)
+        else:
+            collided.x = False
+            collided.y = False
 
         # Construct future position
         future = self.rect.copy()
@@ -102,11 +110,11 @@ class Entity(pygame.sprite.Sprite):
         # Check collisions
         collisions = ghost.collisions(entities)
         # Set of already check barriers
-        checked = pygame.sprite.Group()
+        checked = set()
         # Fix each collision
         while len(collisions) > 0:
             # Reference current
-            current = list(collisions)[0]
+            current = collisions[0]
             # Check if barrier is solid (on edge opposing movement)
             if current.solid(-directionX):
                 # Remember collision
@@ -118,23 +126,23 @@ class Entity(pygame.sprite.Sprite):
                 checked.add(current)
             # Recheck for collisions
             collisions = ghost.collisions(entities)
-            collisions.remove(checked)
+            collisions = [sprite for sprite in collisions if sprite not in checked]
         # Save rect x
         future.x = ghost.rect.x
 
-        # Reset ghost
-        ghost = Ghost(self)
+        # Reset ghost, reusing it saves building a sprite per axis
+        ghost.rect = self.rect.copy()
 
         # Check Y movement
         ghost.rect.y += dY
         # Check collisions
         collisions = ghost.collisions(entities)
         # Set of already check barriers
-        checked = pygame.sprite.Group()
+        checked = set()
         # Fix each collision
         while len(collisions) > 0:
             # Reference current
-            current = list(collisions)[0]
+            current = collisions[0]
             # Check if barrier is solid (on edge opposing movement)
             if current.solid(-directionY):
                 # Remember collision
@@ -146,13 +154,12 @@ class Entity(pygame.sprite.Sprite):
                 checked.add(current)
             # Recheck for collisions
             collisions = ghost.collisions(entities)
-            collisions.remove(checked)
+            collisions = [sprite for sprite in collisions if sprite not in checked]
         # Save rect y
         future.y = ghost.rect.y
 
         # Check corner case (literally when collision is only diagonal)
         # Put ghost at future
-        ghost = Ghost(self)
         ghost.rect = future
 
         # Check collisions
@@ -160,7 +167,7 @@ class Entity(pygame.sprite.Sprite):
         # Fix each collision
         while len(collisions) > 0:
             # Reference current
-            current = list(collisions)[0]
+            current = collisions[0]
             # Check if edge is solid based on direction
             if current.solid(-directionX) or current.solid(-directionY):
                 # Remember collision
@@ -174,7 +181,7 @@ class Entity(pygame.sprite.Sprite):
                 checked.add(current)
             # Recheck for collisions
             collisions = ghost.collisions(entities)
-            collisions.remove(checked)
+            collisions = [sprite for sprite in collisions if sprite not in checked]
 
         # Move ghost to self
         self.rect = ghost.rect
@@ -182,29 +189,29 @@ class Entity(pygame.sprite.Sprite):
         # Return the collided pair
         return collided
 
+# Collision phases of the profiler, only wrapped while it is recording
+profiler.time_method(Entity, "touching", "collision.touching")
+profiler.time_method(Entity, "move", "collision.move")
+
 # Ghost Entity Class (for collision detection)
 class Ghost(Entity):
     """Represents a Ghost entity that is an alias of another Entity for collisions"""
 
     def __init__(self, alias: Entity):
-        super().__init__(alias.rect.copy())
+        # Share the alias image, a ghost is never drawn so it needs no surface of its own
+        super().__init__(alias.rect.copy(), alias.image)
 
         # Reference alias
         self.alias = alias
 
     def collisions(self, entities):
         """Checks for collisions in SpriteGroup, not colliding with self or alias"""
-        return pygame.sprite.Group(
-            *pygame.sprite.spritecollide(self, entities, False, collided=self._collides)
-        )
-
-    def _collides(self, this, other):
-        """For use with the collisions method"""
-        return (
-            (this is not other) # Not colliding with the ghost somehow
-            and (other is not self.alias) # Will not collide with the alias
-            and (pygame.sprite.collide_rect(this, other)) # Actual collision detection
-        )
+        alias = self.alias
+        colliderect = self.rect.colliderect
+        return [
+            entity for entity in entities
+            if entity is not self and entity is not alias and colliderect(entity.rect)
+        ]
 
     def update(self, game: "Game"):
         """Updates the entity"""
@@ -230,7 +237,7 @@ class Controller(pygame.sprite.Sprite):
 # Could be used manually to add projectiles to it, but is also
 # Used a lot in the Mechanics file to implement custom attack
 class Attack(Controller):
-    """Abstract Base class for attack controllers that manage projectiles"""
+    """Abstract Base class for attack controllers that spawn projectiles"""
 
     def __init__(self, player: "Player", cooldown: int, lifeSpan: int):
         super().__init__(player.rect.copy())
@@ -245,21 +252,21 @@ class Attack(Controller):
         self.tick = 0
         self.lifeSpan = lifeSpan
 
-        # Dictionary of lists for holding projectiles
+        # Dictionary of lists of projectiles to spawn, by birth tick
         self.projectileBuffer = {}
 
-        # Group of active projectiles
-        self.projectiles = pygame.sprite.Group()
-
-    def add_projectile(self, projectile, birthTick: int):
-        """Adds a projectile to the Attack to monitor\n
-        The projectile will be added to a 'Game' on the birth tick
+    def add_projectile(self, birthTick: int, rect: pygame.Rect,
+                       hitState: Core.HitState = None, **options):
+        """Adds a projectile to be spawned into the game's projectile system on the birth tick\n
+        The player owns it, so it only hits opponents, applying hitState if given.
+        options are passed on to ProjectileSystem.spawn(), rect is placed against
+        the player as of this attack, following projectiles catch up with the player when born
         """
         # Add or create the projectile to a list in the projBuffer
         if birthTick in self.projectileBuffer:
-            self.projectileBuffer[birthTick].add(projectile)
+            self.projectileBuffer[birthTick].append((rect, hitState, options))
         else:
-            self.projectileBuffer[birthTick] = [projectile]
+            self.projectileBuffer[birthTick] = [(rect, hitState, options)]
 
     def update(self, game: "Game"):
         """Updates the entity"""
@@ -271,10 +278,20 @@ class Attack(Controller):
 
         # Check if projectiles should be created
         if self.tick in self.projectileBuffer:
-            # Add the projectiles to the game
-            game.add_projectiles(self.projectileBuffer[self.tick])
-            # Remove that set from the dict
-            del self.projectileBuffer[self.tick]
+            system = game.get_projectile_system()
+            player = self.player
+            # Spawn the projectiles, removing that set from the dict
+            for rect, hitState, options in self.projectileBuffer.pop(self.tick):
+                if options.get("follow"):
+                    rect = rect.move(player.rect.x - self.rect.x, player.rect.y - self.rect.y)
+                if hitState is not None:
+                    hitState = system.register_hit_state(hitState)
+                system.spawn(rect, owner=player,
+                             hitState=system.NONE if hitState is None else hitState, **options)
+
+        # Drop projectiles that will never be born
+        if self.tick >= self.lifeSpan:
+            self.projectileBuffer.clear()
 
 # Basic barrier class
 class Barrier(Entity):
@@ -337,11 +354,19 @@ class Label(pygame.sprite.Sprite):
         self.rect = pygame.Rect(position, self.font.size(str(self.text.value)))
 
         # Render
+        self.rendered = None
         self._render()
 
     def _render(self):
-        """Renders the new text onto internal image"""
-        self.image = self.font.render(str(self.text.value), True, self.color, self.bgColor)
+        """Renders the new text onto internal image, if it changed"""
+        text = str(self.text.value)
+        if text != self.rendered:
+            self.image = self.font.render(text, True, self.color, self.bgColor)
+            self.rendered = text
+
+    def subscribe(self, bus: Core.EventBus):
+        """Declares the events the label reads"""
+        bus.subscribe(pygame.MOUSEBUTTONDOWN)
 
     # The game argument needs to be there for ducktyping higher in the hierchy
     # Also it might be used later
@@ -349,13 +374,13 @@ class Label(pygame.sprite.Sprite):
         """Updates the entity"""
 
         # Check for click
-        for event in game.events:
+        for event in game.get_events(pygame.MOUSEBUTTONDOWN):
 
             # TODO allow customizable mouse action (down/up)?
             # or look for full down and up CLICK action
 
-            # Check for mouseevent and within bounds
-            if event.type == pygame.MOUSEBUTTONDOWN and self.rect.collidepoint(event.pos):
+            # Check within bounds
+            if self.rect.collidepoint(event.pos):
                 # Call callback
                 self.callback()
 
@@ -0,0 +1,291 @@
+"""Delta-compressed match state broadcast for spectators of Spook Fighters"""
+
+# Import bundled modules
+import struct
+import time
+import typing
+
+# Import structure libraries
+import pygame
+
+# Import local files
+from modules import Config
+
+# Base tick of a packet holding the full state
+NO_BASE = 0xFFFFFFFF
+
+# Delta packet: tick, base tick (NO_BASE for full), changed player count
+DELTA_HEAD = struct.Struct("<IIB")
+# Changed player: index, mask of the fields that follow
+PLAYER_HEAD = struct.Struct("<BB")
+# Player fields in mask bit order: x, y, xSpeed, ySpeed, damage, lives, stun, cooldown
+PLAYER_FIELDS = tuple(struct.Struct("<" + code) for code in "iihhHbHH")
+# Projectile sections, each a count then entries
+COUNT = struct.Struct("<H")
+DESPAWN = struct.Struct("<I")
+SPAWN = struct.Struct("<IiiHHBBB")
+MOVE = struct.Struct("<Iii")
+
+# Snapshot of what a spectator sees
+class Snapshot:
+    """State of a game at a tick\n
+    players - tuple of field tuples, see PLAYER_FIELDS\n
+    projectiles - id to (x, y, width, height, color)
+    """
+
+    __slots__ = ("tick", "players", "projectiles")
+
+    def __init__(self, tick: int, players: tuple, projectiles: dict):
+        self.tick = tick
+        self.players = players
+        self.projectiles = projectiles
+
+def _clamp(value: int, low: int, high: int) -> int:
+    """Returns the value limited to a range"""
+    return max(low, min(int(value), high))
+
+def encode(base: typing.Optional[Snapshot], current: Snapshot) -> bytes:
+    """Returns the fields of current changed since base, the full state if base is None"""
+    basePlayers = () if base is None else base.players
+    baseProjectiles = {} if base is None else base.projectiles
+
+    # Players, with only their changed fields
+    players = []
+    changed = 0
+    for index, fields in enumerate(current.players):
+        old = basePlayers[index] if index < len(basePlayers) else None
+        mask = 0
+        packed = []
+        for bit, value in enumerate(fields):
+            if old is None or old[bit] != value:
+                mask |= 1 << bit
+                packed.append(PLAYER_FIELDS[bit].pack(value))
+        if mask:
+            players.append(PLAYER_HEAD.pack(index, mask))
+            players.extend(packed)
+            changed += 1
+
+    # Projectiles that went away, appeared, or moved
+    projectiles = current.projectiles
+    despawned = [number for number in baseProjectiles if number not in projectiles]
+    spawned = []
+    moved = []
+    for number, entry in projectiles.items():
+        old = baseProjectiles.get(number)
+        if old is None:
+            spawned.append(SPAWN.pack(number, *entry[:4], *entry[4]))
+        elif old[0] != entry[0] or old[1] != entry[1]:
+            moved.append(MOVE.pack(number, entry[0], entry[1]))
+
+    return b"".join((
+        DELTA_HEAD.pack(current.tick, NO_BASE if base is None else base.tick, changed),
+        *players,
+        COUNT.pack(len(despawned)), *(DESPAWN.pack(number) for number in despawned),
+        COUNT.pack(len(spawned)), *spawned,
+        COUNT.pack(len(moved)), *moved,
+    ))
+
+def decode(data: bytes, offset: int,
+           states: typing.Dict[int, Snapshot]) -> typing.Optional[Snapshot]:
+    """Returns the snapshot of a delta packet starting at offset\n
+    states - snapshots already decoded, by tick. None is returned if the base is missing
+    """
+    tick, baseTick, changed = DELTA_HEAD.unpack_from(data, offset)
+    offset += DELTA_HEAD.size
+    if baseTick == NO_BASE:
+        players, projectiles = [], {}
+    else:
+        base = states.get(baseTick)
+        if base is None:
+            return None
+        players, projectiles = list(base.players), dict(base.projectiles)
+
+    # Players
+    for _ in range(changed):
+        index, mask = PLAYER_HEAD.unpack_from(data, offset)
+        offset += PLAYER_HEAD.size
+        while len(players) <= index:
+            players.append((0,) * len(PLAYER_FIELDS))
+        fields = list(players[index])
+        for bit, field in enumerate(PLAYER_FIELDS):
+            if mask & (1 << bit):
+                fields[bit], = field.unpack_from(data, offset)
+                offset += field.size
+        players[index] = tuple(fields)
+
+    # Projectiles
+    count, = COUNT.unpack_from(data, offset)
+    offset += COUNT.size
+    for _ in range(count):
+        number, = DESPAWN.unpack_from(data, offset)
+        offset += DESPAWN.size
+        projectiles.pop(number, None)
+    count, = COUNT.unpack_from(data, offset)
+    offset += COUNT.size
+    for _ in range(count):
+        number, x, y, width, height, red, green, blue = SPAWN.unpack_from(data, offset)
+        offset += SPAWN.size
+        projectiles[number] = (x, y, width, height, (red, green, blue))
+    count, = COUNT.unpack_from(data, offset)
+    offset += COUNT.size
+    for _ in range(count):
+        number, x, y = MOVE.unpack_from(data, offset)
+        offset += MOVE.size
+        entry = projectiles[number]
+        projectiles[number] = (x, y) + entry[2:]
+
+    return Snapshot(tick, tuple(players), projectiles)
+
+# Spectator of a broadcaster
+class Viewer:
+    """A spectator, with how to send to it and the last tick it acknowledged"""
+
+    def __init__(self, send: typing.Callable[[bytes], None]):
+        self.send = send
+        self.acked = None
+        self.seen = time.monotonic()
+
+# State capture and broadcast
+class Broadcaster:
+    """Captures a game each tick and sends every viewer the changes since its last ack\n
+    Viewers acking the same tick share one encoded packet
+    """
+
+    def __init__(self, game, prefix: bytes = b"", history: int = Config.broadcast.history):
+
+        # Reference game, and the bytes every packet starts with
+        self.game = game
+        self.players = list(game.get_players())
+        self.prefix = prefix
+
+        # Past snapshots by tick, deltas are encoded against these
+        self.history = history
+        self.states = {}
+
+        # Viewers by key
+        self.viewers = {}
+
+        # Bytes and packets sent
+        self.sent = 0
+        self.packets = 0
+
+    def __len__(self):
+        """Returns the number of viewers"""
+        return len(self.viewers)
+
+    def add(self, key, send: typing.Callable[[bytes], None]):
+        """Adds a viewer, which gets the full state first"""
+        if key not in self.viewers:
+            self.viewers[key] = Viewer(send)
+
+    def remove(self, key):
+        """Removes a viewer"""
+        self.viewers.pop(key, None)
+
+    def ack(self, key, tick: int):
+        """Records that a viewer has the state of a tick"""
+        viewer = self.viewers.get(key)
+        if viewer is not None:
+            viewer.seen = time.monotonic()
+            if tick in self.states and (viewer.acked is None or tick > viewer.acked):
+                viewer.acked = tick
+
+    def capture(self, tick: int) -> Snapshot:
+        """Returns the snapshot of the game"""
+        players = tuple(
+            (player.rect.x, player.rect.y,
+             _clamp(player.xSpeed, -0x8000, 0x7FFF), _clamp(player.ySpeed, -0x8000, 0x7FFF),
+             _clamp(player.damage.value, 0, 0xFFFF), _clamp(player.lives.value, -0x80, 0x7F),
+             _clamp(player.stun, 0, 0xFFFF), _clamp(player.cooldown, 0, 0xFFFF))
+            for player in self.players
+        )
+
+        # Projectiles are numbered by their entity
+        system = self.game.get_projectile_system()
+        transforms = system.transforms.fields
+        colors = [tuple(color)[:3] for color in system.colors]
+        projectiles = {
+            entity & 0xFFFFFFFF: (int(x), int(y), width, height, colors[color])
+            for entity, x, y, width, height, color in zip(
+                system.projectiles.entities, transforms["x"], transforms["y"],
+                transforms["width"], transforms["height"], system.projectiles.fields["color"],
+            )
+        }
+
+        return Snapshot(tick, players, projectiles)
+
+    def broadcast(self, tick: int):
+        """Captures the tick and sends it to every viewer"""
+
+        # Drop viewers that went quiet
+        deadline = time.monotonic() - Config.broadcast.timeout
+        for key in [key for key, viewer in self.viewers.items() if viewer.seen < deadline]:
+            self.remove(key)
+        if not self.viewers:
+            return
+
+        current = self.capture(tick)
+        self.states[tick] = current
+        # Ticks can be skipped, so drop every state that fell out of the history
+        stale = tick - self.history
+        for old in [old for old in self.states if old <= stale]:
+            del self.states[old]
+
+        # Encode once per distinct base
+        packets = {}
+        for viewer in self.viewers.values():
+            base = viewer.acked if viewer.acked in self.states else None
+            packet = packets.get(base)
+            if packet is None:
+                packet = packets[base] = self.prefix + encode(
+                    None if base is None else self.states[base], current
+                )
+            viewer.send(packet)
+            self.sent += len(packet)
+            self.packets += 1
+
+# Drawn stand-in for a remote projectile
+class Marker(pygame.sprite.Sprite):
+    """Sprite showing a projectile of a remote game, it never updates itself"""
+
+    def __init__(self, rect: pygame.Rect, color):
+        super().__init__()
+        self.rect = rect
+        self.image = pygame.Surface(rect.size)
+        self.image.fill(color)
+
+    def update(self, game):
+        """Markers are moved by their Replica"""
+
+# Game mirrored from snapshots
+class Replica:
+    """Applies snapshots to a game's players and projectiles without simulating it"""
+
+    def __init__(self, game):
+
+        # Reference game
+        self.game = game
+        self.players = list(game.get_players())
+
+        # Markers by projectile id
+        self.markers = {}
+
+    def apply(self, snapshot: Snapshot):
+        """Sets the game to the snapshot"""
+        game = self.game
+        for player, fields in zip(self.players, snapshot.players):
+            (player.rect.x, player.rect.y, player.xSpeed, player.ySpeed,
+             player.damage.value, player.lives.value, player.stun, player.cooldown) = fields
+            player.refresh_image(game)
+
+        markers = self.markers
+        for number in [number for number in markers if number not in snapshot.projectiles]:
+            markers.pop(number).kill()
+        for number, (x, y, width, height, color) in snapshot.projectiles.items():
+            marker = markers.get(number)
+            # Markers are dropped from the game when it is restored
+            if marker is None or not marker.alive():
+                marker = markers[number] = Marker(pygame.Rect(x, y, width, height), color)
+                game.add_markers(marker)
+            else:
+                marker.rect.topleft = (x, y)
@@ -0,0 +1,64 @@
+"""Camera following the action across stages larger than the screen"""
+
+# Import bundled modules
+import typing
+
+# Import structure libraries
+import pygame
+
+# Import local files
+from modules import Config
+
+# Camera class
+class Camera:
+    """View onto part of a stage, in stage coordinates, easing towards its targets\n
+    The view is kept inside the stage, so a stage no larger than the view never scrolls
+    """
+
+    def __init__(self, size: typing.Tuple[int, int], stage: pygame.Rect,
+                 smoothing: float = Config.camera.smoothing):
+
+        # Reference stage bounds
+        self.stage = stage
+        self.smoothing = smoothing
+
+        # View, starting at the middle of the stage
+        self.rect = pygame.Rect((0, 0), size)
+        self.rect.center = stage.center
+
+        # Exact position, the rect is rounded from it
+        self.x = float(self.rect.x)
+        self.y = float(self.rect.y)
+        self._clamp()
+
+    def _clamp(self):
+        """Keeps the view inside the stage and rounds it into the rect"""
+        stage, rect = self.stage, self.rect
+        self.x = max(stage.left, min(self.x, stage.right - rect.width))
+        self.y = max(stage.top, min(self.y, stage.bottom - rect.height))
+        rect.x = round(self.x)
+        rect.y = round(self.y)
+
+    def follow(self, targets: typing.Iterable[pygame.sprite.Sprite]):
+        """Eases the view towards the middle of the targets"""
+        rects = [target.rect for target in targets]
+        if not rects:
+            return
+        box = rects[0].unionall(rects[1:])
+        self.x += (box.centerx - self.rect.width / 2 - self.x) * self.smoothing
+        self.y += (box.centery - self.rect.height / 2 - self.y) * self.smoothing
+        self._clamp()
+
+    def move_to(self, x: float, y: float):
+        """Places the top left of the view, kept inside the stage"""
+        self.x = x
+        self.y = y
+        self._clamp()
+
+    def visible(self, rect: pygame.Rect) -> bool:
+        """Returns whether the rect is at least partly in view"""
+        return self.rect.colliderect(rect)
+
+    def offset(self) -> typing.Tuple[int, int]:
+        """Returns the offset from stage to screen coordinates"""
+        return (-self.rect.x, -self.rect.y)
@@ -0,0 +1,130 @@
+"""Frame capture to image sequences or raw video for Spook Fighters"""
+
+# Import bundled modules
+import os
+import queue
+import threading
+import typing
+
+# Import structure libraries
+import pygame
+
+# Import local files
+from modules import Config
+
+# Frame capture class
+class FrameCapture:
+    """Copies frames into a ring of preallocated buffers, written out by a worker thread\n
+    The caller only pays for one straight copy of the surface's pixel memory per frame,
+    conversion to rgb happens on the worker. When every buffer is
+    still waiting to be written the frame is dropped instead of waiting, so a slow
+    disk costs frames from the recording rather than from the game.\n
+    Formats: 'raw' appends rgb24 frames to one file, anything else (png, bmp, tga, jpg)
+    saves numbered images into a directory
+    """
+
+    # Formats written as one file of frames instead of an image sequence
+    RAW = "raw"
+
+    def __init__(self, path: str, size: typing.Tuple[int, int],
+                 format: str = Config.capture.format, #pylint: disable=redefined-builtin
+                 capacity: int = Config.capture.capacity):
+        """path - raw video file, or directory of images\n
+        size - (width, height) of the frames\n
+        capacity - frames buffered before new ones are dropped
+        """
+
+        # Output
+        self.path = path
+        self.size = size
+        self.format = format
+        if format == self.RAW:
+            self.file = open(path, "wb")
+        else:
+            self.file = None
+            os.makedirs(path, exist_ok=True)
+
+        # Ring of frame buffers, holding surface pixel memory as is,
+        # allocated with the surface format by the first capture
+        self.capacity = capacity
+        self.frames = None
+        self.image = None
+
+        # Indices of buffers free to fill, and of filled buffers in frame order
+        self.free = queue.Queue()
+        for index in range(capacity):
+            self.free.put(index)
+        self.filled = queue.Queue()
+
+        # Counts
+        self.captured = 0
+        self.written = 0
+        self.dropped = 0
+
+        # Writer thread, stopped by a None index
+        self.thread = threading.Thread(target=self._run, name="capture", daemon=True)
+        self.thread.start()
+
+    def capture(self, surface: pygame.Surface, wait: bool = False) -> bool:
+        """Queues a copy of the surface, returning False if it was dropped\n
+        wait - wait for a free buffer instead of dropping, for offline rendering
+        """
+        try:
+            index = self.free.get(block=wait)
+        except queue.Empty:
+            self.dropped += 1
+            return False
+
+        if self.frames is None:
+            self._allocate(surface)
+
+        # The view locks the surface until it is released
+        pixels = surface.get_view("0")
+        self.frames[index][:] = memoryview(pixels).cast("B")
+        del pixels
+
+        self.filled.put(index)
+        self.captured += 1
+        return True
+
+    def _allocate(self, surface: pygame.Surface):
+        """Sizes the ring and the conversion for the format of the surface"""
+        size = surface.get_pitch() * surface.get_height()
+        self.frames = [memoryview(bytearray(size)) for _ in range(self.capacity)]
+        # Surface of the same format frames are saved or converted through
+        self.image = pygame.Surface(self.size, 0, surface)
+
+    def _run(self):
+        """Writer thread loop"""
+        while True:
+            index = self.filled.get()
+            if index is None:
+                break
+            self._write(self.frames[index])
+            self.written += 1
+            self.free.put(index)
+
+    def _write(self, frame: memoryview):
+        """Writes one frame"""
+        self.image.get_buffer().write(frame.tobytes())
+        if self.file is not None:
+            # Packed rgb24, without row padding or unused bytes
+            self.file.write(pygame.image.tostring(self.image, "RGB"))
+        else:
+            pygame.image.save(self.image, os.path.join(self.path, f"{self.written:06d}.{self.format}"))
+
+    def close(self):
+        """Writes the remaining frames and stops the writer"""
+        self.filled.put(None)
+        self.thread.join()
+        if self.file is not None:
+            self.file.close()
+
+    def describe(self) -> str:
+        """Returns a summary of the capture, with how to encode raw video"""
+        summary = f"Captured {self.written} frames to {self.path}, dropped {self.dropped}"
+        if self.file is not None:
+            width, height = self.size
+            summary += (f" (encode with: ffmpeg -f rawvideo -pix_fmt rgb24 -s {width}x{height}"
+                        f" -r {Config.screen.fps} -i {self.path} out.mp4)")
+        return summary
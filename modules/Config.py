@@ -1,6 +1,9 @@
 """Config file"""
 # Config file for Spook Fighters Py
 
+# Import pygame (for key constants)
+import pygame
+
 # Import Core
 from modules import Core
 
@@ -17,6 +20,99 @@ class screen:
     # Frames (ticks) per second max of the game
     fps = 60
 
+class scenes:
+    """Config for scene management"""
+
+    # Approximate bytes of built scenes kept before suspended ones are freed
+    memoryBudget = 32 * 1024 * 1024
+
+class profiler:
+    """Config for the tick profiler overlay"""
+
+    # Number of recent samples percentiles are taken over
+    window = 300
+
+    # Keys to toggle the overlay and dump the report
+    toggleKey = pygame.K_F3
+    dumpKey = pygame.K_F4
+
+    # File the report is dumped to, None to log it instead (see main --profile-dump)
+    dumpPath = None
+
+    # Frames between overlay re-renders
+    overlayInterval = 30
+
+    # Overlay text size and position on screen
+    textSize = 14
+    position = (0, 50)
+
+class tracing:
+    """Config for Chrome trace export"""
+
+    # File to write the trace to, tracing is off if None
+    path = None
+
+    # Spans buffered before being handed to the writer thread
+    bufferSize = 4096
+
+class sampler:
+    """Config for the sampling profiler"""
+
+    # Seconds between stack samples
+    interval = 0.005
+
+class telemetry:
+    """Config for frame telemetry"""
+
+    # Seconds between writes of the metrics file
+    interval = 10
+
+    # Histogram bucket upper bounds, in seconds
+    buckets = (0.001, 0.002, 0.004, 0.008, 0.012, 0.016, 0.02, 0.033, 0.05, 0.1, 0.25)
+
+    # Frames longer than this multiple of the target frame time count as missed
+    missedFactor = 1.5
+
+class capture:
+    """Config for frame capture"""
+
+    # Image format of captured frames, or "raw" for one file of rgb24 frames
+    format = "bmp"
+
+    # Frames waiting to be written before new ones are dropped (about two seconds)
+    capacity = 120
+
+class log:
+    """Config for debug logging"""
+
+    # Categories never logged (mouse motion floods the log)
+    muted = ("event.motion",)
+
+    # Records waiting to be written before new ones are dropped
+    queueSize = 1024
+
+    # Records per second allowed for each category, and the burst above that
+    rate = 50
+    burst = 100
+
+class pacing:
+    """Config for frame pacing"""
+
+    # How to wait for the next frame: "sleep", "busy" or "hybrid"
+    mode = "sleep"
+
+    # Seconds before the wake time that hybrid mode stops sleeping and spins
+    spinMargin = 0.002
+
+    # Wake just in time for the frame's work, rather than at the start of the frame
+    lateSampling = True
+
+    # Margin multiplied onto measured frame work when deciding when to wake
+    workSafety = 1.25
+
+    # Weight of each new frame in the smoothed work and latency figures
+    smoothing = 0.1
+
 class game:
     """General configuration for the game"""
 
@@ -61,6 +157,9 @@ class hud:
     lifeYPosition = yPosition - damageHeight
     lifeHeight = damageHeight
 
+    # Position of the reset button, right of the menu button
+    resetXPosition = 120
+
     # Default font used from system
     # Should probably also add True font or something
     # Ideally would always be monospace?
@@ -73,10 +172,45 @@ class stage:
     killDistance = 100
     killBoxWidth = 100
 
-    # Respawn
-    respawnX = game.width / 2
+    # Width and height of the stage, the camera scrolls if it is larger than the game area
+    width = game.width
+    height = game.height
+
+    # Respawn height, respawns are centered horizontally on the stage
     respawnY = 100
 
+    # Margin between the stage edges and the floor players spawn over
+    spawnMargin = 100
+
+    # Widest spacing between spawn points, and the least gap between spawned players
+    spawnSpacing = 150
+    spawnGap = 10
+
+class camera:
+    """Config for the camera"""
+
+    # Fraction of the way to its target the camera moves each tick
+    smoothing = 0.1
+
+    # Cell size of the spatial index of static scenery
+    cellSize = 256
+
+class projectiles:
+    """Config for projectile limits"""
+
+    # Most live projectiles, None for no limit
+    limit = 1024
+
+    # Which projectiles give way past the limit: "oldest" or "farthest" (from the view)
+    # are removed to make room, or new ones are dropped with "reject"
+    eviction = "oldest"
+
+class broadphase:
+    """Config for the broadphase of hit resolution"""
+
+    # Width and height of a spatial hash cell, a few players wide works best
+    cellSize = 100
+
 class player:
     """Config for players"""
 
@@ -111,6 +245,27 @@ class player:
 
     )
 
+    # Players in a match by default, and the most supported
+    count = 2
+    maxCount = 16
+
+    # Team of each player by default, None for every player for themselves
+    teams = None
+
+    # Keysets of the first players, the rest are driven by bots
+    keysets = (keys1, keys2)
+
+    # Bot driving players without a keyset, see Inputs.BOTS
+    bot = "recovery"
+
+    # Color of each player, in order
+    colors = (
+        Core.Color.ORANGE, Core.Color.BLUE, Core.Color.RED, Core.Color.PURPLE,
+        Core.Color.YELLOW, Core.Color.GREEN, Core.Color.WHITE, (63, 0, 127),
+        (127, 0, 0), (0, 0, 127), (127, 0, 127), (127, 127, 0),
+        (255, 127, 127), (127, 127, 255), (127, 255, 127), (255, 191, 0),
+    )
+
     # Attributes
     attributes = Core.PlayerAttributes(
         speed=4,
@@ -149,8 +304,12 @@ class attack:
             vector=Core.Vector(0.5, -0.3)
         )
 
-        upHitState = hitState.copy()
-        upHitState.vector = Core.Vector(0, -0.75)
+        upHitState = Core.HitState(
+            damage=hitState.damage,
+            force=hitState.force,
+            varForce=hitState.varForce,
+            vector=Core.Vector(0, -0.75)
+        )
 
     class sword:
         """Attacks for the swordsman class"""
@@ -175,3 +334,53 @@ class attack:
             # Width and height of the actual projectile
             width = 20
             height = 20
+
+class environment:
+    """Config for the training environment"""
+
+    # Ticks before an episode is cut off
+    maxTicks = screen.fps * 180
+
+    # Bot driving the opponents, see Inputs.BOTS
+    opponent = "recovery"
+
+    # Projectiles nearest the agent included in observations
+    projectiles = 4
+
+    # Processes a VectorEnvironment shards its environments across, 1 steps them in the caller
+    workers = 1
+
+    # Reward per point of damage dealt (and penalty per point taken)
+    damageReward = 0.01
+
+    # Reward per life taken from an opponent (and penalty per life lost)
+    lifeReward = 1.0
+
+class server:
+    """Config for the match server"""
+
+    # Address the server listens on, over both UDP and TCP
+    host = "127.0.0.1"
+    port = 5067
+
+    # Rooms hosted, and players per room
+    rooms = 4
+    players = 2
+
+    # Ticks per second of every room
+    rate = screen.fps
+
+    # Seconds without input before a client is dropped
+    timeout = 10.0
+
+    # Seconds a shard process has to start serving before the server gives up
+    startTimeout = 10.0
+
+class broadcast:
+    """Config for spectator state broadcast"""
+
+    # Ticks of past states kept to encode deltas against, older acks get full states
+    history = 64
+
+    # Seconds without an ack before a spectator is dropped
+    timeout = 10.0
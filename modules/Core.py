@@ -3,16 +3,20 @@
 # Import core libraries
 from dataclasses import dataclass
 from enum import Enum
+import struct
 import typing
 
 # Import structure libraries
 import pygame
 
 # Define basic classes
+# Value types declare __slots__ so instances carry no __dict__
 @dataclass
 class Pair:
     """Pair class collecting an x and y"""
 
+    __slots__ = ("x", "y")
+
     x: typing.Any
     y: typing.Any
 
@@ -28,15 +32,11 @@ class Dir(Enum):
     @classmethod
     def opposite(cls, direction):
         """Returns the opposite direction"""
-        return {
-            cls.UP: cls.DOWN, cls.DOWN: cls.UP,
-            cls.LEFT: cls.RIGHT, cls.RIGHT: cls.LEFT,
-            cls.NONE: cls.NONE
-        }[direction]
+        return _OPPOSITES[direction]
 
     def __neg__(self):
-        """Negates the direction by calling .opposite(self)"""
-        return type(self).opposite(self)
+        """Negates the direction using the precomputed opposites"""
+        return _OPPOSITES[self]
 
     @classmethod
     def direction_x(cls, value, default=None):
@@ -62,6 +62,13 @@ class Dir(Enum):
         else:
             return default
 
+# Precomputed lookup for Dir.opposite, built once instead of every call
+_OPPOSITES = {
+    Dir.UP: Dir.DOWN, Dir.DOWN: Dir.UP,
+    Dir.LEFT: Dir.RIGHT, Dir.RIGHT: Dir.LEFT,
+    Dir.NONE: Dir.NONE
+}
+
 class Color:
     """Color RGB constants"""
 
@@ -100,10 +107,15 @@ class AttributeSet:
         for attribute in attrs:
             setattr(self, attribute, attrs[attribute])
 
-@dataclass
+@dataclass(frozen=True)
 class PlayerAttributes:
     """Stores various data about the behavior of the player"""
 
+    __slots__ = (
+        "speed", "maxSpeed", "jump", "fastfall", "gravity",
+        "airJumps", "slide", "wallJumpFreeze", "ySpeedStun", "xSpeedStun",
+    )
+
     speed: int # Horizontal acceleration
     maxSpeed: int # Maximum horizontal speed
     jump: int
@@ -118,10 +130,12 @@ class PlayerAttributes:
     ySpeedStun: int
     xSpeedStun: int
 
-@dataclass
+@dataclass(frozen=True)
 class Keyset:
     """Keyset representing the character mappings for a player object"""
 
+    __slots__ = ("LEFT", "RIGHT", "UP", "DOWN", "ACTION", "ATTACK")
+
     LEFT: int
     RIGHT: int
     UP: int
@@ -130,14 +144,56 @@ class Keyset:
     ACTION: int
     ATTACK: int
 
+    def table(self) -> typing.Dict[int, int]:
+        """Compiles the keyset into a key to Input bit lookup table"""
+        return {
+            self.UP: Input.UP, self.DOWN: Input.DOWN,
+            self.LEFT: Input.LEFT, self.RIGHT: Input.RIGHT,
+            self.ACTION: Input.ACTION, self.ATTACK: Input.ATTACK,
+        }
+
+class Input:
+    """Bit of each player input within an input mask\n
+    A tick of input is three masks, (pressed, released, held), which is compact
+    enough to store directly in replays, send in packets or produce from bots
+    """
+
+    NONE = 0
+
+    UP = 1 << 0
+    DOWN = 1 << 1
+    LEFT = 1 << 2
+    RIGHT = 1 << 3
+
+    ACTION = 1 << 4
+    ATTACK = 1 << 5
+
+    ALL = (1 << 6) - 1
+
+    # struct format of a packed tick of input
+    FORMAT = "<BBB"
+    SIZE = struct.calcsize(FORMAT)
+
+    @classmethod
+    def pack(cls, pressed: int, released: int, held: int) -> bytes:
+        """Packs a tick of input masks into bytes"""
+        return struct.pack(cls.FORMAT, pressed, released, held)
+
+    @classmethod
+    def unpack(cls, data: bytes, offset: int = 0) -> typing.Tuple[int, int, int]:
+        """Unpacks a tick of input masks from bytes, returning (pressed, released, held)"""
+        return struct.unpack_from(cls.FORMAT, data, offset)
+
 def collides(spriteA, spriteB):
     """Returns true if sprites arent the same, and if collide_rect returns true"""
     return (spriteA is not spriteB) and (pygame.sprite.collide_rect(spriteA, spriteB))
 
-@dataclass
+@dataclass(frozen=True)
 class Vector:
     """Represents a vertical x horizontal vector"""
 
+    __slots__ = ("x", "y")
+
     x: int
     y: int
 
@@ -149,15 +205,25 @@ class Vector:
         """Returns the ratio of y to x"""
         return 1/self.xy_ratio()
 
+    def mirrored(self):
+        """Returns the vector flipped horizontally"""
+        return Vector(-self.x, self.y)
+
 @dataclass
 class Variable:
     """Stores a variable, can be used to pass immutables by reference"""
 
+    __slots__ = ("value",)
+
     value: typing.Any
 
-@dataclass
+@dataclass(frozen=True)
 class HitState:
-    """Holds the fields required for player.hit()"""
+    """Holds the fields required for player.hit()\n
+    Immutable, so a single instance can be shared by every hit
+    """
+
+    __slots__ = ("damage", "force", "varForce", "vector")
 
     damage: int
     force: float
@@ -178,6 +244,69 @@ class HitState:
             Vector(self.vector.x, self.vector.y)
         )
 
+    def mirrored(self):
+        """Returns a copy with the vector flipped horizontally"""
+        return HitState(self.damage, self.force, self.varForce, self.vector.mirrored())
+
+# Mouse event types, positions of these are made relative to a Screen
+MOUSE_EVENTS = (pygame.MOUSEMOTION, pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP)
+
+# Every built-in event type, for blocking the ones nothing reads
+EVENT_TYPES = frozenset(
+    eventType for eventType in range(pygame.NOEVENT + 1, pygame.USEREVENT)
+    if pygame.event.event_name(eventType) != "Unknown"
+)
+
+# Event bus class
+class EventBus:
+    """Buckets events by type once per tick, so readers only see the types they care about"""
+
+    # Always empty, returned for types without events
+    EMPTY = ()
+
+    def __init__(self):
+
+        # Events of this tick by type, lists are reused between ticks
+        self.buckets = {}
+
+        # Keys pressed and released this tick
+        self.keysDown = set()
+        self.keysUp = set()
+
+        # Every type subscribed to, and a counter bumped when it grows
+        self.types = set()
+        self.version = 0
+
+    def subscribe(self, eventType: int):
+        """Declares interest in an event type, so it is not blocked at the source"""
+        if eventType not in self.types:
+            self.types.add(eventType)
+            self.version += 1
+
+    def dispatch(self, events: typing.Iterable[pygame.event.Event]):
+        """Buckets a tick of events"""
+
+        # Reset last tick
+        for bucket in self.buckets.values():
+            bucket.clear()
+        self.keysDown.clear()
+        self.keysUp.clear()
+
+        # Bucket by type
+        for event in events:
+            bucket = self.buckets.get(event.type)
+            if bucket is None:
+                bucket = self.buckets[event.type] = []
+            bucket.append(event)
+            if event.type == pygame.KEYDOWN:
+                self.keysDown.add(event.key)
+            elif event.type == pygame.KEYUP:
+                self.keysUp.add(event.key)
+
+    def get(self, eventType: int) -> typing.Sequence[pygame.event.Event]:
+        """Returns the events of a type from this tick"""
+        return self.buckets.get(eventType, self.EMPTY)
+
 # Main game class (very unrefined)
 class Screen:
     """Main game class for running a game of Spook Fighters"""
@@ -204,27 +333,32 @@ class Screen:
         # Events and keysHeld variables
         self.events = None
         self.keysHeld = None
+
+        # Events of the last update bucketed by type
+        self.bus = EventBus()
     
-    def gather(self, events):
-        """Gathers pygame events and keypresses into object attributes"""
+    def gather(self, events, keysHeld=None):
+        """Gathers pygame events and keypresses into object attributes\n
+        keysHeld - replaces pygame.key.get_pressed(), for scripted input
+        """
         # Collect events
-        self.events = events.copy()
+        self.events = events
+        self.bus.dispatch(events)
 
-        # Handle events, mostly mouse relativizing
-        for event in self.events:
-
-            # Change the pos of mouse events to be relative
-            if event.type in (pygame.MOUSEMOTION, pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP):
-                event.pos = (event.pos[0] - self.rect.x, event.pos[1] - self.rect.y)
+        # Change the pos of mouse events to be relative, if offset at all
+        if self.rect.x or self.rect.y:
+            for eventType in MOUSE_EVENTS:
+                for event in self.bus.get(eventType):
+                    event.pos = (event.pos[0] - self.rect.x, event.pos[1] - self.rect.y)
 
         # Collect keys held down
-        self.keysHeld = pygame.key.get_pressed()
+        self.keysHeld = pygame.key.get_pressed() if keysHeld is None else keysHeld
 
-    def update(self, events):
+    def update(self, events, keysHeld=None):
         """Performs a tick of update logic"""
 
         # Gather events
-        self.gather(events)
+        self.gather(events, keysHeld)
 
         # Update contained sprites
         self.sprites.update(self)
@@ -239,9 +373,21 @@ class Screen:
         # Blit onto the screen
         self.screen.blit(self.surface, (self.rect.x, self.rect.y))
 
-    def get_events(self):
-        """Returns the PyGame events collected last update"""
-        return self.events
+    def get_events(self, eventType: int = None):
+        """Returns the PyGame events collected last update, optionally only of one type"""
+        if eventType is None:
+            return self.events
+        return self.bus.get(eventType)
+
+    def get_bus(self):
+        """Returns the event bus of the screen"""
+        return self.bus
+
+    def subscribe(self, *sprites):
+        """Registers the event interest of sprites that declare it (with subscribe(bus))"""
+        for sprite in sprites:
+            if hasattr(sprite, "subscribe"):
+                sprite.subscribe(self.bus)
 
     def keys_held(self):
         """Returns the keys held as of last update"""
@@ -250,3 +396,22 @@ class Screen:
     def add_sprites(self, *sprites):
         """Adds sprites to the screen"""
         self.sprites.add(*sprites)
+        self.subscribe(*sprites)
+
+    def snapshot(self):
+        """Returns the state needed by restore() to return the screen to this point"""
+        return self.sprites.sprites()
+
+    def restore(self, snapshot):
+        """Restores the screen to a state returned by snapshot()"""
+        self.sprites.empty()
+        self.sprites.add(*snapshot)
+
+    def memory_size(self) -> int:
+        """Returns the approximate bytes used by the surfaces of the screen"""
+        return sum(
+            surface.get_bytesize() * surface.get_width() * surface.get_height()
+            for surface in [self.surface] + [
+                sprite.image for sprite in self.sprites if hasattr(sprite, "image")
+            ]
+        )
@@ -0,0 +1,308 @@
+"""Gym style training environments wrapping headless games of Spook Fighters"""
+
+# Import bundled modules
+import heapq
+import multiprocessing
+import typing
+
+# Import structure libraries
+import numpy
+
+# Import local files
+from modules import Config
+from modules import Core
+from modules import Headless
+from modules import Inputs
+
+# Single game environment
+class Environment:
+    """Headless game with one player driven by step() actions, against bots\n
+    Actions are Core.Input held masks, from 0 to Core.Input.ALL.
+    Observations are float32 arrays, see observe()
+    """
+
+    # Number of actions
+    ACTIONS = Core.Input.ALL + 1
+
+    # Features per player and per nearby projectile
+    PLAYER_FEATURES = 9
+    PROJECTILE_FEATURES = 4
+
+    def __init__(self, seed: int = 0, opponent: str = Config.environment.opponent,
+                 maxTicks: int = Config.environment.maxTicks,
+                 projectiles: int = Config.environment.projectiles, agent: int = 0):
+
+        if opponent not in Inputs.BOTS:
+            raise ValueError(f"Invalid opponent {opponent}")
+
+        # Build the game once, episodes restore it instead of rebuilding
+        Headless.init()
+        self.game = Headless.build_game()
+        self.start = self.game.snapshot()
+
+        # Reference players, the agent is always observed first
+        players = list(self.game.get_players())
+        self.agent = players[agent]
+        self.players = [self.agent] + [player for player in players if player is not self.agent]
+
+        # Settings
+        self.seed = seed
+        self.opponent = opponent
+        self.maxTicks = maxTicks
+        self.projectiles = projectiles
+
+        # Length of an observation
+        self.size = (len(self.players) * self.PLAYER_FEATURES
+                     + projectiles * self.PROJECTILE_FEATURES)
+
+        # Input of the agent
+        self.control = Inputs.ActionInput()
+
+        # Constant empty input for the game, players read their providers instead
+        self.noEvents = []
+        self.noKeys = Headless.HeldKeys()
+
+        # Episode state
+        self.episode = 0
+        self.ticks = 0
+        self.last = []
+
+    def _opponent_bot(self) -> Inputs.Bot:
+        """Returns a fresh opponent bot"""
+        bot = Inputs.BOTS[self.opponent]
+        if bot is Inputs.RandomBot:
+            return bot(seed=self.seed * 1000003 + self.episode)
+        return bot()
+
+    def reset(self, out: numpy.ndarray = None) -> numpy.ndarray:
+        """Starts a new episode, returning its first observation"""
+        self.game.restore(self.start)
+        self.episode += 1
+        self.ticks = 0
+
+        # Bots keep state between ticks, so each episode gets new ones
+        self.control = Inputs.ActionInput()
+        self.agent.set_provider(self.control)
+        for player in self.players[1:]:
+            player.set_provider(self._opponent_bot())
+
+        self.last = [(player.damage.value, player.lives.value) for player in self.players]
+        return self.observe(out)
+
+    def step(self, action: int, out: numpy.ndarray = None):
+        """Runs one tick holding the given action\n
+        Returns (observation, reward, done, info)
+        """
+        self.control.set(int(action))
+        self.game.update(self.noEvents, self.noKeys)
+        self.ticks += 1
+
+        reward = self._reward()
+        done = (
+            self.ticks >= self.maxTicks
+            or self.agent.lives.value <= 0
+            or all(player.lives.value <= 0 for player in self.players[1:])
+        )
+        return self.observe(out), reward, done, {"ticks": self.ticks}
+
+    def _reward(self) -> float:
+        """Returns the reward of the last tick, updating the damage and lives seen"""
+        damageReward = Config.environment.damageReward
+        lifeReward = Config.environment.lifeReward
+        reward = 0.0
+        for index, player in enumerate(self.players):
+            damage, lives = player.damage.value, player.lives.value
+            lastDamage, lastLives = self.last[index]
+            # Damage resets on respawn, so only increases count
+            hurt = max(0, damage - lastDamage) * damageReward + (lastLives - lives) * lifeReward
+            reward += -hurt if index == 0 else hurt
+            self.last[index] = (damage, lives)
+        return reward
+
+    def observe(self, out: numpy.ndarray = None) -> numpy.ndarray:
+        """Returns the observation of the current tick, written into out if given\n
+        Per player, agent first: x, y (fractions of the game size), xSpeed, ySpeed,
+        damage / 100, lives, stun, cooldown, facing (-1, 0 or 1).
+        Then per projectile, nearest the agent first, zero padded: x, y (relative
+        to the agent, fractions of the game size), xSpeed, ySpeed
+        """
+        if out is None:
+            out = numpy.empty(self.size, numpy.float32)
+
+        width, height = Config.game.width, Config.game.height
+
+        values = []
+        for player in self.players:
+            rect = player.rect
+            facing = player.xDirection
+            values += (
+                rect.centerx / width, rect.centery / height, player.xSpeed, player.ySpeed,
+                player.damage.value / 100, player.lives.value, player.stun, player.cooldown,
+                0 if facing is None else facing.value[0],
+            )
+
+        # Projectiles relative to the agent
+        if self.projectiles:
+            centerX, centerY = self.agent.rect.center
+            system = self.game.get_projectile_system()
+            transforms, velocities = system.transforms.fields, system.velocities.fields
+            nearby = [
+                ((x + w / 2 - centerX) / width, (y + h / 2 - centerY) / height, xSpeed, ySpeed)
+                for x, y, w, h, xSpeed, ySpeed in zip(
+                    transforms["x"], transforms["y"], transforms["width"], transforms["height"],
+                    velocities["x"], velocities["y"],
+                )
+            ]
+            if len(nearby) > self.projectiles:
+                nearby = heapq.nsmallest(self.projectiles, nearby,
+                                         key=lambda item: item[0] * item[0] + item[1] * item[1])
+            else:
+                nearby.sort(key=lambda item: item[0] * item[0] + item[1] * item[1])
+            for item in nearby:
+                values += item
+
+        count = len(values)
+        out[:count] = values
+        out[count:] = 0
+        return out
+
+# Subprocess stepping a shard of a VectorEnvironment
+def _shard(connection, count: int, seed: int, options: dict):
+    """Process entry point running its own VectorEnvironment on the commands received\n
+    Commands are (name, actions) tuples, "reset" and "step" send back their results
+    and anything else stops the process
+    """
+    environments = VectorEnvironment(count, seed=seed, workers=1, **options)
+    connection.send(environments.observations.shape[1])
+    while True:
+        command, actions = connection.recv()
+        if command == "reset":
+            connection.send(environments.reset())
+        elif command == "step":
+            connection.send(environments.step(actions))
+        else:
+            break
+    connection.close()
+
+# Batched environments
+class VectorEnvironment:
+    """Steps several independent environments together with batched observations\n
+    Environments that finish are reset straight away, with their last
+    observation kept in the 'final' entry of their info.
+    The returned arrays are reused by the next call, copy them to keep them.\n
+    One process steps about 12k times per second, so with workers above 1 the
+    environments are sharded across that many subprocesses stepping at once.
+    Environments are seeded the same whatever the number of workers, close()
+    stops the workers
+    """
+
+    def __init__(self, count: int, seed: int = 0,
+                 workers: int = Config.environment.workers, **options):
+        """count - number of environments\n
+        seed - seed of the first environment, the others count up from it\n
+        workers - processes the environments are sharded across, 1 steps them in this one\n
+        options - passed on to Environment
+        """
+
+        # Environments stepped here, or the (connection, process, start, stop) of each shard
+        self.environments = []
+        self.shards = []
+        self.count = count
+
+        workers = max(1, min(workers, count))
+        if workers == 1:
+            # Environments, seeded apart
+            self.environments = [
+                Environment(seed=seed + index, **options) for index in range(count)
+            ]
+            size = self.environments[0].size
+        else:
+            # Contiguous slices of environments, spawned so each gets its own headless pygame
+            context = multiprocessing.get_context("spawn")
+            bounds = [count * shard // workers for shard in range(workers + 1)]
+            for start, stop in zip(bounds, bounds[1:]):
+                connection, remote = context.Pipe()
+                process = context.Process(
+                    target=_shard,
+                    args=(remote, stop - start, seed + start, options),
+                    daemon=True,
+                )
+                process.start()
+                remote.close()
+                self.shards.append((connection, process, start, stop))
+            # Each shard sends its observation size once set up
+            size = max(connection.recv() for connection, _, _, _ in self.shards)
+
+        # Batched results
+        self.observations = numpy.zeros((count, size), numpy.float32)
+        self.rewards = numpy.zeros(count, numpy.float32)
+        self.dones = numpy.zeros(count, numpy.bool_)
+
+    def __len__(self):
+        """Returns the number of environments"""
+        return self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def reset(self) -> numpy.ndarray:
+        """Resets every environment, returning the batched first observations"""
+        if self.shards:
+            for connection, _, _, _ in self.shards:
+                connection.send(("reset", None))
+            for connection, _, start, stop in self.shards:
+                self.observations[start:stop] = connection.recv()
+            return self.observations
+
+        for environment, row in zip(self.environments, self.observations):
+            environment.reset(row)
+        return self.observations
+
+    def step(self, actions: typing.Sequence[int]):
+        """Steps every environment with its action\n
+        Returns batched (observations, rewards, dones, infos)
+        """
+        if self.shards:
+            return self._step_shards(actions)
+
+        infos = []
+        rewards, dones = self.rewards, self.dones
+        for index, (environment, action, row) in enumerate(
+                zip(self.environments, actions, self.observations)):
+            _, reward, done, info = environment.step(action, row)
+            rewards[index] = reward
+            dones[index] = done
+            if done:
+                info["final"] = row.copy()
+                environment.reset(row)
+            infos.append(info)
+        return self.observations, rewards, dones, infos
+
+    def _step_shards(self, actions: typing.Sequence[int]):
+        """Steps every shard at once, gathering their results into the batched arrays"""
+        for connection, _, start, stop in self.shards:
+            connection.send(("step", [int(action) for action in actions[start:stop]]))
+        infos = []
+        for connection, _, start, stop in self.shards:
+            observations, rewards, dones, shardInfos = connection.recv()
+            self.observations[start:stop] = observations
+            self.rewards[start:stop] = rewards
+            self.dones[start:stop] = dones
+            infos += shardInfos
+        return self.observations, self.rewards, self.dones, infos
+
+    def close(self):
+        """Stops the worker processes, if any"""
+        for connection, process, _, _ in self.shards:
+            try:
+                connection.send(("close", None))
+            except (BrokenPipeError, OSError):
+                pass
+            connection.close()
+            process.join(timeout=1.0)
+            if process.is_alive():
+                process.terminate()
+        self.shards = []
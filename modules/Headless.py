@@ -0,0 +1,84 @@
+"""Headless setup and scripted input for Spook Fighters, used for batch runs"""
+
+# Import bundled modules
+import os
+import random
+import typing
+
+# Import structure libraries
+import pygame
+
+# Import local files
+from modules import Config
+from modules import Core
+
+def init():
+    """Initializes pygame without a window or sound"""
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    # Leave SIGINT and SIGTERM to Python, so worker processes can be terminated
+    os.environ.setdefault("SDL_NO_SIGNAL_HANDLERS", "1")
+    pygame.init()
+
+# Stand-in for main.Main, holding only what setup_game uses
+class HeadlessMain:
+    """Offscreen replacement for main.Main"""
+
+    def __init__(self):
+
+        # Offscreen surface instead of a display
+        self.screen = pygame.Surface((Config.screen.width, Config.screen.height))
+
+        # No scenes to switch between
+        self.scenes = None
+
+def build_game(**options):
+    """Returns a newly set up game drawing to an offscreen surface\n
+    options - passed on to main.setup_game()
+    """
+    # Imported here, main imports most of modules
+    import main
+    return main.setup_game(HeadlessMain(), **options)
+
+# Set of held keys usable in place of pygame.key.get_pressed()
+class HeldKeys(set):
+    """Set of keys held down, indexable like pygame.key.get_pressed()"""
+
+    def __getitem__(self, key):
+        return key in self
+
+# Scripted random input
+class ScriptedInput:
+    """Produces reproducible random key presses and releases for keysets\n
+    Each tick every key has a chance of toggling
+    """
+
+    def __init__(self, keysets: typing.Iterable[Core.Keyset], seed: int = 0,
+                 chance: float = 0.1):
+
+        # Reference keys
+        self.keys = [
+            key for keyset in keysets
+            for key in (keyset.LEFT, keyset.RIGHT, keyset.UP,
+                        keyset.DOWN, keyset.ACTION, keyset.ATTACK)
+        ]
+
+        # Seeded so runs are reproducible
+        self.random = random.Random(seed)
+        self.chance = chance
+
+        # Keys currently held
+        self.held = HeldKeys()
+
+    def tick(self) -> typing.Tuple[typing.List[pygame.event.Event], HeldKeys]:
+        """Returns the (events, keysHeld) of the next tick"""
+        events = []
+        for key in self.keys:
+            if self.random.random() < self.chance:
+                if key in self.held:
+                    self.held.discard(key)
+                    events.append(pygame.event.Event(pygame.KEYUP, key=key))
+                else:
+                    self.held.add(key)
+                    events.append(pygame.event.Event(pygame.KEYDOWN, key=key))
+        return events, self.held
@@ -0,0 +1,238 @@
+"""Input providers that drive players, from the keyboard or from bots"""
+
+# Import bundled modules
+import random
+import typing
+
+# Import structure libraries
+import pygame
+
+# Import local files
+from modules import Core
+from modules.Core import Input
+
+# Base input provider
+class InputProvider:
+    """Produces a tick of input for a player as Core.Input bitmasks"""
+
+    def poll(self, player, game) -> typing.Tuple[int, int, int]:
+        """Returns the (pressed, released, held) masks of this tick"""
+        raise NotImplementedError(f"{type(self)} does not poll")
+
+    def subscribe(self, bus: Core.EventBus):
+        """Declares the events the provider reads, none by default"""
+
+# Keyboard input
+class KeyboardInput(InputProvider):
+    """Reads a keyset from the keys of a screen's event bus and held keys"""
+
+    def __init__(self, keyset: Core.Keyset):
+
+        # Reference keyset, and compile it into a key to input bit table
+        self.keyset = keyset
+        self.table = keyset.table()
+
+    def subscribe(self, bus: Core.EventBus):
+        """Declares the events the provider reads"""
+        bus.subscribe(pygame.KEYDOWN)
+        bus.subscribe(pygame.KEYUP)
+
+    def poll(self, player, game):
+        """Returns the (pressed, released, held) masks of this tick"""
+
+        # Reference compiled keyset
+        table = self.table
+        bus = game.get_bus()
+        keysHeld = game.keys_held()
+
+        # Held keys
+        held = 0
+        for key, bit in table.items():
+            if keysHeld[key]:
+                held |= bit
+
+        # Keys pressed and released this tick
+        pressed = 0
+        for key in bus.keysDown:
+            pressed |= table.get(key, 0)
+        released = 0
+        for key in bus.keysUp:
+            released |= table.get(key, 0)
+
+        return (pressed, released, held)
+
+# Base bot class
+class Bot(InputProvider):
+    """Base class for bots, which decide what to hold each tick\n
+    Presses and releases are derived from changes in what is held
+    """
+
+    def __init__(self):
+
+        # Mask held last tick
+        self.held = Input.NONE
+
+        # Ticks polled
+        self.tick = 0
+
+    def decide(self, player, game) -> int:
+        """Returns the mask to hold this tick"""
+        raise NotImplementedError(f"{type(self)} does not decide")
+
+    def poll(self, player, game):
+        """Returns the (pressed, released, held) masks of this tick"""
+        self.tick += 1
+        held = self.decide(player, game) & Input.ALL
+        pressed = held & ~self.held
+        released = self.held & ~held
+        self.held = held
+        return (pressed, released, held)
+
+# Externally driven input
+class ActionInput(Bot):
+    """Holds whatever mask was last set, for agents driving a player from outside the game"""
+
+    def __init__(self):
+        super().__init__()
+        self.action = Input.NONE
+
+    def set(self, action: int):
+        """Sets the mask held from the next tick on"""
+        self.action = action
+
+    def decide(self, player, game):
+        """Returns the mask to hold this tick"""
+        return self.action
+
+# Random bot
+class RandomBot(Bot):
+    """Toggles each input at random"""
+
+    def __init__(self, seed: int = None, chance: float = 0.1):
+        super().__init__()
+        self.random = random.Random(seed)
+        self.chance = chance
+
+    def decide(self, player, game):
+        """Returns the mask to hold this tick"""
+        held = self.held
+        for bit in (Input.UP, Input.DOWN, Input.LEFT, Input.RIGHT, Input.ACTION, Input.ATTACK):
+            if self.random.random() < self.chance:
+                held ^= bit
+        return held
+
+# Chasing bot
+class ApproachBot(Bot):
+    """Walks towards the nearest opponent, jumping up to them and attacking in range"""
+
+    def __init__(self, attackRange: int = 60, grabRange: int = 20, jumpEvery: int = 12):
+        super().__init__()
+        self.attackRange = attackRange
+        self.grabRange = grabRange
+        self.jumpEvery = jumpEvery
+
+    @staticmethod
+    def nearest(player, game):
+        """Returns the closest opponent, or None"""
+        best = None
+        bestDistance = None
+        for other in game.get_players():
+            if player.hostile(other):
+                distance = (abs(other.rect.centerx - player.rect.centerx)
+                            + abs(other.rect.centery - player.rect.centery))
+                if bestDistance is None or distance < bestDistance:
+                    best, bestDistance = other, distance
+        return best
+
+    def decide(self, player, game):
+        """Returns the mask to hold this tick"""
+        target = self.nearest(player, game)
+        if target is None:
+            return Input.NONE
+
+        held = Input.NONE
+        dX = target.rect.centerx - player.rect.centerx
+        dY = target.rect.centery - player.rect.centery
+        toward = Input.RIGHT if dX > 0 else Input.LEFT
+
+        # Close the distance, or turn to face the target
+        facing = Core.Dir.RIGHT if dX > 0 else Core.Dir.LEFT
+        if abs(dX) > self.attackRange or player.xDirection != facing:
+            held |= toward
+
+        # Step off of (or out from under) a target stacked on the same column
+        if abs(dX) <= player.rect.width and abs(dY) >= player.rect.height:
+            held = Input.LEFT if dX >= 0 else Input.RIGHT
+
+        # Jump towards targets above, releasing between jumps so each is a press
+        if dY < -player.rect.height and self.tick % self.jumpEvery == 0:
+            held |= Input.UP
+
+        # Attack every other tick when in range, grab when very close
+        if abs(dX) <= self.attackRange and abs(dY) <= player.rect.height and self.tick % 2 == 0:
+            held |= Input.ACTION if abs(dX) <= self.grabRange + player.rect.width else Input.ATTACK
+
+        return held
+
+# Chasing bot that recovers to the stage
+class RecoveryBot(ApproachBot):
+    """ApproachBot that heads back to the stage when knocked off it, and won't follow off edges"""
+
+    def __init__(self, attackRange: int = 60, grabRange: int = 20, jumpEvery: int = 12):
+        super().__init__(attackRange, grabRange, jumpEvery)
+
+        # Main stage, cached for the game and barrier count it was found for
+        self.mainStage = None
+        self.stageKey = None
+
+    @staticmethod
+    def main_stage(game) -> typing.Optional[pygame.Rect]:
+        """Returns the widest barrier of the game, the lowest of equally wide ones\n
+        Floating barriers above it are ledges, not the stage to recover to
+        """
+        best = None
+        for barrier in game.get_barriers():
+            rect = barrier.rect
+            if best is None or (rect.width, rect.bottom) > (best.width, best.bottom):
+                best = rect
+        return best
+
+    def stage(self, game) -> typing.Optional[pygame.Rect]:
+        """Returns the main stage of the game, found again only when its barriers change"""
+        key = (id(game), len(game.get_barriers()))
+        if key != self.stageKey:
+            self.mainStage = self.main_stage(game)
+            self.stageKey = key
+        return self.mainStage
+
+    def decide(self, player, game):
+        """Returns the mask to hold this tick"""
+        stage = self.stage(game)
+        if stage is None:
+            return super().decide(player, game)
+
+        # Off the stage: steer back over it and jump while falling
+        offStage = (
+            player.rect.right < stage.left or player.rect.left > stage.right
+            or player.rect.top > stage.top
+        )
+        if offStage:
+            held = Input.RIGHT if player.rect.centerx < stage.centerx else Input.LEFT
+            if player.ySpeed > 0 and player.jumps > 0 and self.tick % 4 == 0:
+                held |= Input.UP
+            return held
+
+        # On the stage: chase, but don't walk off the edges
+        held = super().decide(player, game)
+        if held & Input.LEFT and player.rect.left - player.attributes.maxSpeed < stage.left:
+            held &= ~Input.LEFT
+        if held & Input.RIGHT and player.rect.right + player.attributes.maxSpeed > stage.right:
+            held &= ~Input.RIGHT
+        return held
+
+# Bot constructors by name
+BOTS = {
+    "random": RandomBot,
+    "approach": ApproachBot,
+    "recovery": RecoveryBot,
+}
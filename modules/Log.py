@@ -0,0 +1,153 @@
+"""Non-blocking structured logging for Spook Fighters"""
+
+# Import bundled modules
+import atexit
+import enum
+import queue
+import sys
+import threading
+import time
+import typing
+
+# Import local files
+from modules import Config
+
+class Level(enum.IntEnum):
+    """Severity of a log record"""
+    DEBUG = 10
+    INFO = 20
+    WARNING = 30
+    ERROR = 40
+
+# Logger class
+# The game thread only filters and enqueues, formatting and writing
+# happen on a background thread so a slow terminal can't stall frames
+class Logger:
+    """Structured logger writing records from a background thread\n
+    Records are filtered by level and category, rate limited per category,
+    and dropped rather than blocking when the queue is full
+    """
+
+    def __init__(self, level: Level = Level.INFO,
+                 categories: typing.Optional[typing.Iterable[str]] = None,
+                 muted: typing.Iterable[str] = Config.log.muted,
+                 queueSize: int = Config.log.queueSize,
+                 rate: float = Config.log.rate, burst: int = Config.log.burst,
+                 stream: typing.TextIO = None):
+
+        # Filters, categories of None allows every category not muted
+        self.level = level
+        self.categories = None if categories is None else set(categories)
+        self.muted = set(muted)
+
+        # Token bucket of each category, as [tokens, last refill time]
+        self.rate = rate
+        self.burst = burst
+        self.buckets = {}
+
+        # Records dropped by rate limiting or a full queue, reported by the writer
+        self.dropped = 0
+
+        # Queue of (time, level, category, values, fields) records, None stops the writer
+        self.queue = queue.Queue(maxsize=queueSize)
+
+        # Output, default stdout at time of writing
+        self.stream = stream
+
+        # Writer thread, started on the first record
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def enabled(self, level: Level, category: str) -> bool:
+        """Returns whether a record would pass the level and category filters"""
+        return (
+            level >= self.level
+            and category not in self.muted
+            and (self.categories is None or category in self.categories)
+        )
+
+    def _allow(self, category: str, now: float) -> bool:
+        """Takes a token from the category bucket, returns False if there is none"""
+        bucket = self.buckets.get(category)
+        if bucket is None:
+            bucket = self.buckets[category] = [float(self.burst), now]
+        # Refill
+        bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+        bucket[1] = now
+        if bucket[0] < 1:
+            return False
+        bucket[0] -= 1
+        return True
+
+    def log(self, level: Level, category: str, *values, **fields):
+        """Queues a record, never blocking"""
+        if not self.enabled(level, category):
+            return
+        now = time.monotonic()
+        if not self._allow(category, now):
+            self.dropped += 1
+            return
+        if self.thread is None:
+            self._start()
+        try:
+            self.queue.put_nowait((time.time(), level, category, values, fields))
+        except queue.Full:
+            self.dropped += 1
+
+    def debug(self, category: str, *values, **fields):
+        """Queues a DEBUG record"""
+        self.log(Level.DEBUG, category, *values, **fields)
+
+    def info(self, category: str, *values, **fields):
+        """Queues an INFO record"""
+        self.log(Level.INFO, category, *values, **fields)
+
+    def warning(self, category: str, *values, **fields):
+        """Queues a WARNING record"""
+        self.log(Level.WARNING, category, *values, **fields)
+
+    def error(self, category: str, *values, **fields):
+        """Queues an ERROR record"""
+        self.log(Level.ERROR, category, *values, **fields)
+
+    def _start(self):
+        """Starts the writer thread"""
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._write, name="logger", daemon=True)
+                self.thread.start()
+                atexit.register(self.close)
+
+    def close(self):
+        """Writes every queued record and stops the writer"""
+        with self.lock:
+            thread, self.thread = self.thread, None
+        if thread is not None:
+            self.queue.put(None)
+            thread.join()
+
+    @staticmethod
+    def format(record) -> str:
+        """Returns the text line of a record"""
+        stamp, level, category, values, fields = record
+        text = " ".join(str(value) for value in values)
+        if fields:
+            text += " " + " ".join(f"{key}={value!r}" for key, value in fields.items())
+        clock = time.strftime("%H:%M:%S", time.localtime(stamp))
+        return f"{clock}.{int(stamp % 1 * 1000):03d} {level.name:<7} [{category}] {text}"
+
+    def _write(self):
+        """Writer thread loop"""
+        reported = 0
+        while True:
+            record = self.queue.get()
+            if record is None:
+                break
+            stream = self.stream or sys.stdout
+            # Report drops since last record
+            if self.dropped != reported:
+                stream.write(f"[log] {self.dropped - reported} records dropped\n")
+                reported = self.dropped
+            stream.write(self.format(record) + "\n")
+            if self.queue.empty():
+                stream.flush()
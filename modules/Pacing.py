@@ -0,0 +1,81 @@
+"""Frame pacing with late input sampling for Spook Fighters"""
+
+# Import bundled modules
+import time
+
+# Import local files
+from modules import Config
+
+# Frame pacer class
+# The loop waits at the start of a frame instead of the end, and wakes only
+# as early as the frame's work needs, so input is sampled as late as possible
+class FramePacer:
+    """Paces frames to a fixed rate, waking just in time for each frame's work\n
+    Modes: 'sleep' (OS sleep), 'busy' (spin, precise but uses a core),
+    'hybrid' (sleep, then spin for the last spinMargin seconds)
+    """
+
+    MODES = ("sleep", "busy", "hybrid")
+
+    def __init__(self, fps: int = Config.screen.fps, mode: str = Config.pacing.mode,
+                 spinMargin: float = Config.pacing.spinMargin,
+                 lateSampling: bool = Config.pacing.lateSampling):
+
+        if mode not in self.MODES:
+            raise ValueError(f"Invalid pacing mode {mode}")
+
+        # Reference settings
+        self.period = 1 / fps
+        self.mode = mode
+        self.spinMargin = spinMargin
+        self.lateSampling = lateSampling
+
+        # Time the next frame should be flipped by
+        self.deadline = None
+
+        # Smoothed estimate of the time from sampling input to flipping
+        self.workEstimate = 0.0
+
+        # Smoothed measured time from sampling input to flipping (input latency)
+        self.latency = 0.0
+
+    def wait(self) -> float:
+        """Waits until this frame's input should be sampled, returning the time waited"""
+        now = time.perf_counter()
+
+        # First frame, or fallen more than a frame behind: start from now
+        if self.deadline is None or now - self.deadline > self.period:
+            self.deadline = now
+        self.deadline += self.period
+
+        # Wake early enough to finish the frame's work by the deadline
+        wake = self.deadline - self.period
+        if self.lateSampling:
+            wake = self.deadline - min(self.period, self.workEstimate)
+
+        self._wait_until(wake)
+        return time.perf_counter() - now
+
+    def _wait_until(self, target: float):
+        """Waits until the target time using the pacing mode"""
+        if self.mode != "busy":
+            remaining = target - time.perf_counter()
+            if self.mode == "hybrid":
+                remaining -= self.spinMargin
+            if remaining > 0:
+                time.sleep(remaining)
+        if self.mode != "sleep":
+            while time.perf_counter() < target:
+                pass
+
+    def done(self, sampled: float, flipped: float):
+        """Records when this frame's input was sampled and when it was flipped"""
+        work = flipped - sampled
+        smoothing = Config.pacing.smoothing
+        # Latency is smoothed plainly, the estimate leans towards spikes to avoid late flips
+        self.latency += (work - self.latency) * smoothing
+        target = work * Config.pacing.workSafety
+        if target > self.workEstimate:
+            self.workEstimate = target
+        else:
+            self.workEstimate += (target - self.workEstimate) * smoothing
@@ -0,0 +1,187 @@
+"""Per-phase tick profiling for Spook Fighters"""
+
+# Import bundled modules
+from collections import deque
+import functools
+import time
+import typing
+
+# Import structure libraries
+import pygame
+
+# Import local files
+from modules import Config
+from modules import Core
+
+# Timer for one named phase
+# One is cached per name, so timing a phase allocates nothing
+class _Phase:
+    """Context manager recording the duration of a phase into its profiler"""
+
+    __slots__ = ("samples", "started")
+
+    def __init__(self, samples: deque):
+        self.samples = samples
+        self.started = 0.0
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.samples.append(time.perf_counter() - self.started)
+        return False
+
+# Phase used while disabled, does nothing
+class _NullPhase:
+    """Context manager that records nothing"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_PHASE = _NullPhase()
+
+# Rolling phase profiler
+class Profiler:
+    """Times named phases over a rolling window of samples\n
+    Disabled by default, phase() is nearly free while disabled and methods
+    registered with time_method() are only wrapped while recording
+    """
+
+    def __init__(self, window: int = Config.profiler.window):
+
+        # Whether phases are being recorded
+        self.enabled = False
+
+        # Number of samples kept for each phase
+        self.window = window
+
+        # Samples and cached timer of each phase, in first-seen order
+        self.samples = {}
+        self.phases = {}
+
+        # Methods timed while recording, as (class, method name, phase) targets,
+        # and the wrappers installed over them by (class, method name)
+        self.methods = []
+        self.wrappers = {}
+
+        # File the report is dumped to, None to only return it
+        self.dumpPath = Config.profiler.dumpPath
+
+        # Cached overlay surface and frames until it is re-rendered
+        self.font = None
+        self.overlay = None
+        self.overlayAge = 0
+
+    def phase(self, name: str):
+        """Returns a context manager timing the named phase"""
+        if not self.enabled:
+            return _NULL_PHASE
+        if name not in self.phases:
+            self.samples[name] = deque(maxlen=self.window)
+            self.phases[name] = _Phase(self.samples[name])
+        return self.phases[name]
+
+    def toggle(self):
+        """Turns recording on or off, clearing old samples when turned on"""
+        self.enabled = not self.enabled
+        if self.enabled:
+            self.clear()
+            for owner, attribute, name in self.methods:
+                self._wrap(owner, attribute, name)
+        else:
+            for owner, attribute in list(self.wrappers):
+                self._unwrap(owner, attribute)
+
+    def time_method(self, owner: type, attribute: str, name: str):
+        """Times every call of a method as the named phase, but only while recording"""
+        self.methods.append((owner, attribute, name))
+        if self.enabled:
+            self._wrap(owner, attribute, name)
+
+    def _wrap(self, owner: type, attribute: str, name: str):
+        """Installs a wrapper timing a method"""
+        function = owner.__dict__[attribute]
+        phase = self.phase(name)
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with phase:
+                return function(*args, **kwargs)
+
+        setattr(owner, attribute, wrapper)
+        self.wrappers[(owner, attribute)] = (wrapper, function)
+
+    def _unwrap(self, owner: type, attribute: str):
+        """Restores a method wrapped by _wrap(), unless something else wrapped it since"""
+        wrapper, function = self.wrappers.pop((owner, attribute))
+        if owner.__dict__[attribute] is wrapper:
+            setattr(owner, attribute, function)
+
+    def clear(self):
+        """Drops every recorded sample"""
+        for samples in self.samples.values():
+            samples.clear()
+        self.overlay = None
+
+    def percentiles(self, name: str,
+                    points: typing.Sequence[float] = (50, 95, 99)) -> typing.List[float]:
+        """Returns the given percentiles, in milliseconds, of a phase"""
+        ordered = sorted(self.samples.get(name, ()))
+        if not ordered:
+            return [0.0 for _ in points]
+        return [
+            ordered[min(len(ordered) - 1, int(len(ordered) * point / 100))] * 1000
+            for point in points
+        ]
+
+    def report(self) -> typing.List[str]:
+        """Returns one text line per phase with its percentiles"""
+        lines = [f"{'phase':<24}{'p50':>8}{'p95':>8}{'p99':>8}  ms"]
+        for name in self.samples:
+            p50, p95, p99 = self.percentiles(name)
+            lines.append(f"{name:<24}{p50:>8.2f}{p95:>8.2f}{p99:>8.2f}")
+        return lines
+
+    def dump(self, path: str = None) -> typing.List[str]:
+        """Returns the current report, writing it to path (default dumpPath) if there is one"""
+        lines = self.report()
+        path = path or self.dumpPath
+        if path is not None:
+            with open(path, "w") as file:
+                file.write("\n".join(lines) + "\n")
+        return lines
+
+    def draw(self, surface: pygame.Surface):
+        """Draws the report over the surface, re-rendering it only every few frames"""
+        if not self.enabled:
+            return
+
+        # Re-render the cached overlay when stale
+        if self.overlay is None or self.overlayAge >= Config.profiler.overlayInterval:
+            if self.font is None:
+                self.font = pygame.font.SysFont(Config.hud.sysFont, Config.profiler.textSize)
+            lines = [
+                self.font.render(line, True, Core.Color.WHITE, Core.Color.BLACK)
+                for line in self.report()
+            ]
+            self.overlay = pygame.Surface(
+                (max(line.get_width() for line in lines),
+                 sum(line.get_height() for line in lines))
+            )
+            y = 0
+            for line in lines:
+                self.overlay.blit(line, (0, y))
+                y += line.get_height()
+            self.overlayAge = 0
+        self.overlayAge += 1
+
+        surface.blit(self.overlay, Config.profiler.position)
+
+# Shared profiler, used by the main loop and game code
+profiler = Profiler()
@@ -0,0 +1,382 @@
+"""Batched projectile storage and simulation for Spook Fighters"""
+
+# Import bundled modules
+import typing
+
+# Import structure libraries
+import pygame
+
+# Import local files
+from modules import Config
+from modules import Core
+from modules import Spatial
+from modules import World
+
+# Eviction policies used when projectiles are over their limit
+EVICTIONS = ("oldest", "farthest", "reject")
+
+# Projectile specific component, indexes into the owner, hit state and color tables
+PROJECTILE = World.Component("projectile", owner="l", hitState="l", color="l")
+
+# Projectiles carried along by their owner, with where the owner was last seen
+FOLLOW = World.Component("follow", x="l", y="l")
+
+# Projectiles as entities of a world
+# Each projectile is an entity whose transform, velocity and projectile components
+# are grouped, so every column of the three shares one slot per projectile
+# and no Python object is created per projectile
+class ProjectileSystem:
+    """Spawns projectiles into a world and resolves their hits once per tick\n
+    The world's lifetime and movement systems age and move them, follow_system() and
+    collision_system() are added after those. With NumPy every column is worked on at once.
+    Projectiles are drawn straight from the columns, sprites are never created
+    """
+
+    # Sentinel used for 'no owner' and 'no hit state'
+    NONE = -1
+
+    def __init__(self, world: World.World = None,
+                 limit: typing.Optional[int] = Config.projectiles.limit,
+                 eviction: str = Config.projectiles.eviction):
+        """world - world the projectiles live in, default a new one\n
+        limit - most live projectiles, None for no limit\n
+        eviction - policy making room past the limit, see EVICTIONS
+        """
+
+        if eviction not in EVICTIONS:
+            raise ValueError(f"Invalid eviction policy {eviction}")
+
+        # Reference world, grouping the components every projectile has
+        self.world = World.World() if world is None else world
+        self.world.group(World.TRANSFORM, World.VELOCITY, PROJECTILE)
+
+        # Reference storages, their columns line up slot for slot
+        self.transforms = self.world.storage(World.TRANSFORM)
+        self.velocities = self.world.storage(World.VELOCITY)
+        self.projectiles = self.world.storage(PROJECTILE)
+        self.follows = self.world.storage(FOLLOW)
+
+        # Reference limit
+        self.limit = limit
+        self.eviction = eviction
+
+        # Point distances are measured from by the 'farthest' policy, usually the view center
+        self.focus = (0, 0)
+
+        # Lookup tables referenced by index from the projectile component
+        # Owners are dropped once no projectile references them (see _prune_owners)
+        self.owners = []
+        self.ownerIndex = {}
+        self.hitStates = []
+        self.hitStateIndex = {}
+        self.colors = []
+        self.colorIndex = {}
+
+        # Broadphase of the players hit tests are made against, rebuilt each step
+        self.grid = Spatial.SpatialHash()
+
+    def __len__(self):
+        """Returns the number of live projectiles"""
+        return len(self.projectiles)
+
+    def register_owner(self, owner) -> int:
+        """Returns the owner index of the given object, registering it if new"""
+        if owner not in self.ownerIndex:
+            self.ownerIndex[owner] = len(self.owners)
+            self.owners.append(owner)
+        return self.ownerIndex[owner]
+
+    def register_hit_state(self, hitState: Core.HitState) -> int:
+        """Returns the index of the given hit state, registering it if new\n
+        Equal hit states share an index, so registering per spawn does not grow the table
+        """
+        if hitState not in self.hitStateIndex:
+            self.hitStateIndex[hitState] = len(self.hitStates)
+            self.hitStates.append(hitState)
+        return self.hitStateIndex[hitState]
+
+    def _prune_owners(self):
+        """Drops owners no live projectile references, so removed players are not kept alive"""
+        NONE = self.NONE
+        owners = self.projectiles.fields["owner"]
+        used = sorted({index for index in owners if index != NONE})
+        if len(used) == len(self.owners):
+            return
+        remap = {old: new for new, old in enumerate(used)}
+        self.owners = [self.owners[index] for index in used]
+        self.ownerIndex = {owner: index for index, owner in enumerate(self.owners)}
+        for slot, old in enumerate(owners):
+            if old != NONE:
+                owners[slot] = remap[old]
+
+    def _register_color(self, color: Core.Color) -> int:
+        """Returns the color index of the given color, registering it if new"""
+        if color not in self.colorIndex:
+            self.colorIndex[color] = len(self.colors)
+            self.colors.append(color)
+        return self.colorIndex[color]
+
+    def spawn(self, rect: pygame.Rect, xSpeed=0, ySpeed=0, lifeSpan: int = None,
+              owner=None, hitState: int = NONE, color=Core.Color.BLACK,
+              follow: bool = False) -> typing.Optional[int]:
+        """Spawns a projectile\n
+        lifeSpan - ticks the projectile moves for, None to live until it hits or leaves bounds\n
+        owner - object that will never be hit by this projectile\n
+        hitState - index from register_hit_state() applied to the player hit, NONE to apply nothing.
+        The projectile dies on contact either way\n
+        follow - carry the projectile along as its owner moves, on top of its own speed\n
+        Returns the entity of the projectile, or None if it was rejected by the limit
+        """
+        if follow and owner is None:
+            raise ValueError("Only projectiles with an owner can follow it")
+
+        # Make room past the limit
+        if self.limit is not None and len(self.projectiles) >= self.limit:
+            if self.eviction == "reject" or not self.projectiles:
+                return None
+            self.world.destroy(self._evictee())
+
+        components = {
+            World.TRANSFORM: {"x": rect.x, "y": rect.y, "width": rect.width, "height": rect.height},
+            World.VELOCITY: {"x": xSpeed, "y": ySpeed},
+            PROJECTILE: {
+                "owner": self.NONE if owner is None else self.register_owner(owner),
+                "hitState": hitState,
+                "color": self._register_color(color),
+            },
+        }
+        # Projectiles without a lifespan only die on contact or out of bounds
+        if lifeSpan is not None:
+            components[World.LIFETIME] = {"lifeSpan": lifeSpan}
+        if follow:
+            components[FOLLOW] = {"x": owner.rect.x, "y": owner.rect.y}
+        return self.world.create(components)
+
+    def _evictee(self) -> int:
+        """Returns the projectile entity the eviction policy removes first"""
+        entities = self.projectiles.entities
+        if self.eviction == "farthest":
+            focusX, focusY = self.focus
+            xs, ys = self.transforms.fields["x"], self.transforms.fields["y"]
+            if World.vectorized(len(entities)):
+                slot = int(World.numpy.argmax(
+                    (World.view(xs) - focusX) ** 2 + (World.view(ys) - focusY) ** 2
+                ))
+            else:
+                slot = max(range(len(entities)),
+                           key=lambda slot: (xs[slot] - focusX) ** 2 + (ys[slot] - focusY) ** 2)
+            return entities[slot]
+        # Oldest, entity IDs count up
+        return min(entities)
+
+    def clear(self):
+        """Removes every projectile"""
+        destroy = self.world.destroy
+        for entity in list(self.projectiles.entities):
+            destroy(entity)
+        self._prune_owners()
+
+    def snapshot(self):
+        """Returns the owners projectiles reference, for restore()\n
+        The projectiles themselves are in the world's snapshot
+        """
+        return list(self.owners)
+
+    def restore(self, snapshot):
+        """Restores the owner table to a snapshot(), after the world was restored"""
+        self.owners = list(snapshot)
+        self.ownerIndex = {owner: index for index, owner in enumerate(self.owners)}
+        self._prune_owners()
+
+    def follow_system(self, world: World.World, game): #pylint: disable=unused-argument
+        """World system carrying following projectiles along with their owners' movement"""
+        follows = self.follows
+        if not follows:
+            return
+        xs, ys = self.transforms.fields["x"], self.transforms.fields["y"]
+        owners, index = self.projectiles.fields["owner"], self.projectiles.index
+        lastXs, lastYs = follows.fields["x"], follows.fields["y"]
+        for slot, entity in enumerate(follows.entities):
+            other = index[entity]
+            rect = self.owners[owners[other]].rect
+            xs[other] += rect.x - lastXs[slot]
+            ys[other] += rect.y - lastYs[slot]
+            lastXs[slot] = rect.x
+            lastYs[slot] = rect.y
+
+    def collision_system(self, world: World.World, game): #pylint: disable=unused-argument
+        """World system resolving hits against the game's hittables, within its bounds"""
+        self.collide(game.get_hittables(), game.get_bounds())
+
+    def collide(self, players: typing.Iterable, bounds: pygame.Rect = None):
+        """Resolves hits of every projectile against players\n
+        Projectiles never hit their owner, or players on their owner's team,
+        and die once entirely outside of bounds, if given.
+        A projectile hitting several players at once hits the first of them
+        """
+
+        # Nothing to do
+        projectiles = self.projectiles
+        if not projectiles:
+            return
+
+        # Entities are destroyed after the pass, once no views of the columns are left
+        if World.vectorized(len(projectiles)):
+            dead = self._collide_columns(players, bounds)
+        else:
+            dead = self._collide_each(players, bounds)
+        destroy = self.world.destroy
+        for entity in dead:
+            destroy(entity)
+
+        # Nothing left to reference the owners
+        if not projectiles and self.owners:
+            self._prune_owners()
+
+    def _friendly(self, player) -> typing.Tuple[bool, ...]:
+        """Returns whether projectiles of each owner spare the player, and False for no owner"""
+        team = getattr(player, "team", None)
+        friendly = []
+        for owner in self.owners:
+            ownerTeam = getattr(owner, "team", None)
+            friendly.append(owner is player or (ownerTeam is not None and ownerTeam == team))
+        # Indexed by the owner column, so NONE reads the last entry
+        friendly.append(False)
+        return tuple(friendly)
+
+    def _collide_columns(self, players: typing.Iterable, bounds: pygame.Rect) -> typing.List[int]:
+        """collide() over whole columns with NumPy, returning the dead entities"""
+        numpy, view = World.numpy, World.view
+        fields = self.transforms.fields
+        xs, ys = view(fields["x"]), view(fields["y"])
+        rights, bottoms = xs + view(fields["width"]), ys + view(fields["height"])
+
+        # Die when out of bounds
+        if bounds is None:
+            dead = numpy.zeros(len(xs), numpy.bool_)
+        else:
+            dead = ((xs >= bounds.right) | (rights <= bounds.left)
+                    | (ys >= bounds.bottom) | (bottoms <= bounds.top))
+
+        # Players in order, each taking the live projectiles touching it that may hit it
+        owners = view(self.projectiles.fields["owner"])
+        hitStates = view(self.projectiles.fields["hitState"])
+        hits = []
+        for player in players:
+            rect = player.rect
+            touching = ((xs < rect.right) & (rect.left < rights)
+                        & (ys < rect.bottom) & (rect.top < bottoms))
+            touching &= ~dead
+            if not touching.any():
+                continue
+            touching &= ~numpy.array(self._friendly(player))[owners]
+            slots = numpy.flatnonzero(touching)
+            dead[slots] = True
+            hits.extend((player, hitState) for hitState in hitStates[slots].tolist()
+                        if hitState != self.NONE)
+
+        # Apply hits, a player's in the order of its projectiles
+        for player, hitState in hits:
+            player.hit(self.hitStates[hitState])
+
+        entities = self.projectiles.entities
+        return [entities[slot] for slot in numpy.flatnonzero(dead).tolist()]
+
+    def _collide_each(self, players: typing.Iterable, bounds: pygame.Rect) -> typing.List[int]:
+        """collide() one projectile at a time, returning the dead entities"""
+
+        # Reference columns locally for the hot loop
+        entities = self.projectiles.entities
+        xs, ys = self.transforms.fields["x"], self.transforms.fields["y"]
+        widths, heights = self.transforms.fields["width"], self.transforms.fields["height"]
+        owners, hitStates = self.projectiles.fields["owner"], self.projectiles.fields["hitState"]
+        NONE = self.NONE
+
+        # Bounds as edges, infinite if not given
+        if bounds is None:
+            boundLeft = boundTop = float("-inf")
+            boundRight = boundBottom = float("inf")
+        else:
+            boundLeft, boundTop, boundRight, boundBottom = (
+                bounds.left, bounds.top, bounds.right, bounds.bottom
+            )
+
+        # Bucket player bounds once instead of testing every player per projectile
+        # Entries start with the player's order, so hits resolve in the same order as a full scan
+        grid = self.grid
+        grid.clear()
+        for order, player in enumerate(players):
+            rect = player.rect
+            grid.insert(
+                (order, rect.left, rect.top, rect.right, rect.bottom,
+                 self._friendly(player), player),
+                rect.left, rect.top, rect.right, rect.bottom,
+            )
+        query = grid.query
+        cells, cellSize = grid.cells, grid.cellSize
+
+        dead = []
+        for slot in range(len(entities)):
+
+            x = xs[slot]
+            y = ys[slot]
+            right = x + widths[slot]
+            bottom = y + heights[slot]
+
+            # Die when out of bounds
+            if x >= boundRight or right <= boundLeft or y >= boundBottom or bottom <= boundTop:
+                dead.append(entities[slot])
+                continue
+
+            # Check for player collisions among nearby players
+            owner = owners[slot]
+            # Most projectiles sit in one cell, usually without players, so look it up directly
+            # (buckets are filled in player order, so need no sorting)
+            column = int(x // cellSize)
+            row = int(y // cellSize)
+            if column == int((right - 1) // cellSize) and row == int((bottom - 1) // cellSize):
+                targets = cells.get((column, row), ())
+            else:
+                targets = query(x, y, right, bottom)
+                if len(targets) > 1:
+                    targets.sort()
+            for _, left, top, pRight, pBottom, friendly, player in targets:
+                if (not friendly[owner]
+                        and x < pRight and left < right
+                        and y < pBottom and top < bottom):
+                    # Apply hit, if any, then die
+                    if hitStates[slot] != NONE:
+                        player.hit(self.hitStates[hitStates[slot]])
+                    dead.append(entities[slot])
+                    break
+        return dead
+
+    def draw(self, surface: pygame.Surface, view: pygame.Rect = None):
+        """Draws every projectile in view as a filled rect of its color\n
+        view - area of the stage drawn onto the surface, default the surface at the origin
+        """
+        if view is None:
+            view = surface.get_rect()
+        left, top, right, bottom = view.left, view.top, view.right, view.bottom
+        colors, fill = self.colors, surface.fill
+        fields = self.transforms.fields
+
+        # Cull and offset whole columns, leaving only the fills to do one by one
+        if World.vectorized(len(self.projectiles)):
+            numpy, columns = World.numpy, World.view
+            xs, ys = columns(fields["x"]), columns(fields["y"])
+            widths, heights = columns(fields["width"]), columns(fields["height"])
+            slots = numpy.flatnonzero((xs < right) & (left < xs + widths)
+                                      & (ys < bottom) & (top < ys + heights))
+            for x, y, width, height, color in zip(
+                    (xs[slots].astype(numpy.int_) - left).tolist(),
+                    (ys[slots].astype(numpy.int_) - top).tolist(),
+                    widths[slots].tolist(), heights[slots].tolist(),
+                    columns(self.projectiles.fields["color"])[slots].tolist()):
+                fill(colors[color], (x, y, width, height))
+            return
+
+        for x, y, width, height, color in zip(fields["x"], fields["y"], fields["width"],
+                                              fields["height"], self.projectiles.fields["color"]):
+            if x < right and left < x + width and y < bottom and top < y + height:
+                fill(colors[color], (int(x) - left, int(y) - top, width, height))
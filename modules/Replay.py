@@ -0,0 +1,267 @@
+"""Input replays of Spook Fighters matches, and rendering them to frames
+
+A replay holds the match setup and every player's packed Core.Input ticks, so a
+match is reproduced exactly by simulating it again from the same inputs.
+Run from the repository root with: python render.py replays/ --output frames/
+Each replay is re-simulated headless and rendered to disk by its own worker process
+"""
+
+# Import bundled modules
+import argparse
+import multiprocessing
+import os
+import struct
+import time
+import typing
+
+# Import local files
+from modules import Capture
+from modules import Config
+from modules import Core
+from modules import Headless
+from modules import Inputs
+from modules import Log
+
+# File header: magic, version, player count, stage width and height, ticks
+HEADER = struct.Struct("<4sBBIII")
+MAGIC = b"SPKR"
+VERSION = 1
+
+# Team byte of players without a team
+NO_TEAM = 0xFF
+
+# File extension of replays
+EXTENSION = ".replay"
+
+# Render logger
+logger = Log.Logger()
+
+# Replay data
+class Replay:
+    """Match setup and the packed input of each player, one Core.Input tick after another"""
+
+    def __init__(self, count: int = Config.player.count,
+                 teams: typing.Optional[typing.Sequence[int]] = Config.player.teams,
+                 width: int = Config.stage.width, height: int = Config.stage.height):
+
+        # Match setup, see main.setup_game()
+        self.count = count
+        self.teams = None if teams is None else list(teams)
+        self.width = width
+        self.height = height
+
+        # Packed ticks of each player
+        self.inputs = [bytearray() for _ in range(count)]
+
+    def __len__(self):
+        """Returns the number of ticks every player has input for"""
+        return min(len(stream) for stream in self.inputs) // Core.Input.SIZE
+
+    def clear(self):
+        """Drops every tick, a recording carries on from the start of the replay"""
+        for stream in self.inputs:
+            del stream[:]
+
+    def options(self) -> dict:
+        """Returns the match setup as options of main.setup_game()"""
+        return {"count": self.count, "teams": self.teams, "width": self.width, "height": self.height}
+
+    def to_bytes(self) -> bytes:
+        """Returns the replay as the bytes of a file"""
+        ticks = len(self)
+        teams = [NO_TEAM] * self.count if self.teams is None else self.teams
+        return b"".join((
+            HEADER.pack(MAGIC, VERSION, self.count, self.width, self.height, ticks),
+            bytes(teams),
+            *(bytes(stream[:ticks * Core.Input.SIZE]) for stream in self.inputs),
+        ))
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "Replay":
+        """Returns the replay held in the bytes of a file"""
+        magic, version, count, width, height, ticks = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Not a version {VERSION} replay")
+        offset = HEADER.size
+        teams = list(data[offset:offset + count])
+        offset += count
+        replay = cls(count, None if NO_TEAM in teams else teams, width, height)
+        size = ticks * Core.Input.SIZE
+        for stream in replay.inputs:
+            stream += data[offset:offset + size]
+            offset += size
+        return replay
+
+    def save(self, path: str):
+        """Writes the replay to a file"""
+        with open(path, "wb") as file:
+            file.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path: str) -> "Replay":
+        """Reads a replay from a file"""
+        with open(path, "rb") as file:
+            return cls.from_bytes(file.read())
+
+# Recording provider
+class Recorder(Inputs.InputProvider):
+    """Passes on the input of another provider, appending every tick to a replay stream"""
+
+    def __init__(self, provider: Inputs.InputProvider, stream: bytearray):
+        self.provider = provider
+        self.stream = stream
+
+    def subscribe(self, bus: Core.EventBus):
+        """Declares the events the recorded provider reads"""
+        self.provider.subscribe(bus)
+
+    def poll(self, player, game):
+        """Returns and records the (pressed, released, held) masks of this tick"""
+        masks = self.provider.poll(player, game)
+        self.stream += Core.Input.pack(*masks)
+        return masks
+
+def record(game) -> Replay:
+    """Starts recording the input of every player of a game, returning the replay filled in"""
+    players = list(game.get_players())
+    teams = [player.team for player in players]
+    stage = game.get_stage()
+    replay = Replay(len(players), None if None in teams else teams, stage.width, stage.height)
+    for player, stream in zip(players, replay.inputs):
+        player.set_provider(Recorder(player.get_provider(), stream))
+    return replay
+
+# Playback provider
+class ReplayInput(Inputs.InputProvider):
+    """Plays back a replay stream, holding nothing once it runs out"""
+
+    def __init__(self, stream: bytes):
+        self.stream = stream
+        self.offset = 0
+        self.held = Core.Input.NONE
+
+    def poll(self, player, game):
+        """Returns the (pressed, released, held) masks of this tick"""
+        if self.offset + Core.Input.SIZE > len(self.stream):
+            masks = (Core.Input.NONE, self.held, Core.Input.NONE)
+        else:
+            masks = Core.Input.unpack(self.stream, self.offset)
+            self.offset += Core.Input.SIZE
+        self.held = masks[2]
+        return masks
+
+def play(replay: Replay):
+    """Returns a headless game with its players driven by the replay"""
+    game = Headless.build_game(**replay.options())
+    for player, stream in zip(game.get_players(), replay.inputs):
+        player.set_provider(ReplayInput(bytes(stream)))
+    return game
+
+def record_bots(ticks: int, seed: int = 0, **setup) -> Replay:
+    """Returns the replay of a headless match between random bots, for testing rendering\n
+    setup - options of main.setup_game()
+    """
+    game = Headless.build_game(**setup)
+    for index, player in enumerate(game.get_players()):
+        player.set_provider(Inputs.RandomBot(seed=seed * Config.player.maxCount + index))
+    replay = record(game)
+    noEvents = []
+    noKeys = Headless.HeldKeys()
+    for _ in range(ticks):
+        game.update(noEvents, noKeys)
+    return replay
+
+def render(path: str, output: str, format: str = Config.capture.format, #pylint: disable=redefined-builtin
+           every: int = 1) -> typing.Tuple[str, int, float]:
+    """Re-simulates a replay, writing every 'every'-th frame under output\n
+    Returns (path, frames written, seconds taken)
+    """
+    start = time.perf_counter()
+    replay = Replay.load(path)
+    game = play(replay)
+
+    # Frames of each replay go to their own directory, or raw file
+    name = os.path.splitext(os.path.basename(path))[0]
+    target = os.path.join(output, name + (".rgb" if format == Capture.FrameCapture.RAW else ""))
+    capture = Capture.FrameCapture(target, game.surface.get_size(), format)
+
+    noEvents = []
+    noKeys = Headless.HeldKeys()
+    for tick in range(len(replay)):
+        game.update(noEvents, noKeys)
+        if tick % every == 0:
+            game.draw()
+            capture.capture(game.surface, wait=True)
+    capture.close()
+    return path, capture.written, time.perf_counter() - start
+
+def _render(job: tuple) -> typing.Tuple[str, int, float]:
+    """Pool entry point rendering one replay"""
+    return render(*job)
+
+def find(paths: typing.Iterable[str]) -> typing.List[str]:
+    """Returns the replay files among the paths, searching directories"""
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            found.extend(sorted(
+                os.path.join(path, name) for name in os.listdir(path) if name.endswith(EXTENSION)
+            ))
+        else:
+            found.append(path)
+    return found
+
+def main(argv: typing.List[str] = None):
+    """Renders a corpus of replays to frames in a process pool"""
+
+    parser = argparse.ArgumentParser(description="Renders Spook Fighters replays to frames")
+    parser.add_argument("replays", nargs="+",
+                        help=f"replay files, or directories of {EXTENSION} files")
+    parser.add_argument("--output", default="frames", help="directory frames are written under")
+    parser.add_argument("--format", default=Config.capture.format,
+                        help="image format of frames (png, bmp, ...), or raw for one rgb24 file per replay")
+    parser.add_argument("--every", type=int, default=1, help="render every N-th tick")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="processes rendering replays, one replay each at a time")
+    parser.add_argument("--generate", type=int, metavar="N",
+                        help="first write N replays of random bot matches into the (single) replay directory")
+    parser.add_argument("--ticks", type=int, default=Config.screen.fps * 60,
+                        help="length of generated replays")
+    parser.add_argument("--players", type=int, default=Config.player.count,
+                        help="players in generated replays")
+    args = parser.parse_args(argv)
+
+    Headless.init()
+
+    # Test corpus
+    if args.generate:
+        directory = args.replays[0]
+        os.makedirs(directory, exist_ok=True)
+        for seed in range(args.generate):
+            record_bots(args.ticks, seed, count=args.players).save(
+                os.path.join(directory, f"bots_{seed:04d}{EXTENSION}")
+            )
+        logger.info("render", f"Generated {args.generate} replays in {directory}")
+
+    paths = find(args.replays)
+    os.makedirs(args.output, exist_ok=True)
+    logger.info("render", f"Rendering {len(paths)} replays with {args.workers} workers")
+
+    # One replay per task, reported as each finishes
+    start = time.perf_counter()
+    frames = 0
+    jobs = [(path, args.output, args.format, args.every) for path in paths]
+    with multiprocessing.Pool(args.workers, initializer=Headless.init) as pool:
+        for done, (path, written, seconds) in enumerate(pool.imap_unordered(_render, jobs), 1):
+            frames += written
+            elapsed = time.perf_counter() - start
+            remaining = elapsed / done * (len(paths) - done)
+            logger.info("render", f"[{done}/{len(paths)}] {path}: {written} frames in {seconds:.1f}s,"
+                        f" {frames / elapsed:.0f} frames/s overall, about {remaining:.0f}s left")
+        # Let the workers exit, leaving the block would terminate them, which SDL can ignore
+        pool.close()
+        pool.join()
+
+    logger.info("render", f"Rendered {frames} frames of {len(paths)} replays"
+                f" in {time.perf_counter() - start:.1f}s")
+    logger.close()
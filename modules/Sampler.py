@@ -0,0 +1,73 @@
+"""Lightweight sampling profiler for Spook Fighters"""
+
+# Import bundled modules
+from collections import Counter
+import os
+import sys
+import threading
+import typing
+
+# Import local files
+from modules import Config
+
+# Sampling profiler class
+class Sampler:
+    """Samples the stack of a thread from a background thread at a fixed interval\n
+    Results are written in collapsed stack format (one 'a;b;c count' line per stack),
+    readable by flame graph tools
+    """
+
+    def __init__(self, interval: float = Config.sampler.interval,
+                 thread: threading.Thread = None):
+
+        # Seconds between samples
+        self.interval = interval
+
+        # Thread to sample, default the one creating the sampler
+        self.target = (thread or threading.current_thread()).ident
+
+        # Count of each collapsed stack
+        self.stacks = Counter()
+
+        # Background thread and the event stopping it
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="sampler", daemon=True)
+
+    def start(self):
+        """Starts sampling"""
+        self.thread.start()
+
+    def stop(self):
+        """Stops sampling and waits for the sampler thread"""
+        self.stopped.set()
+        self.thread.join()
+
+    def _run(self):
+        """Sampler thread loop"""
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.target) #pylint: disable=protected-access
+            if frame is not None:
+                self.stacks[self._collapse(frame)] += 1
+
+    @staticmethod
+    def _collapse(frame) -> str:
+        """Returns the stack of a frame as 'outer;...;inner'"""
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+    def dump(self, path: str):
+        """Writes the collapsed stacks to a file"""
+        with open(path, "w") as file:
+            for stack, count in self.stacks.most_common():
+                file.write(f"{stack} {count}\n")
+
+    def top(self, count: int = 10) -> typing.List[typing.Tuple[str, int]]:
+        """Returns the innermost functions seen most often, with their sample counts"""
+        leaves = Counter()
+        for stack, samples in self.stacks.items():
+            leaves[stack.rsplit(";", 1)[-1]] += samples
+        return leaves.most_common(count)
@@ -0,0 +1,111 @@
+"""Scene management for Spook Fighters"""
+
+# Import bundled modules
+import typing
+
+# Import local files
+from modules import Config
+from modules import Core
+
+# Scene manager class
+# Scenes are Core.Screen objects, only the active one is ticked,
+# every other built scene is suspended as is
+class SceneManager:
+    """Builds, switches between, resets and frees named scenes\n
+    Scenes are built from registered factories on first use, or ahead of time
+    between frames once preload() queues them. Building creates surfaces and
+    renders fonts, which pygame does not support from several threads at once
+    """
+
+    def __init__(self, budget: int = Config.scenes.memoryBudget):
+
+        # Approximate byte budget for built scenes
+        self.budget = budget
+
+        # Factories that build each scene
+        self.factories = {}
+
+        # Built scenes and the snapshot of their initial state
+        self.scenes = {}
+        self.snapshots = {}
+
+        # Scenes queued by preload(), built by load_pending()
+        self.pending = []
+
+        # Order scenes were last used in, most recent last
+        self.used = []
+
+        # Active scene
+        self.active = None
+        self.activeName = None
+
+    def register(self, name: str, factory: typing.Callable[[], Core.Screen]):
+        """Registers a factory used to build the named scene"""
+        self.factories[name] = factory
+
+    def _build(self, name: str):
+        """Builds a scene and records its initial snapshot"""
+        scene = self.factories[name]()
+        self.scenes[name] = scene
+        self.snapshots[name] = scene.snapshot()
+        if name in self.pending:
+            self.pending.remove(name)
+
+    def preload(self, name: str):
+        """Queues a scene to be built by load_pending(), if it is not built yet"""
+        if name not in self.scenes and name not in self.pending:
+            self.pending.append(name)
+
+    def load_pending(self):
+        """Builds the next queued scene, called by the main loop between frames"""
+        if self.pending:
+            self._build(self.pending[0])
+
+    def get(self, name: str) -> Core.Screen:
+        """Returns a scene, building it now if needed"""
+        if name not in self.scenes:
+            self._build(name)
+        return self.scenes[name]
+
+    def switch(self, name: str):
+        """Makes a scene the active one, suspending the previous"""
+        self.active = self.get(name)
+        self.activeName = name
+
+        # Remember usage and stay under budget
+        if name in self.used:
+            self.used.remove(name)
+        self.used.append(name)
+        self.enforce_budget()
+
+    def stop(self):
+        """Deactivates every scene, ending the main loop"""
+        self.active = None
+        self.activeName = None
+
+    def reset(self, name: str = None):
+        """Restores a scene (default the active one) to its initial state"""
+        if name is None:
+            name = self.activeName
+        self.get(name).restore(self.snapshots[name])
+
+    def free(self, name: str):
+        """Drops a built scene, it will be rebuilt on next use"""
+        if name == self.activeName:
+            raise ValueError(f"Cannot free active scene {name}")
+        self.scenes.pop(name, None)
+        self.snapshots.pop(name, None)
+        if name in self.used:
+            self.used.remove(name)
+
+    def memory_size(self) -> int:
+        """Returns the approximate bytes used by built scenes"""
+        return sum(scene.memory_size() for scene in self.scenes.values())
+
+    def enforce_budget(self):
+        """Frees least recently used suspended scenes until under budget"""
+        for name in list(self.used):
+            if self.memory_size() <= self.budget:
+                break
+            if name != self.activeName:
+                self.free(name)
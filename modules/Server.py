@@ -0,0 +1,657 @@
+"""Authoritative headless match server for Spook Fighters
+
+Run from the repository root with: python server.py --rooms 8
+Each room steps its own Game from the inputs of its clients, which join
+and send held input masks over UDP or TCP. Spectators watch rooms and
+are sent delta-compressed state instead. Add --simulate to fill every
+room with local simulated clients, and --processes to shard rooms
+across cores (room r is hosted on port + r % processes).
+"""
+
+# Import bundled modules
+import argparse
+import asyncio
+import multiprocessing
+import random
+import socket
+import struct
+import time
+import typing
+
+# Import local files
+from modules import Broadcast
+from modules import Config
+from modules import Core
+from modules import Headless
+from modules import Inputs
+from modules import Log
+
+# Packet kinds
+JOIN = 1
+JOINED = 2
+FULL = 3
+INPUT = 4
+STATE = 5
+LEAVE = 6
+WATCH = 7
+DELTA = 8
+ACK = 9
+
+# Every packet starts with its kind and room
+HEADER = struct.Struct("<BH")
+# JOINED: slot in the room
+JOINED_BODY = struct.Struct("<B")
+# INPUT: client tick, held Core.Input mask
+INPUT_BODY = struct.Struct("<IB")
+# ACK: tick of the last DELTA decoded
+ACK_BODY = struct.Struct("<I")
+# STATE: room tick and player count, then each player
+STATE_HEAD = struct.Struct("<IB")
+STATE_PLAYER = struct.Struct("<iihhHb")
+
+# TCP packets are framed by their length
+FRAME = struct.Struct("<H")
+
+# Server logger
+logger = Log.Logger()
+
+def shard_port(room: int, port: int = Config.server.port, processes: int = 1) -> int:
+    """Returns the port the given room is hosted on"""
+    return port + room % processes
+
+def encode_state(room: int, tick: int, players: typing.Sequence) -> bytes:
+    """Returns the STATE packet of a room"""
+    parts = [HEADER.pack(STATE, room), STATE_HEAD.pack(tick, len(players))]
+    for player in players:
+        parts.append(STATE_PLAYER.pack(
+            player.rect.x, player.rect.y, int(player.xSpeed), int(player.ySpeed),
+            min(player.damage.value, 0xFFFF), max(-128, min(player.lives.value, 127)),
+        ))
+    return b"".join(parts)
+
+def decode_state(data: bytes) -> typing.Tuple[int, int, typing.List[tuple]]:
+    """Returns the (room, tick, player tuples) of a STATE packet"""
+    _, room = HEADER.unpack_from(data)
+    tick, count = STATE_HEAD.unpack_from(data, HEADER.size)
+    offset = HEADER.size + STATE_HEAD.size
+    players = [
+        STATE_PLAYER.unpack_from(data, offset + index * STATE_PLAYER.size)
+        for index in range(count)
+    ]
+    return room, tick, players
+
+# Connected client
+class Client:
+    """A client of a room, holding how to send to it and when it was last heard from"""
+
+    def __init__(self, send: typing.Callable[[bytes], None], slot: int):
+        self.send = send
+        self.slot = slot
+        self.seen = time.monotonic()
+
+# Match room
+class Room:
+    """One match, stepped from the input of its clients\n
+    Slots without a client hold no input. The match restarts once
+    at most one player has lives left
+    """
+
+    def __init__(self, number: int, players: int = Config.server.players):
+
+        # Reference number
+        self.number = number
+
+        # Game, and the state it restarts from
+        self.game = Headless.build_game(count=players)
+        self.start = self.game.snapshot()
+
+        # Input of each slot
+        self.players = list(self.game.get_players())
+        self.inputs = [Inputs.ActionInput() for _ in self.players]
+        for player, provider in zip(self.players, self.inputs):
+            player.set_provider(provider)
+
+        # Clients by key (address or stream), and which slots they hold
+        self.clients = {}
+
+        # Spectators, sent deltas of the game state
+        self.broadcaster = Broadcast.Broadcaster(self.game, prefix=HEADER.pack(DELTA, number))
+
+        # Constant empty input for the game, players read their providers instead
+        self.noEvents = []
+        self.noKeys = Headless.HeldKeys()
+
+        # Stats
+        self.ticks = 0
+        self.matches = 0
+        self.late = 0
+
+    def join(self, key, send: typing.Callable[[bytes], None]) -> typing.Optional[int]:
+        """Adds a client, returning its slot, or None if the room is full"""
+        if key in self.clients:
+            return self.clients[key].slot
+        taken = {client.slot for client in self.clients.values()}
+        for slot in range(len(self.players)):
+            if slot not in taken:
+                self.clients[key] = Client(send, slot)
+                return slot
+        return None
+
+    def leave(self, key):
+        """Removes a client, releasing its slot"""
+        client = self.clients.pop(key, None)
+        if client is not None:
+            self.inputs[client.slot].set(Core.Input.NONE)
+
+    def receive(self, key, held: int):
+        """Applies the held input mask of a client"""
+        client = self.clients.get(key)
+        if client is not None:
+            client.seen = time.monotonic()
+            self.inputs[client.slot].set(held & Core.Input.ALL)
+
+    def step(self):
+        """Runs one tick and sends the state to every client"""
+
+        # Drop clients that went quiet
+        deadline = time.monotonic() - Config.server.timeout
+        for key in [key for key, client in self.clients.items() if client.seen < deadline]:
+            self.leave(key)
+
+        # Idle rooms don't simulate
+        if not self.clients:
+            return
+
+        self.game.update(self.noEvents, self.noKeys)
+        self.ticks += 1
+
+        # Restart finished matches
+        if sum(player.lives.value > 0 for player in self.players) <= 1:
+            self.game.restore(self.start)
+            self.matches += 1
+
+        state = encode_state(self.number, self.ticks, self.players)
+        for client in self.clients.values():
+            client.send(state)
+        self.broadcaster.broadcast(self.ticks)
+
+# Tick scheduler
+# Rooms tick at the same rate but at different phases of the frame,
+# so their simulation is spread out instead of all landing at once
+class TickScheduler:
+    """Steps rooms at a fixed rate, each at its own phase of the tick period"""
+
+    # Golden ratio conjugate, successive multiples of it spread evenly however many rooms there are
+    SPREAD = 0.6180339887498949
+
+    def __init__(self, rate: int = Config.server.rate):
+        self.period = 1 / rate
+        self.tasks = []
+
+    def phase(self, index: int) -> float:
+        """Returns the offset into the period the index-th room ticks at"""
+        return (index * self.SPREAD) % 1 * self.period
+
+    def add(self, room: Room):
+        """Starts stepping a room"""
+        self.tasks.append(asyncio.ensure_future(self._run(room, self.phase(len(self.tasks)))))
+
+    async def _run(self, room: Room, phase: float):
+        """Steps a room forever, at its phase of each period"""
+        loop = asyncio.get_event_loop()
+        # Align to the phase of the next period
+        now = loop.time()
+        deadline = now - now % self.period + phase + self.period
+        while True:
+            await asyncio.sleep(max(0.0, deadline - loop.time()))
+            # Count ticks starting over half a period late, skipping ticks missed entirely
+            lateness = loop.time() - deadline
+            if lateness > self.period / 2:
+                room.late += 1
+            if lateness > self.period:
+                deadline += lateness // self.period * self.period
+            room.step()
+            deadline += self.period
+
+    def stop(self):
+        """Stops stepping every room"""
+        for task in self.tasks:
+            task.cancel()
+
+# UDP transport
+class _DatagramProtocol(asyncio.DatagramProtocol):
+    """Hands datagrams to the server"""
+
+    def __init__(self, server: "MatchServer"):
+        self.server = server
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        transport = self.transport
+        self.server.handle(data, addr, lambda packet: transport.sendto(packet, addr))
+
+# Match server
+class MatchServer:
+    """Hosts rooms, taking packets over both UDP and TCP on one port"""
+
+    def __init__(self, rooms: typing.Iterable[int], host: str = Config.server.host,
+                 port: int = Config.server.port, players: int = Config.server.players,
+                 rate: int = Config.server.rate):
+
+        # Reference address
+        self.host = host
+        self.port = port
+
+        # Rooms by number
+        self.rooms = {number: Room(number, players) for number in rooms}
+
+        # Scheduler stepping the rooms
+        self.scheduler = TickScheduler(rate)
+
+        # Listeners
+        self.transport = None
+        self.listener = None
+
+        # Packets that could not be read
+        self.invalid = 0
+
+    async def start(self):
+        """Starts listening and stepping rooms"""
+        loop = asyncio.get_event_loop()
+        self.transport, _ = await loop.create_datagram_endpoint(
+            lambda: _DatagramProtocol(self), local_addr=(self.host, self.port)
+        )
+        self.listener = await asyncio.start_server(self._stream, self.host, self.port)
+        for room in self.rooms.values():
+            self.scheduler.add(room)
+
+    def close(self):
+        """Stops stepping rooms and listening"""
+        self.scheduler.stop()
+        if self.transport is not None:
+            self.transport.close()
+        if self.listener is not None:
+            self.listener.close()
+
+    def handle(self, data: bytes, key, send: typing.Callable[[bytes], None]):
+        """Handles one packet from the client identified by key"""
+        try:
+            kind, number = HEADER.unpack_from(data)
+            room = self.rooms.get(number)
+            if room is None:
+                raise ValueError(f"No room {number}")
+            if kind == JOIN:
+                slot = room.join(key, send)
+                if slot is None:
+                    send(HEADER.pack(FULL, number))
+                else:
+                    send(HEADER.pack(JOINED, number) + JOINED_BODY.pack(slot))
+            elif kind == INPUT:
+                _, held = INPUT_BODY.unpack_from(data, HEADER.size)
+                room.receive(key, held)
+            elif kind == WATCH:
+                room.broadcaster.add(key, send)
+            elif kind == ACK:
+                tick, = ACK_BODY.unpack_from(data, HEADER.size)
+                room.broadcaster.ack(key, tick)
+            elif kind == LEAVE:
+                room.leave(key)
+                room.broadcaster.remove(key)
+            else:
+                raise ValueError(f"Unexpected packet kind {kind}")
+        except (struct.error, ValueError):
+            self.invalid += 1
+
+    async def _stream(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Reads framed packets from a TCP client until it disconnects"""
+        def send(packet):
+            writer.write(FRAME.pack(len(packet)) + packet)
+        try:
+            while True:
+                length, = FRAME.unpack(await reader.readexactly(FRAME.size))
+                self.handle(await reader.readexactly(length), writer, send)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            # Leave every room joined over the stream
+            for room in self.rooms.values():
+                room.leave(writer)
+                room.broadcaster.remove(writer)
+            writer.close()
+
+    def report(self) -> str:
+        """Returns a line of stats for each room"""
+        return "\n".join(
+            f"room {room.number}: ticks={room.ticks} late={room.late} "
+            f"matches={room.matches} clients={len(room.clients)} "
+            f"spectators={len(room.broadcaster)} broadcast={room.broadcaster.sent}B"
+            f"/{room.broadcaster.packets}"
+            for room in self.rooms.values()
+        )
+
+# Simulated client
+class SimulatedClient:
+    """Local client joining a room over UDP or TCP and sending random held input each tick"""
+
+    def __init__(self, room: int, host: str = Config.server.host, port: int = Config.server.port,
+                 transport: str = "udp", rate: int = Config.server.rate, seed: int = 0):
+
+        # Reference address
+        self.room = room
+        self.host = host
+        self.port = port
+        self.kind = transport
+        self.period = 1 / rate
+
+        # Input, toggled at random like Inputs.RandomBot
+        self.random = random.Random(seed)
+        self.held = Core.Input.NONE
+
+        # Join result, and the states received
+        self.slot = None
+        self.states = 0
+        self.lastTick = 0
+
+        # How to send a packet, set once connected
+        self.send = None
+        self.closer = None
+
+    def receive(self, data: bytes):
+        """Handles a packet from the server"""
+        kind, _ = HEADER.unpack_from(data)
+        if kind == JOINED:
+            self.slot, = JOINED_BODY.unpack_from(data, HEADER.size)
+        elif kind == STATE:
+            self.states += 1
+            _, self.lastTick, _ = decode_state(data)
+
+    async def connect(self):
+        """Opens the connection"""
+        loop = asyncio.get_event_loop()
+        if self.kind == "udp":
+            client = self
+            class Protocol(asyncio.DatagramProtocol):
+                """Hands datagrams to the client"""
+                def datagram_received(self, data, addr):
+                    client.receive(data)
+            transport, _ = await loop.create_datagram_endpoint(
+                Protocol, remote_addr=(self.host, self.port)
+            )
+            self.send = transport.sendto
+            self.closer = transport.close
+        else:
+            reader, writer = await asyncio.open_connection(self.host, self.port)
+            self.send = lambda packet: writer.write(FRAME.pack(len(packet)) + packet)
+            self.closer = writer.close
+            asyncio.ensure_future(self._read(reader))
+
+    async def _read(self, reader: asyncio.StreamReader):
+        """Reads framed packets from the server"""
+        try:
+            while True:
+                length, = FRAME.unpack(await reader.readexactly(FRAME.size))
+                self.receive(await reader.readexactly(length))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+
+    async def play(self, duration: float):
+        """Joins and sends input every tick for the duration"""
+        await self.connect()
+        self.send(HEADER.pack(JOIN, self.room))
+        tick = 0
+        end = time.monotonic() + duration
+        while time.monotonic() < end:
+            # Rejoin until a slot is given (joins may be lost over UDP)
+            if self.slot is None and tick % 30 == 0:
+                self.send(HEADER.pack(JOIN, self.room))
+            for bit in (Core.Input.UP, Core.Input.DOWN, Core.Input.LEFT,
+                        Core.Input.RIGHT, Core.Input.ACTION, Core.Input.ATTACK):
+                if self.random.random() < 0.1:
+                    self.held ^= bit
+            self.send(HEADER.pack(INPUT, self.room) + INPUT_BODY.pack(tick, self.held))
+            tick += 1
+            await asyncio.sleep(self.period)
+        self.send(HEADER.pack(LEAVE, self.room))
+        self.closer()
+
+# Spectator decoding
+class Spectator:
+    """Decodes the DELTA packets of a watched room, acking each state decoded"""
+
+    def __init__(self, room: int, send: typing.Callable[[bytes], None] = None):
+
+        # Reference room, and how to send acks
+        self.room = room
+        self.send = send
+
+        # Decoded snapshots by tick, and the latest
+        self.states = {}
+        self.latest = None
+
+        # Bytes received and deltas that could not be decoded
+        self.received = 0
+        self.missed = 0
+
+    def watch(self):
+        """Asks the server for the room's state"""
+        self.send(HEADER.pack(WATCH, self.room))
+
+    def receive(self, data: bytes) -> typing.Optional[Broadcast.Snapshot]:
+        """Handles a packet, returning the snapshot decoded from it if it is the newest"""
+        kind, _ = HEADER.unpack_from(data)
+        if kind != DELTA:
+            return None
+        self.received += len(data)
+        snapshot = Broadcast.decode(data, HEADER.size, self.states)
+        if snapshot is None:
+            self.missed += 1
+            return None
+        self.states[snapshot.tick] = snapshot
+        self.send(HEADER.pack(ACK, self.room) + ACK_BODY.pack(snapshot.tick))
+        if self.latest is not None and snapshot.tick <= self.latest.tick:
+            return None
+        # Forget states the server can no longer base deltas on
+        for tick in [tick for tick in self.states
+                     if tick <= snapshot.tick - Config.broadcast.history]:
+            del self.states[tick]
+        self.latest = snapshot
+        return snapshot
+
+# Spectator client for the game
+class SpectatorClient(Spectator):
+    """Watches a room over UDP, mirroring it onto a game without simulating it\n
+    Set as the remote of a Game, which then calls update() instead of simulating
+    """
+
+    def __init__(self, room: int, host: str = Config.server.host,
+                 port: int = Config.server.port):
+
+        # Non-blocking socket, polled each frame
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.setblocking(False)
+        self.socket.connect((host, port))
+        super().__init__(room, self._send)
+
+        # Replica of the game being updated, and when the server was last asked for state
+        self.replica = None
+        self.watched = 0.0
+
+    def _send(self, packet: bytes):
+        """Sends a packet, ignoring a missing server"""
+        try:
+            self.socket.send(packet)
+        except OSError:
+            pass
+
+    def update(self, game):
+        """Applies the newest state received to the game"""
+        if self.replica is None or self.replica.game is not game:
+            self.replica = Broadcast.Replica(game)
+
+        # Ask again until state arrives, and now and then in case the server restarted
+        now = time.monotonic()
+        if now - self.watched > 1.0:
+            self.watch()
+            self.watched = now
+
+        newest = None
+        while True:
+            try:
+                data = self.socket.recv(65536)
+            except (BlockingIOError, InterruptedError):
+                break
+            except OSError:
+                # Server not up (yet)
+                break
+            snapshot = self.receive(data)
+            if snapshot is not None:
+                newest = snapshot
+        if newest is not None:
+            self.replica.apply(newest)
+
+    def close(self):
+        """Closes the socket"""
+        self.send(HEADER.pack(LEAVE, self.room))
+        self.socket.close()
+
+async def spectate(room: int, duration: float, host: str = Config.server.host,
+                   port: int = Config.server.port) -> Spectator:
+    """Watches a room over UDP for the duration"""
+    loop = asyncio.get_event_loop()
+    spectator = Spectator(room)
+    class Protocol(asyncio.DatagramProtocol):
+        """Hands datagrams to the spectator"""
+        def datagram_received(self, data, addr):
+            spectator.receive(data)
+    transport, _ = await loop.create_datagram_endpoint(Protocol, remote_addr=(host, port))
+    spectator.send = transport.sendto
+    end = time.monotonic() + duration
+    while time.monotonic() < end:
+        if spectator.latest is None:
+            spectator.watch()
+        await asyncio.sleep(0.25)
+    spectator.send(HEADER.pack(LEAVE, room))
+    transport.close()
+    return spectator
+
+async def simulate(rooms: int, players: int, duration: float, host: str = Config.server.host,
+                   port: int = Config.server.port, processes: int = 1,
+                   rate: int = Config.server.rate, spectators: int = 0):
+    """Fills every room with simulated clients, alternating UDP and TCP, for the duration\n
+    Returns the clients and the spectators watching each room
+    """
+    clients = [
+        SimulatedClient(room, host, shard_port(room, port, processes),
+                        transport=("udp", "tcp")[slot % 2], rate=rate, seed=room * players + slot)
+        for room in range(rooms) for slot in range(players)
+    ]
+    watching = [
+        spectate(room, duration, host, shard_port(room, port, processes))
+        for room in range(rooms) for _ in range(spectators)
+    ]
+    results = await asyncio.gather(*(client.play(duration) for client in clients), *watching)
+    return clients, results[len(clients):]
+
+async def serve(rooms: typing.Iterable[int], host: str, port: int, players: int, rate: int,
+                duration: float = None, ready=None) -> MatchServer:
+    """Runs a server for the duration, or forever if None"""
+    server = MatchServer(rooms, host, port, players, rate)
+    await server.start()
+    if ready is not None:
+        ready.set()
+    try:
+        if duration is None:
+            await asyncio.Event().wait()
+        else:
+            await asyncio.sleep(duration)
+    finally:
+        server.close()
+    return server
+
+def _shard(index: int, args, ready, duration: typing.Optional[float]):
+    """Process entry point serving every room of one shard"""
+    Headless.init()
+    rooms = range(index, args.rooms, args.processes)
+    server = asyncio.run(serve(rooms, args.host, args.port + index, args.players, args.rate,
+                               duration, ready))
+    for line in server.report().splitlines():
+        logger.info("server", line)
+    # Shard processes exit without running atexit handlers
+    logger.close()
+
+def _wait_ready(shards: typing.List[tuple], timeout: float = Config.server.startTimeout):
+    """Waits for every shard to start serving, stopping them all if one dies or is too slow"""
+    deadline = time.monotonic() + timeout
+    for process, ready in shards:
+        while not ready.wait(0.1):
+            if process.exitcode is not None:
+                problem = f"{process.name} exited with code {process.exitcode} before serving"
+            elif time.monotonic() > deadline:
+                problem = f"{process.name} did not start serving within {timeout}s"
+            else:
+                continue
+            for other, _ in shards:
+                if other.is_alive():
+                    other.terminate()
+            raise RuntimeError(problem)
+
+def main(argv: typing.List[str] = None):
+    """Runs the server, with simulated clients if asked"""
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default=Config.server.host)
+    parser.add_argument("--port", type=int, default=Config.server.port,
+                        help="port of the first shard, shard i listens on port + i")
+    parser.add_argument("--rooms", type=int, default=Config.server.rooms)
+    parser.add_argument("--players", type=int, default=Config.server.players,
+                        help="players per room")
+    parser.add_argument("--rate", type=int, default=Config.server.rate, help="ticks per second")
+    parser.add_argument("--processes", type=int, default=1,
+                        help="processes to shard rooms across")
+    parser.add_argument("--simulate", action="store_true",
+                        help="fill every room with local simulated clients")
+    parser.add_argument("--spectators", type=int, default=0,
+                        help="simulated spectators watching each room")
+    parser.add_argument("--duration", type=float,
+                        help="seconds to run for, default forever (10 when simulating)")
+    args = parser.parse_args(argv)
+
+    duration = args.duration
+    if duration is None and args.simulate:
+        duration = 10.0
+
+    # Shards run in their own processes, outliving the simulation slightly
+    serverTime = None if duration is None else duration + 1
+    shards = []
+    for index in range(args.processes):
+        ready = multiprocessing.Event()
+        process = multiprocessing.Process(target=_shard, args=(index, args, ready, serverTime),
+                                          name=f"shard-{index}")
+        process.start()
+        shards.append((process, ready))
+    _wait_ready(shards)
+    logger.info("server", f"Serving {args.rooms} rooms on {args.host}:{args.port}"
+                f" across {args.processes} processes")
+
+    if args.simulate:
+        clients, spectators = asyncio.run(simulate(
+            args.rooms, args.players, duration, args.host, args.port, args.processes,
+            args.rate, args.spectators,
+        ))
+        joined = sum(client.slot is not None for client in clients)
+        states = sum(client.states for client in clients)
+        logger.info("server", f"{joined}/{len(clients)} simulated clients joined,"
+                    f" {states} states received")
+        if spectators:
+            received = sum(spectator.received for spectator in spectators)
+            ticks = sum(len(spectator.states) > 0 for spectator in spectators)
+            missed = sum(spectator.missed for spectator in spectators)
+            logger.info("server", f"{ticks}/{len(spectators)} spectators received state,"
+                        f" {received} bytes, {missed} undecodable deltas")
+
+    for process, _ in shards:
+        process.join()
+    logger.close()
@@ -0,0 +1,128 @@
+"""Spatial hashing broadphase for Spook Fighters"""
+
+# Import bundled modules
+import typing
+
+# Import structure libraries
+import pygame
+
+# Import local files
+from modules import Config
+
+# Uniform grid spatial hash
+# Items are bucketed by every cell their bounds overlap, so a query only
+# looks at items near it instead of every item in the game
+class SpatialHash:
+    """Buckets items by the grid cells their bounds overlap\n
+    Queries return candidates near an area, which still need an exact overlap test
+    """
+
+    def __init__(self, cellSize: int = Config.broadphase.cellSize):
+
+        # Width and height of a cell
+        self.cellSize = cellSize
+
+        # Items of each (x, y) cell
+        self.cells = {}
+
+    def __len__(self):
+        """Returns the number of occupied cells"""
+        return len(self.cells)
+
+    def clear(self):
+        """Removes every item"""
+        self.cells.clear()
+
+    def _span(self, left, top, right, bottom) -> typing.Tuple[range, range]:
+        """Returns the ranges of cell columns and rows an area overlaps"""
+        size = self.cellSize
+        return (
+            range(int(left // size), int((right - 1) // size) + 1),
+            range(int(top // size), int((bottom - 1) // size) + 1),
+        )
+
+    def insert(self, item, left, top, right, bottom):
+        """Adds an item covering the given area"""
+        cells = self.cells
+        columns, rows = self._span(left, top, right, bottom)
+        for column in columns:
+            for row in rows:
+                bucket = cells.get((column, row))
+                if bucket is None:
+                    cells[(column, row)] = [item]
+                else:
+                    bucket.append(item)
+
+    def remove(self, item, left, top, right, bottom):
+        """Removes an item inserted with the same area"""
+        cells = self.cells
+        columns, rows = self._span(left, top, right, bottom)
+        for column in columns:
+            for row in rows:
+                bucket = cells[(column, row)]
+                bucket.remove(item)
+                if not bucket:
+                    del cells[(column, row)]
+
+    def query(self, left, top, right, bottom) -> list:
+        """Returns the items in the cells an area overlaps, each once"""
+        cells = self.cells
+        columns, rows = self._span(left, top, right, bottom)
+
+        # Common case of a small area within one cell needs no deduplication
+        if len(columns) == 1 and len(rows) == 1:
+            return list(cells.get((columns[0], rows[0]), ()))
+
+        found = []
+        seen = set()
+        for column in columns:
+            for row in rows:
+                for item in cells.get((column, row), ()):
+                    if item not in seen:
+                        seen.add(item)
+                        found.append(item)
+        return found
+
+# Sprite group indexed by area
+# The index follows the group, so sprites leave it when killed or when the
+# group is emptied, as Game.restore() does
+class SceneryGroup(pygame.sprite.Group):
+    """Group of sprites that do not move while in it, found by area\n
+    Sprites are numbered in the order they were added, which is the order
+    query() returns them in
+    """
+
+    def __init__(self, cellSize: int = Config.camera.cellSize):
+        super().__init__()
+
+        # Index of the sprites
+        self.index = SpatialHash(cellSize)
+
+        # Number and indexed area of each sprite, and the number of the next
+        self.entries = {}
+        self.count = 0
+
+    def add_internal(self, sprite, *args):
+        """Adds a sprite to the group and the index"""
+        super().add_internal(sprite, *args)
+        rect = sprite.rect
+        area = (rect.left, rect.top, rect.right, rect.bottom)
+        self.entries[sprite] = (self.count, area)
+        self.count += 1
+        self.index.insert(sprite, *area)
+
+    def remove_internal(self, sprite):
+        """Removes a sprite from the group and the index"""
+        super().remove_internal(sprite)
+        _, area = self.entries.pop(sprite)
+        self.index.remove(sprite, *area)
+        # Numbers start over once empty, so re-adding everything does not grow them
+        if not self.entries:
+            self.count = 0
+
+    def query(self, left, top, right, bottom) -> list:
+        """Returns the sprites in the cells an area overlaps, in the order they were added"""
+        found = self.index.query(left, top, right, bottom)
+        entries = self.entries
+        found.sort(key=lambda sprite: entries[sprite][0])
+        return found
@@ -0,0 +1,289 @@
+"""Simulation in a separate process from rendering, for Spook Fighters
+
+The simulation process steps the game at a fixed rate and publishes the state
+of every tick into a shared memory double buffer. The rendering process reads
+the newest complete state and mirrors it onto its own game, which it only draws.
+Needs Python 3.8+ for multiprocessing.shared_memory
+"""
+
+# Import bundled modules
+import array
+import itertools
+import multiprocessing
+import time
+import typing
+
+# Shared memory is new in Python 3.8
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    shared_memory = None
+
+# Import local files
+from modules import Broadcast
+from modules import Config
+from modules import Headless
+from modules import Inputs
+
+# Layout of the control block: front buffer, stop flag, resets asked for
+FRONT = 0
+STOP = 1
+RESETS = 2
+CONTROL = 3
+
+# Layout of each buffer's header: sequence, tick, resets done, player count, projectile count
+SEQUENCE = 0
+TICK = 1
+RESET = 2
+PLAYERS = 3
+PROJECTILES = 4
+HEADER = 5
+
+# Values per player (see Broadcast.PLAYER_FIELDS) and per projectile (id, x, y, width, height, red, green, blue)
+PLAYER_VALUES = len(Broadcast.PLAYER_FIELDS)
+PROJECTILE_VALUES = 8
+
+# Double buffered state
+class StateBuffer:
+    """Game state and player input in shared memory, with one writing and one reading process\n
+    The writer fills the back buffer and then makes it the front. Each buffer's
+    sequence is odd while it is written, so a read that raced a write is noticed
+    and dropped instead of returning a torn state. Buffers written before the
+    newest reset asked for are dropped the same way
+    """
+
+    def __init__(self, players: int, projectiles: int = Config.projectiles.limit,
+                 name: str = None):
+        """players, projectiles - most of each a buffer holds\n
+        name - shared memory to attach to, a new block is created if None
+        """
+        if shared_memory is None:
+            raise RuntimeError("Split simulation needs Python 3.8+")
+
+        # Capacity
+        self.playerCapacity = players
+        self.projectileCapacity = projectiles
+
+        # Resets done by the writer
+        self.resets = 0
+
+        # Sizes of the parts, in int64 values
+        self.bufferSize = HEADER + players * PLAYER_VALUES + projectiles * PROJECTILE_VALUES
+        size = CONTROL + players + 2 * self.bufferSize
+
+        # Create or attach to the block, the creator unlinks it
+        self.owner = name is None
+        self.memory = shared_memory.SharedMemory(name=name, create=self.owner, size=size * 8)
+        self.values = self.memory.buf[:size * 8].cast("q")
+        if self.owner:
+            self.values[:] = array.array("q", bytes(size * 8))
+
+        # Views of the parts
+        self.control = self.values[:CONTROL]
+        # Held Core.Input mask of each player, written by the reader
+        self.inputs = self.values[CONTROL:CONTROL + players]
+        # Header, player rows and projectile rows of each buffer, rows laid out flat
+        self.buffers = []
+        start = CONTROL + players
+        for _ in range(2):
+            headerEnd = start + HEADER
+            playersEnd = headerEnd + players * PLAYER_VALUES
+            self.buffers.append((
+                self.values[start:headerEnd],
+                self.values[headerEnd:playersEnd],
+                self.values[playersEnd:start + self.bufferSize],
+            ))
+            start += self.bufferSize
+
+    def get_name(self) -> str:
+        """Returns the name other processes attach with"""
+        return self.memory.name
+
+    def publish(self, snapshot: Broadcast.Snapshot):
+        """Writes a snapshot to the back buffer and flips it to the front"""
+        back = 1 - self.control[FRONT]
+        header, players, projectiles = self.buffers[back]
+
+        # Odd sequence while writing
+        header[SEQUENCE] += 1
+
+        playerCount = min(len(snapshot.players), self.playerCapacity)
+        if playerCount:
+            players[:playerCount * PLAYER_VALUES] = array.array(
+                "q", itertools.chain.from_iterable(snapshot.players[:playerCount])
+            )
+
+        # Projectiles past the capacity are not shown
+        projectileCount = min(len(snapshot.projectiles), self.projectileCapacity)
+        if projectileCount:
+            rows = itertools.islice(snapshot.projectiles.items(), projectileCount)
+            projectiles[:projectileCount * PROJECTILE_VALUES] = array.array(
+                "q", itertools.chain.from_iterable(
+                    (number, x, y, width, height, *color)
+                    for number, (x, y, width, height, color) in rows
+                )
+            )
+
+        header[TICK] = snapshot.tick
+        header[RESET] = self.resets
+        header[PLAYERS] = playerCount
+        header[PROJECTILES] = projectileCount
+        header[SEQUENCE] += 1
+
+        self.control[FRONT] = back
+
+    def read(self) -> typing.Optional[Broadcast.Snapshot]:
+        """Returns the snapshot in the front buffer, None if it is being written"""
+        header, players, projectiles = self.buffers[self.control[FRONT]]
+        sequence = header[SEQUENCE]
+        if sequence % 2:
+            return None
+        tick, resets, playerCount, projectileCount = header[TICK:].tolist()
+        playerValues = players[:playerCount * PLAYER_VALUES].tolist()
+        projectileValues = projectiles[:projectileCount * PROJECTILE_VALUES].tolist()
+        # Written over since the read began, or before the game was reset
+        if header[SEQUENCE] != sequence or resets != self.control[RESETS]:
+            return None
+        return Broadcast.Snapshot(
+            tick,
+            tuple(
+                tuple(playerValues[start:start + PLAYER_VALUES])
+                for start in range(0, len(playerValues), PLAYER_VALUES)
+            ),
+            {
+                projectileValues[start]: (*projectileValues[start + 1:start + 5],
+                                          tuple(projectileValues[start + 5:start + PROJECTILE_VALUES]))
+                for start in range(0, len(projectileValues), PROJECTILE_VALUES)
+            },
+        )
+
+    def reset(self):
+        """Asks the simulation process to reset its game"""
+        self.control[RESETS] += 1
+
+    def reset_asked(self) -> bool:
+        """Returns whether a reset was asked for since the last call, by the simulation process"""
+        resets = self.control[RESETS]
+        if resets == self.resets:
+            return False
+        self.resets = resets
+        return True
+
+    def stop(self):
+        """Asks the simulation process to stop"""
+        self.control[STOP] = 1
+
+    def stopped(self) -> bool:
+        """Returns whether the simulation process was asked to stop"""
+        return bool(self.control[STOP])
+
+    def close(self):
+        """Detaches from the block, removing it if this side created it"""
+        # Views must be released before the memory can close
+        views = (self.control, self.inputs, *itertools.chain.from_iterable(self.buffers), self.values)
+        for view in views:
+            view.release()
+        self.values = self.control = self.inputs = self.buffers = None
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
+
+def _simulate(name: str, players: int, options: dict, rate: int):
+    """Process entry point stepping a headless game and publishing each tick"""
+    Headless.init()
+    game = Headless.build_game(**options)
+    start = game.snapshot()
+    buffer = StateBuffer(players, name=name)
+    broadcaster = Broadcast.Broadcaster(game)
+
+    # Keyboard players are driven by the input the renderer writes
+    controls = []
+    for index, player in enumerate(game.get_players()):
+        if isinstance(player.get_provider(), Inputs.KeyboardInput):
+            control = Inputs.ActionInput()
+            player.set_provider(control)
+            controls.append((index, control))
+
+    # Constant empty input for the game, players read their providers instead
+    noEvents = []
+    noKeys = Headless.HeldKeys()
+
+    period = 1 / rate
+    deadline = time.perf_counter()
+    tick = 0
+    while not buffer.stopped():
+        if buffer.reset_asked():
+            game.restore(start)
+        for index, control in controls:
+            control.set(buffer.inputs[index])
+        game.update(noEvents, noKeys)
+        tick += 1
+        buffer.publish(broadcaster.capture(tick))
+
+        # Fixed rate, starting over instead of catching up when far behind
+        deadline += period
+        delay = deadline - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        elif delay < -period:
+            deadline = time.perf_counter()
+
+    buffer.close()
+
+# Remote for a rendering game
+class SimulationProcess:
+    """Runs a game's simulation in another process, mirroring it onto the game\n
+    Set as the remote of a Game, which then calls update() instead of simulating.
+    Keyboard players' input is read here and written for the simulation to use
+    """
+
+    def __init__(self, rate: int = Config.screen.fps, **options):
+        """rate - ticks per second simulated\n
+        options - match setup, passed on to main.setup_game()
+        """
+
+        # Shared state, sized for the largest match
+        self.buffer = StateBuffer(Config.player.maxCount)
+
+        # Simulation, spawned so it gets its own headless pygame
+        context = multiprocessing.get_context("spawn")
+        self.process = context.Process(
+            target=_simulate,
+            args=(self.buffer.get_name(), Config.player.maxCount, options, rate),
+            daemon=True,
+        )
+        self.process.start()
+
+        # Replica of the game being updated, and the tick last applied
+        self.replica = None
+        self.tick = 0
+
+    def update(self, game):
+        """Passes on keyboard input and applies the newest published state to the game"""
+        if self.replica is None or self.replica.game is not game:
+            self.replica = Broadcast.Replica(game)
+
+        # Taps shorter than a frame still count as held for a tick
+        inputs = self.buffer.inputs
+        for index, player in enumerate(game.get_players()):
+            provider = player.get_provider()
+            if isinstance(provider, Inputs.KeyboardInput):
+                pressed, _, held = provider.poll(player, game)
+                inputs[index] = held | pressed
+
+        snapshot = self.buffer.read()
+        if snapshot is not None and snapshot.tick != self.tick:
+            self.tick = snapshot.tick
+            self.replica.apply(snapshot)
+
+    def reset(self):
+        """Resets the simulated game to how it started, the game keeps its state until then"""
+        self.buffer.reset()
+
+    def close(self):
+        """Stops the simulation and frees the shared memory"""
+        self.buffer.stop()
+        self.process.join(timeout=1.0)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.buffer.close()
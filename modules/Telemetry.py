@@ -0,0 +1,158 @@
+"""Frame time and input latency telemetry for Spook Fighters"""
+
+# Import bundled modules
+import bisect
+import os
+import time
+import typing
+
+# Import structure libraries
+import pygame
+
+# Import local files
+from modules import Config
+
+# Prometheus style histogram
+class Histogram:
+    """Cumulative bucket histogram, rendered in Prometheus text format"""
+
+    def __init__(self, name: str, description: str,
+                 buckets: typing.Sequence[float] = Config.telemetry.buckets):
+
+        # Reference metadata
+        self.name = name
+        self.description = description
+
+        # Upper bounds, and the count of observations falling in each (last is +Inf)
+        self.bounds = list(buckets)
+        self.counts = [0] * (len(self.bounds) + 1)
+
+        # Totals
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        """Records one observation"""
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self) -> typing.List[str]:
+        """Returns the Prometheus text lines of the histogram"""
+        lines = [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} histogram",
+        ]
+        cumulative = 0
+        for bound, count in zip(self.bounds + ["+Inf"], self.counts):
+            cumulative += count
+            lines.append(f'{self.name}_bucket{{le="{bound}"}} {cumulative}')
+        lines.append(f"{self.name}_sum {self.sum}")
+        lines.append(f"{self.name}_count {self.count}")
+        return lines
+
+# Per frame telemetry
+class FrameTelemetry:
+    """Aggregates frame timings and input latency, writing them to a metrics file periodically\n
+    Pygame does not expose when a key event arrived, only that it arrived after the
+    previous poll, so key events are timed from that poll to the flip of the first
+    frame simulated after them: the worst case latency a key press could have seen
+    """
+
+    def __init__(self, path: str, fps: int = Config.screen.fps,
+                 interval: float = Config.telemetry.interval):
+
+        # Reference output
+        self.path = path
+        self.interval = interval
+        self.lastWrite = time.perf_counter()
+
+        # Target frame time
+        self.target = 1 / fps
+
+        # Histograms
+        self.simulation = Histogram("spook_frame_simulation_seconds",
+                                    "Time spent updating the game per frame")
+        self.render = Histogram("spook_frame_render_seconds",
+                                "Time spent drawing and flipping per frame")
+        self.sleep = Histogram("spook_frame_sleep_seconds",
+                               "Time spent waiting for the next frame")
+        self.jitter = Histogram("spook_frame_jitter_seconds",
+                                "Absolute difference between frame time and target")
+        self.latency = Histogram("spook_input_latency_seconds",
+                                 "Time from the poll before a key event to its flipped frame")
+        self.sampleToFlip = Histogram("spook_frame_sample_to_flip_seconds",
+                                      "Time from sampling input to flipping its frame")
+
+        # Frames over budget
+        self.missed = 0
+        self.frames = 0
+
+        # Key events waiting for their frame to be flipped
+        self.pending = []
+
+        # Previous time input was sampled, the earliest a new key event can have arrived
+        self.lastSample = None
+
+        # Flip of the previous frame
+        self.previous = None
+
+    def keys(self, events: typing.Iterable[pygame.event.Event], sampled: float):
+        """Records the key events taken off the queue at the given time"""
+        arrival = sampled if self.lastSample is None else self.lastSample
+        for event in events:
+            if event.type in (pygame.KEYDOWN, pygame.KEYUP):
+                self.pending.append(arrival)
+        self.lastSample = sampled
+
+    def frame(self, sampled: float, simulated: float, flipped: float, slept: float):
+        """Records one frame from its timestamps (time.perf_counter())\n
+        sampled - input gathered, simulated - update done, flipped - display flipped,
+        slept - seconds waited before the frame
+        """
+        self.simulation.observe(simulated - sampled)
+        self.render.observe(flipped - simulated)
+        self.sleep.observe(slept)
+        self.sampleToFlip.observe(flipped - sampled)
+
+        # Frame time is measured between flips
+        if self.previous is not None:
+            frameTime = flipped - self.previous
+            self.jitter.observe(abs(frameTime - self.target))
+            if frameTime > self.target * Config.telemetry.missedFactor:
+                self.missed += 1
+        self.previous = flipped
+        self.frames += 1
+
+        # Input shown this frame
+        for arrival in self.pending:
+            self.latency.observe(flipped - arrival)
+        self.pending.clear()
+
+        # Write periodically
+        if flipped - self.lastWrite >= self.interval:
+            self.write()
+            self.lastWrite = flipped
+
+    def render_text(self) -> str:
+        """Returns every metric in Prometheus text format"""
+        lines = []
+        for histogram in (self.simulation, self.render, self.sleep, self.jitter,
+                          self.latency, self.sampleToFlip):
+            lines.extend(histogram.render())
+        lines.extend((
+            "# HELP spook_frames_total Frames run",
+            "# TYPE spook_frames_total counter",
+            f"spook_frames_total {self.frames}",
+            "# HELP spook_frames_missed_total Frames that took longer than their budget",
+            "# TYPE spook_frames_missed_total counter",
+            f"spook_frames_missed_total {self.missed}",
+        ))
+        return "\n".join(lines) + "\n"
+
+    def write(self):
+        """Writes the metrics file, replacing it atomically so scrapers never see half"""
+        temporary = self.path + ".tmp"
+        with open(temporary, "w") as file:
+            file.write(self.render_text())
+        os.replace(temporary, self.path)
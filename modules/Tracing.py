@@ -0,0 +1,106 @@
+"""Chrome trace export of simulation ticks for Spook Fighters"""
+
+# Import bundled modules
+import functools
+import json
+import os
+import queue
+import threading
+import time
+import typing
+
+# Import local files
+from modules import Config
+
+# Span recorder with a background writer
+class Tracer:
+    """Records spans and writes them as Chrome Trace Event JSON\n
+    Spans are buffered, full buffers are handed to a writer thread so the
+    traced thread never touches the file
+    """
+
+    def __init__(self, path: str, bufferSize: int = Config.tracing.bufferSize):
+
+        # Reference output
+        self.path = path
+        self.bufferSize = bufferSize
+
+        # Spans not yet handed to the writer, as (name, start, end, thread) tuples
+        self.buffer = []
+
+        # Full buffers waiting to be written, None ends the writer
+        self.queue = queue.Queue()
+
+        # Trace times are relative to creation
+        self.origin = time.perf_counter()
+        self.pid = os.getpid()
+
+        # Start writer
+        self.thread = threading.Thread(target=self._write, name="tracer", daemon=True)
+        self.thread.start()
+
+    def record(self, name: str, start: float, end: float):
+        """Records a span, times from time.perf_counter()"""
+        self.buffer.append((name, start, end, threading.get_ident()))
+        if len(self.buffer) >= self.bufferSize:
+            self.flush()
+
+    def flush(self):
+        """Hands the buffered spans to the writer"""
+        if self.buffer:
+            self.queue.put(self.buffer)
+            self.buffer = []
+
+    def close(self):
+        """Writes every remaining span and closes the file"""
+        self.flush()
+        self.queue.put(None)
+        self.thread.join()
+
+    def _write(self):
+        """Writer thread loop"""
+        with open(self.path, "w") as file:
+            file.write("[\n")
+            file.write(json.dumps({
+                "name": "process_name", "ph": "M", "pid": self.pid,
+                "args": {"name": Config.screen.name},
+            }))
+            while True:
+                spans = self.queue.get()
+                if spans is None:
+                    break
+                for name, start, end, thread in spans:
+                    file.write(",\n" + json.dumps({
+                        "name": name, "ph": "X", "pid": self.pid, "tid": thread,
+                        "ts": (start - self.origin) * 1e6,
+                        "dur": (end - start) * 1e6,
+                    }))
+            file.write("\n]\n")
+
+def _traced(tracer: Tracer, name: str, function: typing.Callable):
+    """Returns function wrapped to record a span per call"""
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            tracer.record(name, start, time.perf_counter())
+    wrapper.untraced = function
+    return wrapper
+
+def install(tracer: Tracer, targets: typing.Iterable[typing.Tuple[type, str]]):
+    """Wraps each (class, method name) target to record spans into tracer\n
+    Untraced code is left as is, so tracing costs nothing until installed
+    """
+    for owner, attribute in targets:
+        function = owner.__dict__[attribute]
+        setattr(owner, attribute,
+                _traced(tracer, f"{owner.__name__}.{attribute}", function))
+
+def uninstall(targets: typing.Iterable[typing.Tuple[type, str]]):
+    """Restores the targets wrapped by install()"""
+    for owner, attribute in targets:
+        function = owner.__dict__[attribute]
+        if hasattr(function, "untraced"):
+            setattr(owner, attribute, function.untraced)
@@ -0,0 +1,317 @@
+"""Entity-component-system layer for Spook Fighters"""
+
+# Import bundled modules
+from array import array
+import typing
+
+# Import optional libraries, systems run plain loops over the columns without NumPy
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Component schema
+class Component:
+    """Describes a component type: a name and a typecode (array module) for each field\n
+    Fields with a typecode of None hold arbitrary objects
+    """
+
+    def __init__(self, name: str, **fields: typing.Optional[str]):
+        self.name = name
+        self.fields = fields
+
+    def __repr__(self):
+        return f"Component({self.name!r})"
+
+# Built-in components
+TRANSFORM = Component("transform", x="d", y="d", width="l", height="l")
+VELOCITY = Component("velocity", x="d", y="d")
+LIFETIME = Component("lifetime", age="l", lifeSpan="l")
+
+# Fewest rows worth the fixed cost of NumPy views, smaller storages are looped over
+VECTOR_MIN = 32
+
+# Whether a system should run NumPy over columns of this many rows
+def vectorized(rows: int) -> bool:
+    """Returns if NumPy is available and worth it for the given number of rows"""
+    return numpy is not None and rows >= VECTOR_MIN
+
+# Zero-copy NumPy view of a typed column
+def view(column: array) -> "numpy.ndarray":
+    """Returns a NumPy array sharing the memory of an array column\n
+    The column can not grow or shrink while a view of it is alive,
+    so views must be dropped before entities are created or destroyed
+    """
+    return numpy.frombuffer(column, column.typecode)
+
+# Sparse set storage of a single component type
+class Storage:
+    """Densely packed storage of one component for many entities\n
+    Each field is its own array, entities map to an index in those arrays
+    """
+
+    def __init__(self, component: Component):
+
+        # Reference component
+        self.component = component
+
+        # Entity of each dense slot, and dense slot of each entity
+        self.entities = array("l")
+        self.index = {}
+
+        # Field columns
+        self.fields = {
+            name: (array(code) if code is not None else [])
+            for name, code in component.fields.items()
+        }
+
+        # Components kept in step with this one, None if not grouped (see World.group)
+        self.group = None
+
+    def __len__(self):
+        return len(self.entities)
+
+    def __contains__(self, entity: int):
+        return entity in self.index
+
+    def add(self, entity: int, **values):
+        """Adds the component to an entity, missing fields default to zero/None"""
+        if entity in self.index:
+            raise ValueError(f"Entity {entity} already has {self.component}")
+        self.index[entity] = len(self.entities)
+        self.entities.append(entity)
+        for name, column in self.fields.items():
+            column.append(values.get(name, 0 if isinstance(column, array) else None))
+
+    def remove(self, entity: int):
+        """Removes the component from an entity by swapping in the last slot"""
+        slot = self.index.pop(entity)
+        last = len(self.entities) - 1
+        # Move the last entity into the hole
+        if slot != last:
+            moved = self.entities[last]
+            self.entities[slot] = moved
+            self.index[moved] = slot
+            for column in self.fields.values():
+                column[slot] = column[last]
+        # Shrink
+        self.entities.pop()
+        for column in self.fields.values():
+            column.pop()
+
+    def clear(self):
+        """Removes the component from every entity, keeping the same columns"""
+        del self.entities[:]
+        self.index.clear()
+        for column in self.fields.values():
+            del column[:]
+
+    def get(self, entity: int, field: str):
+        """Returns a field value of an entity"""
+        return self.fields[field][self.index[entity]]
+
+    def set(self, entity: int, field: str, value):
+        """Sets a field value of an entity"""
+        self.fields[field][self.index[entity]] = value
+
+# Container of entities, components and systems
+class World:
+    """Holds entities as integer IDs with their components, and runs systems over them\n
+    A system is a callable taking (world, game), called once per process()
+    """
+
+    def __init__(self, systems: typing.Iterable[typing.Callable] = ()):
+
+        # Next unused entity ID, IDs only count up so lower IDs are older
+        self.nextEntity = 0
+
+        # Storage for each component, created on first use
+        self.storages = {}
+
+        # Storages each entity has a component in, so destroy only touches those
+        self.components = {}
+
+        # Systems run in order by process()
+        self.systems = list(systems)
+
+    def __len__(self):
+        """Returns the number of live entities"""
+        return len(self.components)
+
+    def __contains__(self, entity: int):
+        return entity in self.components
+
+    def storage(self, component: Component) -> Storage:
+        """Returns the storage of a component, creating it if needed"""
+        if component not in self.storages:
+            self.storages[component] = Storage(component)
+        return self.storages[component]
+
+    def group(self, *components: Component):
+        """Keeps the storages of the components in step: an entity with one has them all,
+        in the same slot, so systems can run down their columns together\n
+        Grouped components are only given by create() and taken by destroy()
+        """
+        storages = [self.storage(component) for component in components]
+        if any(storage.group is not None or len(storage) for storage in storages):
+            raise ValueError(f"{components} are already grouped or in use")
+        group = frozenset(components)
+        for storage in storages:
+            storage.group = group
+
+    def grouped(self, *components: Component) -> bool:
+        """Returns if every given component is in the same group"""
+        group = self.storage(components[0]).group
+        return group is not None and group.issuperset(components)
+
+    def create(self, components: typing.Dict[Component, dict] = None) -> int:
+        """Creates an entity, optionally with components, and returns its ID\n
+        components - maps each Component to its field values
+        """
+        components = components or {}
+        # Grouped components come all together or not at all
+        for component in components:
+            group = self.storage(component).group
+            if group is not None and not group.issubset(components):
+                raise ValueError(f"{component} is grouped with {set(group)}, give them all")
+        entity = self.nextEntity
+        self.nextEntity += 1
+        self.components[entity] = []
+        for component, values in components.items():
+            storage = self.storages[component]
+            storage.add(entity, **values)
+            self.components[entity].append(storage)
+        return entity
+
+    def add_component(self, entity: int, component: Component, **values):
+        """Adds a component to an existing entity"""
+        storage = self.storage(component)
+        if storage.group is not None:
+            raise ValueError(f"{component} is grouped, it can only be given by create()")
+        storage.add(entity, **values)
+        self.components[entity].append(storage)
+
+    def remove_component(self, entity: int, component: Component):
+        """Removes a component from an entity"""
+        storage = self.storages[component]
+        if storage.group is not None:
+            raise ValueError(f"{component} is grouped, it can only be taken by destroy()")
+        storage.remove(entity)
+        self.components[entity].remove(storage)
+
+    def destroy(self, entity: int):
+        """Destroys an entity, removing only the components it actually has\n
+        Grouped storages all swap the same last slot in, so they stay in step
+        """
+        for storage in self.components.pop(entity):
+            storage.remove(entity)
+
+    def query(self, *components: Component) -> typing.List[int]:
+        """Returns the entities that have every given component\n
+        Only the smallest storage is iterated
+        """
+        storages = [self.storage(component) for component in components]
+        smallest = min(storages, key=len)
+        others = [storage.index for storage in storages if storage is not smallest]
+        return [
+            entity for entity in smallest.entities
+            if all(entity in index for index in others)
+        ]
+
+    def add_system(self, system: typing.Callable):
+        """Appends a system to be run by process()"""
+        self.systems.append(system)
+
+    def process(self, game):
+        """Runs each system once"""
+        for system in self.systems:
+            system(self, game)
+
+    def clear(self):
+        """Destroys every entity, storages (and columns referenced from them) are kept"""
+        for storage in self.storages.values():
+            storage.clear()
+        self.components.clear()
+
+    def snapshot(self):
+        """Returns a copy of every entity and component, for restore()"""
+        return (
+            self.nextEntity,
+            {
+                component: (
+                    array("l", storage.entities),
+                    {name: column[:] for name, column in storage.fields.items()},
+                )
+                for component, storage in self.storages.items()
+            },
+        )
+
+    def restore(self, snapshot):
+        """Restores the world to a snapshot(), in place so column references stay valid"""
+        nextEntity, storages = snapshot
+        self.clear()
+        self.nextEntity = nextEntity
+        for component, (entities, fields) in storages.items():
+            storage = self.storage(component)
+            storage.entities[:] = entities
+            storage.index.update((entity, slot) for slot, entity in enumerate(entities))
+            for name, column in storage.fields.items():
+                column[:] = fields[name]
+            for entity in entities:
+                self.components.setdefault(entity, []).append(storage)
+
+## Built-in systems
+def lifetime_system(world: World, game): #pylint: disable=unused-argument
+    """Ages every entity with a lifetime, destroying those that reached their lifespan\n
+    Expired entities are destroyed before they would age, so run this before movement
+    and an entity with a lifespan of n moves n times
+    """
+    lifetimes = world.storage(LIFETIME)
+    if vectorized(len(lifetimes)):
+        expired = _age(lifetimes)
+    else:
+        ages, lifeSpans = lifetimes.fields["age"], lifetimes.fields["lifeSpan"]
+        expired = []
+        for slot, entity in enumerate(lifetimes.entities):
+            if ages[slot] >= lifeSpans[slot]:
+                expired.append(entity)
+            else:
+                ages[slot] += 1
+    for entity in expired:
+        world.destroy(entity)
+
+def _age(lifetimes: Storage) -> typing.List[int]:
+    """Ages every lifetime with NumPy, returning the entities that reached their lifespan\n
+    The views die with this call, before the expired entities are destroyed
+    """
+    ages, lifeSpans = view(lifetimes.fields["age"]), view(lifetimes.fields["lifeSpan"])
+    slots = numpy.flatnonzero(ages >= lifeSpans)
+    # Expired entities age too, they are destroyed anyway
+    ages += 1
+    entities = lifetimes.entities
+    return [entities[slot] for slot in slots.tolist()]
+
+def movement_system(world: World, game): #pylint: disable=unused-argument
+    """Moves every transform by its velocity"""
+    transforms = world.storage(TRANSFORM)
+    velocities = world.storage(VELOCITY)
+    xs, ys = transforms.fields["x"], transforms.fields["y"]
+    dxs, dys = velocities.fields["x"], velocities.fields["y"]
+    # Grouped storages share slots, so no lookups are needed
+    if world.grouped(TRANSFORM, VELOCITY):
+        if vectorized(len(velocities)):
+            positions = view(xs)
+            positions += view(dxs)
+            positions = view(ys)
+            positions += view(dys)
+            return
+        for slot in range(len(velocities)):
+            xs[slot] += dxs[slot]
+            ys[slot] += dys[slot]
+        return
+    index = transforms.index
+    for slot, entity in enumerate(velocities.entities):
+        if entity in index:
+            other = index[entity]
+            xs[other] += dxs[slot]
+            ys[other] += dys[slot]
@@ -0,0 +1,11 @@
+"""Parallel headless replay renderer for Spook Fighters, see modules/Replay.py"""
+# Spook Fighters Py
+# Authors: Ryan/Kevin
+# GitHub: https://github.com/HN67/spook-fighters
+
+# Import local files
+from modules import Replay
+
+# Render replays if this is the __main__ file
+if __name__ == "__main__":
+    Replay.main()
@@ -0,0 +1,11 @@
+"""Headless match server for Spook Fighters, see modules/Server.py"""
+# Spook Fighters Py
+# Authors: Ryan/Kevin
+# GitHub: https://github.com/HN67/spook-fighters
+
+# Import local files
+from modules import Server
+
+# Run the server if this is the __main__ file
+if __name__ == "__main__":
+    Server.main()
@@ -0,0 +1,35 @@
+"""Tests of state broadcasting and mirroring"""
+
+# Import local files
+from modules import Broadcast
+from modules import Core
+from modules import Headless
+
+Headless.init()
+
+def test_broadcaster_prunes_skipped_ticks():
+    game = Headless.build_game()
+    broadcaster = Broadcast.Broadcaster(game, history=8)
+    broadcaster.add("viewer", lambda packet: None)
+    for tick in range(0, 300, 3):
+        broadcaster.broadcast(tick)
+    assert len(broadcaster.states) <= 8
+    assert min(broadcaster.states) > 297 - 8
+
+def test_replica_markers_come_back_after_restore():
+    game = Headless.build_game()
+    start = game.snapshot()
+    replica = Broadcast.Replica(game)
+    players = Broadcast.Broadcaster(game).capture(0).players
+    projectiles = {number: (number * 20, 10, 5, 5, Core.Color.RED) for number in range(3)}
+    snapshot = Broadcast.Snapshot(0, players, projectiles)
+
+    replica.apply(snapshot)
+    assert all(marker.alive() for marker in replica.markers.values())
+
+    # Restoring drops the markers from the game, the next snapshot brings them back
+    game.restore(start)
+    replica.apply(snapshot)
+    markers = replica.markers.values()
+    assert len(markers) == 3
+    assert all(marker in game.drawables for marker in markers)
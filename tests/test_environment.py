@@ -0,0 +1,23 @@
+"""Tests of the training environments"""
+
+# Import structure libraries
+import numpy
+
+# Import local files
+from modules import Environment
+
+def test_sharded_environments_step_like_local_ones():
+    actions = [[(tick * 7 + index) % Environment.Environment.ACTIONS for index in range(4)]
+               for tick in range(30)]
+    local = Environment.VectorEnvironment(4, seed=5, maxTicks=20)
+    with Environment.VectorEnvironment(4, seed=5, workers=2, maxTicks=20) as sharded:
+        assert len(sharded) == 4
+        assert numpy.array_equal(local.reset(), sharded.reset())
+        for tickActions in actions:
+            observations, rewards, dones, infos = local.step(tickActions)
+            observations, rewards, dones = observations.copy(), rewards.copy(), dones.copy()
+            shardObservations, shardRewards, shardDones, shardInfos = sharded.step(tickActions)
+            assert numpy.array_equal(observations, shardObservations)
+            assert numpy.array_equal(rewards, shardRewards)
+            assert numpy.array_equal(dones, shardDones)
+            assert [info["ticks"] for info in infos] == [info["ticks"] for info in shardInfos]
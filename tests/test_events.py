@@ -0,0 +1,28 @@
+"""Tests of event dispatch and filtering"""
+
+# Import structure libraries
+import pygame
+
+# Import local files
+from modules import Headless
+
+Headless.init()
+
+# Imported after the headless setup, main opens a display
+import main #pylint: disable=wrong-import-position
+
+def test_filter_keeps_queued_events():
+    window = main.Main(2, None, (800, 600))
+    pygame.event.clear()
+    pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_a))
+    pygame.event.post(pygame.event.Event(pygame.QUIT))
+    window.filter_events()
+    types = [event.type for event in pygame.event.get()]
+    assert pygame.KEYDOWN in types
+    assert pygame.QUIT in types
+
+def test_quit_before_start_ends_the_loop():
+    window = main.Main(2, None, (800, 600))
+    pygame.event.post(pygame.event.Event(pygame.QUIT))
+    window.start()
+    assert window.scenes.active is None
@@ -0,0 +1,38 @@
+"""Tests of the bot input providers"""
+
+# Import structure libraries
+import pygame
+
+# Import local files
+from modules import Base
+from modules import Core
+from modules import Headless
+from modules import Inputs
+
+Headless.init()
+
+def floating_stage():
+    """Returns a default game with floating barriers above the floor, and its floor"""
+    game = Headless.build_game()
+    floor = next(iter(game.get_barriers())).rect
+    game.add_barriers(*(
+        Base.Barrier(pygame.Rect(x, floor.top - 150, 40, 20), color=Core.Color.DARKGREEN)
+        for x in range(floor.left, floor.right, 200)
+    ))
+    return game, floor
+
+def test_recovery_stage_is_the_floor():
+    game, floor = floating_stage()
+    assert Inputs.RecoveryBot().stage(game) == floor
+
+def test_recovery_chases_on_multi_barrier_stage():
+    game, floor = floating_stage()
+    player, target = list(game.get_players())[:2]
+
+    # Both standing on the floor, below the floating barriers.
+    # A target away from the center: a bot that thinks it is off stage heads to the center instead
+    target.rect.midbottom = (floor.left + 40, floor.top)
+    player.rect.midbottom = (floor.left + 200, floor.top)
+    held = Inputs.RecoveryBot().decide(player, game)
+    assert held & Core.Input.LEFT
+    assert not held & Core.Input.RIGHT
@@ -0,0 +1,37 @@
+"""Tests of recording and playing back replays"""
+
+# Import local files
+from modules import Headless
+from modules import Inputs
+from modules import Replay
+
+Headless.init()
+
+# Imported after the headless setup, main opens a display
+import main #pylint: disable=wrong-import-position
+
+def state(game):
+    """Returns what a replay has to reproduce of each player"""
+    return [(player.rect.topleft, player.damage.value, player.lives.value)
+            for player in game.get_players()]
+
+def test_replay_round_trip_over_reset(tmp_path):
+    window = main.Main(2, None, (800, 600), record=str(tmp_path / "match.replay"))
+    game = window.scenes.get("game")
+    # Recorded bots instead of the keyboard
+    for index, player in enumerate(game.get_players()):
+        player.get_provider().provider = Inputs.RandomBot(seed=index)
+
+    noKeys = Headless.HeldKeys()
+    for _ in range(120):
+        game.update([], noKeys)
+    window.reset_game()
+    for _ in range(240):
+        game.update([], noKeys)
+
+    replay = window.replay
+    assert len(replay) == 240
+    played = Replay.play(Replay.Replay.from_bytes(replay.to_bytes()))
+    for _ in range(len(replay)):
+        played.update([], noKeys)
+    assert state(played) == state(game)
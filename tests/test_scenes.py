@@ -0,0 +1,30 @@
+"""Tests of the scene manager"""
+
+# Import bundled modules
+import threading
+
+# Import local files
+from modules import Scenes
+
+class Scene:
+    """Stand-in scene recording the thread it was built on"""
+
+    def __init__(self):
+        self.thread = threading.current_thread()
+
+    def snapshot(self):
+        """Nothing to restore"""
+
+def test_preload_builds_between_frames_on_the_calling_thread():
+    scenes = Scenes.SceneManager()
+    scenes.register("game", Scene)
+    scenes.preload("game")
+    assert "game" not in scenes.scenes
+
+    scenes.load_pending()
+    scene = scenes.scenes["game"]
+    assert scene.thread is threading.current_thread()
+
+    # Nothing left to build, and getting it does not rebuild it
+    scenes.load_pending()
+    assert scenes.get("game") is scene
@@ -0,0 +1,33 @@
+"""Tests of the spatial indexes"""
+
+# Import structure libraries
+import pygame
+
+# Import local files
+from modules import Base
+from modules import Core
+from modules import Headless
+
+Headless.init()
+
+def test_scenery_follows_kill_and_restore():
+    game = Headless.build_game()
+    start = game.snapshot()
+    count = game.scenery.count
+    view = game.get_stage()
+
+    extra = Base.Barrier(pygame.Rect(300, 200, 40, 20), color=Core.Color.DARKGREEN)
+    game.add_barriers(extra)
+    assert extra in game.scenery.query(view.left, view.top, view.right, view.bottom)
+
+    extra.kill()
+    assert extra not in game.scenery.query(view.left, view.top, view.right, view.bottom)
+
+    # Restoring many times neither leaks index entries nor grows the draw order
+    game.add_barriers(extra)
+    for _ in range(5):
+        game.restore(start)
+    assert game.scenery.count == count
+    assert extra not in game.scenery.entries
+    found = game.scenery.query(view.left, view.top, view.right, view.bottom)
+    assert found == sorted(found, key=lambda sprite: game.scenery.entries[sprite][0])
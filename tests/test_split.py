@@ -0,0 +1,34 @@
+"""Tests of the shared memory state buffer"""
+
+# Import local files
+from modules import Broadcast
+from modules import Split
+
+def fields(snapshot):
+    """Returns the contents of a snapshot, comparable with =="""
+    return None if snapshot is None else (snapshot.tick, snapshot.players, snapshot.projectiles)
+
+def test_state_buffer_round_trip_and_reset():
+    writer = Split.StateBuffer(2, 4)
+    reader = Split.StateBuffer(2, 4, name=writer.get_name())
+    try:
+        snapshot = Broadcast.Snapshot(
+            7, ((1, 2, -3, 4, 5, 6, 7, 8),), {9: (10, 20, 5, 5, (255, 0, 10))},
+        )
+        writer.publish(snapshot)
+        assert fields(reader.read()) == fields(snapshot)
+
+        # Reader input reaches the writer
+        reader.inputs[1] = 3
+        assert writer.inputs[1] == 3
+
+        # States published before the writer takes a reset are not read
+        reader.reset()
+        assert reader.read() is None
+        assert writer.reset_asked()
+        assert not writer.reset_asked()
+        writer.publish(snapshot)
+        assert fields(reader.read()) == fields(snapshot)
+    finally:
+        reader.close()
+        writer.close()
@@ -0,0 +1,75 @@
+"""Tests of the entity-component world and the projectiles living in it"""
+
+# Import bundled modules
+import pytest
+
+# Import structure libraries
+import pygame
+
+# Import local files
+from modules import Config
+from modules import Headless
+from modules import Mechanics
+from modules import World
+
+Headless.init()
+
+def test_grouped_storages_stay_in_step():
+    world = World.World()
+    world.group(World.TRANSFORM, World.VELOCITY)
+    entities = [
+        world.create({World.TRANSFORM: {"x": number}, World.VELOCITY: {"x": 1}})
+        for number in range(5)
+    ]
+    world.destroy(entities[1])
+    world.destroy(entities[4])
+
+    transforms, velocities = world.storage(World.TRANSFORM), world.storage(World.VELOCITY)
+    assert list(transforms.entities) == list(velocities.entities)
+    World.movement_system(world, None)
+    assert sorted(transforms.fields["x"]) == [1, 3, 4]
+
+    # Grouped components only come and go with the entity
+    with pytest.raises(ValueError):
+        world.create({World.TRANSFORM: {}})
+    with pytest.raises(ValueError):
+        world.remove_component(entities[0], World.VELOCITY)
+
+def test_projectiles_age_move_and_restore_through_the_world():
+    game = Headless.build_game()
+    world, system = game.get_world(), game.get_projectile_system()
+    start = game.snapshot()
+
+    entity = system.spawn(pygame.Rect(10, 10, 4, 4), xSpeed=3, lifeSpan=2)
+    lasting = system.spawn(pygame.Rect(10, 20, 4, 4), xSpeed=1)
+    for _ in range(2):
+        game.update([])
+    assert system.transforms.get(entity, "x") == 16
+
+    # Expired after moving for its whole lifespan, the other has no lifetime
+    game.update([])
+    assert entity not in world
+    assert system.transforms.get(lasting, "x") == 13
+
+    game.restore(start)
+    assert len(system) == 0 and len(world) == 0
+    assert system.spawn(pygame.Rect(10, 10, 4, 4)) == entity
+
+def test_grab_spawns_into_the_system_and_follows_its_caster():
+    game = Headless.build_game()
+    system = game.get_projectile_system()
+    player = list(game.get_players())[0]
+    game.add_controllers(Mechanics.Grab(player))
+
+    # Born on the attack's first tick, owned by the caster
+    game.update([])
+    assert len(system) == 1
+    entity = system.projectiles.entities[0]
+    assert system.owners[system.projectiles.get(entity, "owner")] is player
+
+    # Reaches out from the caster wherever it moves
+    for age in range(1, 4):
+        player.rect.x += 5
+        game.update([])
+        reach = Config.attack.grab.speed * age
+        assert system.transforms.get(entity, "x") == player.rect.right + reach